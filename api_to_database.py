@@ -1,15 +1,28 @@
+import contextvars
+from contextlib import contextmanager, nullcontext
 import os
 import sys
-import requests
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from sqlalchemy import create_engine, Engine, text
-from dotenv import load_dotenv
-from typing import Optional, Any
+from sqlalchemy import Engine, text, inspect
+from typing import Optional, Iterable, Iterator
 import json
+from bulk_load import bulk_load_df, upsert_df_to_postgres, copy_df, upsert_df
+from nvdb_client import NvdbClient, NvdbFetchError
+from page_cache import PageCache
+from nvdb_extract import extract_stedfestinger
+from object_types import ObjectTypeSpec, FARTSGRENSE, parse_object_ids, OBJECT_TYPES
+from rollup import refresh_rollup, years_for_veglenker
+from spatial import ewkt_geometry, NVDB_DEFAULT_SRID
+from pipeline import run_stages
+from instrumentation import instrument_stage, instrument_iterable, dataframe_bytes
+from config import ConfigError, require_db_settings
+from db import database_url, get_engine, check_config as check_db_config
 
-# --- Load Environment Variables ---
-load_dotenv()
-
+# --- Settings (read from the environment; cli.py loads .env first) ---
 # --- Get DB Credentials (Global) ---
 username = os.getenv("POSTGRES_USER")
 password = os.getenv("POSTGRES_PASSWORD")
@@ -19,151 +32,473 @@ database = os.getenv("POSTGRES_DB")
 
 # --- Get NVDB Config (Global) ---
 nvdb_base_url = os.getenv("NVDB_BASE_URL", "https://nvdbapiles-v3.atlas.vegvesen.no")
-nvdb_object_id = os.getenv("NVDB_OBJECT_ID")
+nvdb_object_id = os.getenv("NVDB_OBJECT_ID") # One or more comma-separated object types from object_types.py
 nvdb_param_inkluder = os.getenv("NVDB_PARAM_INKLUDER", "alle") # Ensure 'alle' or 'lokasjon' is included
 nvdb_param_srid = os.getenv("NVDB_PARAM_SRID")
 nvdb_param_segmentering = os.getenv("NVDB_PARAM_SEGMENTERING")
 nvdb_param_trafikantgruppe = os.getenv("NVDB_PARAM_TRAFIKANTGRUPPE")
 nvdb_param_fylke = os.getenv("NVDB_PARAM_FYLKE")
 nvdb_param_endret_etter = os.getenv("NVDB_PARAM_ENDRET_ETTER")
+nvdb_sync_mode = os.getenv("NVDB_SYNC_MODE", "full") # 'full' reloads everything, 'incremental' merges changes
+nvdb_fetch_concurrency = os.getenv("NVDB_FETCH_CONCURRENCY", "1") # >1 fetches one fylke per worker in parallel
+nvdb_object_type_concurrency = os.getenv("NVDB_OBJECT_TYPE_CONCURRENCY", "4") # Object types synced at the same time
+nvdb_max_retries = os.getenv("NVDB_MAX_RETRIES", "5") # Retries per page on transient errors
+nvdb_cache_dir = os.getenv("NVDB_CACHE_DIR") # Enables the on-disk page cache when set
+nvdb_cache_max_age_hours = os.getenv("NVDB_CACHE_MAX_AGE_HOURS", "24")
+nvdb_cache_max_mb = os.getenv("NVDB_CACHE_MAX_MB", "2048")
+nvdb_postgis = os.getenv("NVDB_POSTGIS", "0") == "1" # Also fills the PostGIS geom column (migration 011)
+nvdb_pipeline_queue_size = os.getenv("NVDB_PIPELINE_QUEUE_SIZE", "2") # Pages buffered between fetch, processing and loading; 0 = no overlap
+
+# Fylkesnummer after the 2024 county reform, used to partition concurrent fetches
+FYLKER = [3, 11, 15, 18, 31, 32, 33, 34, 39, 40, 42, 46, 50, 55, 56]
 
 # --- Check required variables ---
-if not all([username, password, host, port, database]):
-    print("Error: Database environment variables missing. Check .env file.")
-    sys.exit(1)
-if not nvdb_object_id:
-    print("Error: NVDB_OBJECT_ID environment variable missing. Check .env file.")
-    sys.exit(1)
+def check_config() -> None:
+    """ Raises ConfigError if a required setting is missing or invalid. Called by cli.py before a sync. """
+    require_db_settings({'POSTGRES_USER': username, 'POSTGRES_PASSWORD': password, 'POSTGRES_HOST': host,
+                         'POSTGRES_PORT': port, 'POSTGRES_DB': database})
+    check_db_config()
+    if not nvdb_object_id:
+        raise ConfigError("NVDB_OBJECT_ID environment variable missing. Check .env file.")
+    try:
+        configured_object_types()
+    except KeyError as e:
+        known = ', '.join(str(object_id) for object_id in OBJECT_TYPES)
+        raise ConfigError(f"NVDB_OBJECT_ID {e} has no mapping in object_types.py (known: {known}). Check .env file.")
+    if not nvdb_object_type_concurrency.isdigit() or int(nvdb_object_type_concurrency) < 1:
+        raise ConfigError("NVDB_OBJECT_TYPE_CONCURRENCY must be a positive integer. Check .env file.")
+    if nvdb_sync_mode not in ('full', 'incremental'):
+        raise ConfigError("NVDB_SYNC_MODE must be 'full' or 'incremental'. Check .env file.")
+    if not nvdb_fetch_concurrency.isdigit() or int(nvdb_fetch_concurrency) < 1:
+        raise ConfigError("NVDB_FETCH_CONCURRENCY must be a positive integer. Check .env file.")
+    if nvdb_postgis and nvdb_param_srid and not nvdb_param_srid.isdigit():
+        raise ConfigError("NVDB_PARAM_SRID must be a numeric EPSG code when NVDB_POSTGIS=1. Check .env file.")
+    if not nvdb_pipeline_queue_size.isdigit():
+        raise ConfigError("NVDB_PIPELINE_QUEUE_SIZE must be a non-negative integer. Check .env file.")
+    if not nvdb_max_retries.isdigit():
+        raise ConfigError("NVDB_MAX_RETRIES must be a non-negative integer. Check .env file.")
+    try:
+        float(nvdb_cache_max_age_hours), float(nvdb_cache_max_mb)
+    except ValueError:
+        raise ConfigError("NVDB_CACHE_MAX_AGE_HOURS and NVDB_CACHE_MAX_MB must be numbers. Check .env file.")
 
 # --- Function Definitions ---
 
-def fetch_nvdb_data_paginated(object_id: str, params: dict) -> list:
-    """ Fetches NVDB data, handling pagination and stopping on 0 results. """
-    all_objects = []
+def configured_object_types() -> list:
+    """ Returns the ObjectTypeSpecs named by NVDB_OBJECT_ID. Raises KeyError for an unmapped id. """
+    return parse_object_ids(nvdb_object_id or '')
+
+# Shared by every object type and fylke worker thread; first use can come from
+# any of them, so creation is guarded like db.get_engine.
+_nvdb_client: Optional[NvdbClient] = None
+_page_cache: Optional[PageCache] = None
+_shared_lock = threading.Lock()
+
+def get_nvdb_client() -> NvdbClient:
+    """ Returns the shared NVDB client, creating it on first use. """
+    global _nvdb_client
+    if _nvdb_client is None:
+        with _shared_lock:
+            if _nvdb_client is None:
+                # Every object type and fylke worker draws from the same connection pool
+                parallel_fetches = int(nvdb_fetch_concurrency) * int(nvdb_object_type_concurrency)
+                _nvdb_client = NvdbClient(
+                    max_retries=int(nvdb_max_retries),
+                    pool_size=max(10, parallel_fetches),
+                )
+    return _nvdb_client
+
+def get_page_cache() -> Optional[PageCache]:
+    """ Returns the shared page cache if NVDB_CACHE_DIR is set, evicting stale entries on first use. """
+    global _page_cache
+    if _page_cache is None and nvdb_cache_dir:
+        with _shared_lock:
+            if _page_cache is None:
+                page_cache = PageCache(
+                    nvdb_cache_dir,
+                    max_age_seconds=float(nvdb_cache_max_age_hours) * 3600,
+                    max_bytes=int(float(nvdb_cache_max_mb) * 1024 * 1024),
+                )
+                page_cache.evict()
+                # Published only once evicted, so no thread reads entries being removed
+                _page_cache = page_cache
+    return _page_cache
+
+def iter_nvdb_pages(object_id: str, params: dict, client: Optional[NvdbClient] = None,
+                    cache: Optional[PageCache] = None) -> Iterator[list]:
+    """
+    Yields NVDB objects one page at a time, following the 'neste' cursor.
+
+    Transient errors are retried on the current cursor by the client; if it
+    gives up, NvdbFetchError is raised rather than returning partial data.
+    With NVDB_CACHE_DIR set, pages are checkpointed to disk so an interrupted
+    run resumes where it stopped and a repeated query is replayed offline.
+    """
+    client = client or get_nvdb_client()
+    cache = cache or get_page_cache()
     current_url = f"{nvdb_base_url}/vegobjekter/{object_id}"
-    headers = {'Accept': 'application/vnd.vegvesen.nvdb-v3-rev1+json'}
     print(f"Fetching data from: {current_url} with params: {params}")
-    
-    while current_url:
+    total = 0
+
+    for objects_on_page in client.iter_pages(current_url, params, cache=cache):
+        total += len(objects_on_page)
+        print(f"Fetched {len(objects_on_page)} objects. Total: {total}")
+        yield objects_on_page
+
+# Marks the end of one partition's cursor chain on the shared page queue
+_PARTITION_DONE = object()
+
+def iter_nvdb_pages_concurrent(object_id: str, params: dict, partition_values: list, max_workers: int = 4,
+                               partition_key: str = 'fylke') -> Iterator[list]:
+    """
+    Yields NVDB pages from several cursor chains fetched in parallel.
+
+    The query is split into one partition per value of 'partition_key' (one
+    fylke each by default), and every partition's 'neste' chain is walked on
+    its own worker thread, at most 'max_workers' at a time. Pages are handed
+    over through a bounded queue in arrival order, so the consumer sees the
+    same page stream as iter_nvdb_pages and memory stays bounded.
+    """
+    page_queue = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        """ Blocks until the item is queued, giving up if the consumer has stopped. """
+        while not stop.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_partition(value):
         try:
-            response = requests.get(current_url, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            objects_on_page = data.get('objekter', [])
-            
-            if not objects_on_page and len(all_objects) > 0: # Check if empty *after* getting some data
-                print("Fetched 0 objects, assuming end of data. Stopping pagination.")
-                break
-            elif not objects_on_page: # Handle case where first page is empty
-                 print("Fetched 0 objects on the first page. No data found for these criteria.")
-                 break
-
-            all_objects.extend(objects_on_page)
-            print(f"Fetched {len(objects_on_page)} objects. Total: {len(all_objects)}")
-            current_url = data.get('metadata', {}).get('neste', {}).get('href')
-            params = {}
-        except requests.exceptions.RequestException as e:
-            print(f"Error during API request: {e}")
-            current_url = None
-    print(f"Finished fetching. Total objects: {len(all_objects)}")
-    return all_objects
-
-def get_veglenke(obj: dict) -> Optional[int]:
-    """Safely extracts the primary veglenkesekvensid from 'stedfestinger'."""
-    try:
-        # Get the 'stedfestinger' list, default to empty list if not found
-        stedfestinger = obj.get('lokasjon', {}).get('stedfestinger', [])
-        
-        # If the list is not empty, get the 'veglenkesekvensid' 
-        # from the *first* element.
-        if stedfestinger:
-            return stedfestinger[0].get('veglenkesekvensid')
-            
-        # If the list is empty or key not found, return None
-        return None
-        
-    except Exception as e:
-        # Catch any unexpected errors during extraction
-        print(f"Warning: Error extracting veglenke for obj {obj.get('id')}: {e}")
-        return None
+            if stop.is_set():
+                return
+            for objects_on_page in iter_nvdb_pages(object_id, {**params, partition_key: value}):
+                if not put(objects_on_page):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_PARTITION_DONE)
 
-def get_property(obj: dict, prop_name: str) -> Optional[Any]:
-    """Safely extracts a specific property value."""
+    print(f"Fetching {len(partition_values)} partitions by '{partition_key}' with {max_workers} workers.")
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nvdb-fetch')
     try:
-        for prop in obj.get('egenskaper', []):
-            if prop.get('navn', '').lower() == prop_name.lower():
-                return prop.get('verdi')
-        return None
-    except Exception:
-        return None
+        for value in partition_values:
+            executor.submit(fetch_partition, value)
+
+        remaining = len(partition_values)
+        while remaining:
+            item = page_queue.get()
+            if item is _PARTITION_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
 
-def process_nvdb_objects(objects: list) -> pd.DataFrame:
-    """ Processes NVDB objects into a DataFrame matching the table structure. """
-    processed_list = []
-
-    for obj in objects:
-
-        processed_list.append({
-            'nvdb_id': obj.get('id'),
-            'vegkategori': obj.get('lokasjon', {}).get('vegsystemreferanser', [{}])[0].get('vegsystem', {}).get('vegkategori'),
-            'fylke': obj.get('lokasjon', {}).get('fylker', [None])[0],
-            'kommune': obj.get('lokasjon', {}).get('kommuner', [None])[0],
-            'veglenkesekvensid': get_veglenke(obj), # **ADDED/IMPROVED**
-            'startdato': obj.get('metadata', {}).get('startdato'),
-            'sist_modifisert': obj.get('metadata', {}).get('sist_modifisert'),
-            'geometri_wkt': obj.get('geometri', {}).get('wkt'),
-            'fartsgrense': get_property(obj, 'Fartsgrense') # **IMPROVED**
-        })
-
-    if not processed_list: return pd.DataFrame()
-    df = pd.DataFrame(processed_list)
-    df['startdato'] = pd.to_datetime(df['startdato'], errors='coerce')
-    df['sist_modifisert'] = pd.to_datetime(df['sist_modifisert'], errors='coerce')
-    # Ensure fartsgrense is numeric, set errors to None (NULL)
-    df['fartsgrense'] = pd.to_numeric(df['fartsgrense'], errors='coerce') 
-    # Ensure IDs are numeric (handle potential None before converting)
-    df['nvdb_id'] = pd.to_numeric(df['nvdb_id'], errors='coerce').astype('Int64')
-    df['veglenkesekvensid'] = pd.to_numeric(df['veglenkesekvensid'], errors='coerce').astype('Int64')
-    df['fylke'] = pd.to_numeric(df['fylke'], errors='coerce').astype('Int64')
-    df['kommune'] = pd.to_numeric(df['kommune'], errors='coerce').astype('Int64')
+def get_partition_values(params: dict, partition_key: str = 'fylke') -> list:
+    """ Returns the partitions to fetch: the configured (comma-separated) filter, or every fylke. """
+    if params.get(partition_key):
+        return [value.strip() for value in str(params[partition_key]).split(',') if value.strip()]
+    return list(FYLKER)
 
+def nvdb_bytes_received() -> int:
+    """ Returns the bytes the shared client has received so far, for stage metrics. """
+    return get_nvdb_client().stats.bytes_received
+
+@instrument_stage(count_bytes=lambda df, args, kwargs: dataframe_bytes(df))
+def process_nvdb_objects(objects: list, spec: ObjectTypeSpec = FARTSGRENSE) -> pd.DataFrame:
+    """
+    Processes NVDB objects into a DataFrame matching the spec's table, in a single pass.
+
+    With NVDB_POSTGIS=1 a 'geom' column is added as EWKT in the requested
+    SRID for types with a geom column, which PostGIS parses during the same COPY.
+    """
+    df = spec.extract(objects)
+    if nvdb_postgis and spec.postgis_geom and not df.empty:
+        df['geom'] = ewkt_geometry(df['geometri_wkt'], int(nvdb_param_srid or NVDB_DEFAULT_SRID))
     return df
 
+def process_nvdb_stedfestinger(objects: list) -> pd.DataFrame:
+    """ Returns every stedfesting interval of the objects, for interval matching of hendelser. """
+    return extract_stedfestinger(objects).drop_duplicates(['nvdb_id', 'veglenkesekvensid', 'startposisjon'])
+
 def get_db_engine(user, pwd, hst, p, db):
-    """ Creates and returns a SQLAlchemy engine with sslmode=disable. """
+    """ Returns the shared pooled engine (db.py) with sslmode=disable. """
     try:
-        # --- MODIFIED LINE ---
-        db_url = f"postgresql://{user}:{pwd}@{hst}:{p}/{db}?sslmode=disable"
-        # -------------------
-        engine = create_engine(db_url)
-        return engine
+        return get_engine(database_url(user, pwd, hst, p, db))
     except Exception as e:
         print(f"Error creating database engine: {e}")
         return None
 
-def load_df_to_postgres(df: pd.DataFrame, table_name: str, engine: Engine, schema: str, if_exists: str = 'append'):
-    """ Loads a Pandas DataFrame into a PostgreSQL table. """
+@instrument_stage(
+    count_rows=lambda result, args, kwargs: len(args[0] if args else kwargs['df']),
+    count_bytes=lambda result, args, kwargs: dataframe_bytes(args[0] if args else kwargs['df']),
+)
+def load_df_to_postgres(df: pd.DataFrame, table_name: str, engine: Engine, schema: str, if_exists: str = 'append',
+                        connection=None):
+    """
+    Loads a Pandas DataFrame into a PostgreSQL table using COPY.
+
+    'if_exists' takes the to_sql values ('fail', 'replace', 'append') plus
+    'upsert', which merges rows into an existing table on nvdb_id. With a
+    DB-API 'connection', an existing table is appended to or upserted in the
+    caller's transaction, without committing. Returns False if the load failed.
+    """
     if df.empty:
         print("DataFrame is empty. Nothing to load.")
-        return
+        return True
 
     print(f"Loading {len(df)} rows into {schema}.{table_name}...")
     try:
-        df.to_sql(
-            table_name,
-            engine,
-            schema=schema,
-            if_exists=if_exists, 
-            index=False,      
-            chunksize=1000      
-        )
+        if connection is not None:
+            with connection.cursor() as cursor:
+                if if_exists == 'upsert':
+                    upsert_df(cursor, df, table_name, schema=schema, key_columns=('nvdb_id',))
+                else:
+                    copy_df(cursor, df, table_name, schema=schema)
+        elif if_exists == 'upsert':
+            upsert_df_to_postgres(df, table_name, engine, schema=schema, key_columns=('nvdb_id',))
+        else:
+            bulk_load_df(df, table_name, engine, schema=schema, if_exists=if_exists)
         print("Data loaded successfully.")
+        return True
     except Exception as e:
         print(f"Error loading data to PostgreSQL: {e}")
+        return False
+
+STEDFESTING_TABLE = FARTSGRENSE.stedfesting_table
+
+def ensure_object_table(engine: Engine, spec: ObjectTypeSpec, schema: str) -> None:
+    """ Creates the spec's table and indexes if they are missing (the same DDL as the migrations). """
+    with engine.begin() as connection:
+        connection.execute(text(spec.create_table_sql(schema)))
+
+def stored_veglenker(engine: Engine, table_name: str, schema: str, nvdb_ids: list) -> set:
+    """ Returns the veglenkesekvensid values currently stored for the given objects. """
+    if not nvdb_ids:
+        return set()
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(f"SELECT DISTINCT veglenkesekvensid FROM {schema}.{table_name} "
+                 "WHERE nvdb_id = ANY(:ids) AND veglenkesekvensid IS NOT NULL;"),
+            {'ids': [int(nvdb_id) for nvdb_id in nvdb_ids]}
+        )
+        return {row[0] for row in rows}
+
+def replace_stedfestinger(df_stedfestinger: pd.DataFrame, nvdb_ids: list, engine: Engine, schema: str,
+                          table_name: str = STEDFESTING_TABLE, removed_veglenker: Optional[set] = None,
+                          connection=None) -> int:
+    """
+    Replaces the stored stedfestinger of the given objects in one transaction.
+
+    Old intervals are deleted first, so an object that moved or shrank never
+    keeps a stale interval. If 'removed_veglenker' is given, the sequences of
+    the deleted intervals are added to it once the transaction commits.
+    With a DB-API 'connection', runs in the caller's transaction instead.
+    Returns the number of intervals written.
+    """
+    if not nvdb_ids:
+        return 0
+    raw_connection = connection if connection is not None else engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {schema}.{table_name} WHERE nvdb_id = ANY(%s) RETURNING veglenkesekvensid;",
+                           (list(nvdb_ids),))
+            deleted_veglenker = {row[0] for row in cursor.fetchall()}
+            rows = copy_df(cursor, df_stedfestinger, table_name, schema=schema)
+        if connection is None:
+            raw_connection.commit()
+        if removed_veglenker is not None:
+            removed_veglenker.update(deleted_veglenker)
+        return rows
+    except Exception:
+        if connection is None:
+            raw_connection.rollback()
+        raise
+    finally:
+        if connection is None:
+            raw_connection.close()
+
+def stream_nvdb_to_postgres(pages: Iterable[list], engine: Engine, table_name: str, schema: str, if_exists: str = 'append',
+                            changed_veglenker: Optional[set] = None, queue_size: Optional[int] = None,
+                            spec: ObjectTypeSpec = FARTSGRENSE, connection=None) -> int:
+    """
+    Processes and loads NVDB pages as they arrive, overlapping fetch, processing and loading.
+
+    Pages flow through bounded queues of 'queue_size' pages (default
+    NVDB_PIPELINE_QUEUE_SIZE; 0 runs the steps one page at a time), so the
+    next pages are fetched and processed while the current one is copied in
+    and memory stays flat regardless of the dataset size. Pages are loaded
+    in arrival order. 'replace' applies to the first non-empty page only;
+    every following page is appended.
+
+    Pages are processed with the spec's extractor, and for a spec with a
+    stedfesting table each object's intervals are stored alongside it. If
+    'changed_veglenker' is given, every veglenkesekvensid a loaded object
+    touches is added to it, before and after the load. With 'connection',
+    every page loads in that caller's transaction.
+
+    Returns the total number of rows loaded. Raises RuntimeError if a page
+    fails to load, so callers never mistake a partial load for a full one.
+    """
+    queue_size = int(nvdb_pipeline_queue_size) if queue_size is None else queue_size
+    page_numbers = itertools.count(1)
+    total_rows = 0
+
+    def process_page(objects_on_page: list) -> tuple:
+        df_stedfestinger = process_nvdb_stedfestinger(objects_on_page) if spec.stedfesting_table else None
+        return next(page_numbers), process_nvdb_objects(objects_on_page, spec), df_stedfestinger
+
+    def load_page(processed_page: tuple) -> None:
+        nonlocal total_rows
+        page_number, df_page, df_stedfestinger = processed_page
+        if df_page.empty:
+            return
+
+        if total_rows == 0:
+            print("\nProcessed Data Sample (first 5 rows):")
+            print(df_page.head())
+
+        nvdb_ids = df_page['nvdb_id'].dropna().tolist()
+        if changed_veglenker is not None:
+            # An object that moved leaves its old sequence behind; those years need recomputing too
+            try:
+                changed_veglenker.update(stored_veglenker(engine, table_name, schema, nvdb_ids))
+            except Exception as e:
+                raise RuntimeError(f"Page {page_number} could not read stored veglenker after {total_rows} rows: {e}") from e
+
+        page_mode = 'append' if if_exists == 'replace' and total_rows > 0 else if_exists
+        if not load_df_to_postgres(df_page, table_name, engine, schema=schema, if_exists=page_mode,
+                                   connection=connection):
+            raise RuntimeError(f"Page {page_number} failed to load after {total_rows} rows.")
+        if df_stedfestinger is not None:
+            try:
+                # Sequences that lost an interval need their rollup years recomputed too
+                replace_stedfestinger(df_stedfestinger, nvdb_ids, engine, schema, spec.stedfesting_table,
+                                      removed_veglenker=changed_veglenker, connection=connection)
+            except Exception as e:
+                raise RuntimeError(f"Page {page_number} stedfestinger failed to load after {total_rows} rows: {e}") from e
+            veglenker = df_stedfestinger['veglenkesekvensid']
+        else:
+            veglenker = df_page['veglenkesekvensid']
+        if changed_veglenker is not None:
+            changed_veglenker.update(veglenker.dropna().tolist())
+        total_rows += len(df_page)
+        print(f"Page {page_number} loaded. Total rows loaded: {total_rows}")
+
+    run_stages(pages, process_page, load_page, queue_size=queue_size)
+    print(f"Finished streaming. Total rows loaded: {total_rows}")
+    return total_rows
+
+# --- Sync State Functions ---
+
+def truncate_table(engine: Engine, table_name: str, schema: str) -> None:
+    """ Empties a table while keeping its primary key and indexes. """
+    if not inspect(engine).has_table(table_name, schema=schema):
+        print(f"{schema}.{table_name} does not exist yet, nothing to truncate.")
+        return
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE TABLE {schema}.{table_name};"))
+    print(f"Truncated {schema}.{table_name}.")
+
+@contextmanager
+def reload_transaction(engine: Engine, spec: ObjectTypeSpec, schema: str) -> Iterator:
+    """
+    Yields a DB-API connection in which the spec's tables have been emptied.
+
+    Commits when the block completes and rolls back on any error, so a full
+    reload either replaces the data as a whole or leaves the previous data.
+    DELETE rather than TRUNCATE: readers keep seeing the old rows until the
+    commit instead of waiting on a lock for the whole pull.
+    """
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            for table_name in filter(None, (spec.table, spec.stedfesting_table)):
+                cursor.execute(f"DELETE FROM {schema}.{table_name};")
+        yield raw_connection
+        raw_connection.commit()
+    except BaseException:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+
+def get_high_water_mark(engine: Engine, object_id: str, table_name: str, schema: str) -> Optional[str]:
+    """
+    Returns the 'endret_etter' value for an incremental sync.
+
+    Reads the stored high-water mark from nvdb.sync_state, falling back to
+    max(sist_modifisert) in the target table. Returns None if neither exists.
+    """
+    timestamp_format = """'YYYY-MM-DD"T"HH24:MI:SS'"""
+    queries = [
+        (f"SELECT to_char(high_water_mark, {timestamp_format}) FROM nvdb.sync_state "
+         "WHERE nvdb_object_id = :object_id;"),
+        f"SELECT to_char(MAX(sist_modifisert), {timestamp_format}) FROM {schema}.{table_name};",
+    ]
+    for query in queries:
+        try:
+            with engine.connect() as connection:
+                high_water_mark = connection.execute(text(query), {'object_id': object_id}).scalar()
+            if high_water_mark:
+                return high_water_mark
+        except Exception as e:
+            print(f"Warning: Could not read high-water mark: {e}")
+    return None
+
+def refresh_rollup_after_sync(engine: Engine, changed_veglenker: Optional[set]) -> None:
+    """ Refreshes the hendelser rollup for years touched by the sync (all years when unknown). """
+    try:
+        if changed_veglenker is None:
+            refresh_rollup(engine)
+        else:
+            refresh_rollup(engine, years=years_for_veglenker(engine, changed_veglenker))
+    except Exception as e:
+        print(f"Warning: Could not refresh hendelser rollup: {e}")
+
+def save_high_water_mark(engine: Engine, object_id: str, table_name: str, schema: str, rows_synced: int) -> None:
+    """ Stores max(sist_modifisert) of the target table as the new high-water mark. """
+    upsert_sql = f"""
+    INSERT INTO nvdb.sync_state (nvdb_object_id, target_table, high_water_mark, last_run_at, rows_synced)
+    SELECT :object_id, :target_table, MAX(sist_modifisert), NOW(), :rows_synced
+    FROM {schema}.{table_name}
+    ON CONFLICT (nvdb_object_id) DO UPDATE SET
+        target_table = EXCLUDED.target_table,
+        high_water_mark = COALESCE(EXCLUDED.high_water_mark, sync_state.high_water_mark),
+        last_run_at = EXCLUDED.last_run_at,
+        rows_synced = EXCLUDED.rows_synced;
+    """
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(upsert_sql), {
+                'object_id': object_id,
+                'target_table': f"{schema}.{table_name}",
+                'rows_synced': rows_synced,
+            })
+        print(f"High-water mark saved for object type {object_id}.")
+    except Exception as e:
+        print(f"Warning: Could not save high-water mark: {e}")
+
+def sync_result(spec: ObjectTypeSpec, func, *args) -> Optional[int]:
+    """ Returns func(*args), or None after reporting an error, so one failed type never stops the others. """
+    try:
+        return func(*args)
+    except Exception as e:
+        print(f"{spec.name} sync failed, high-water mark not updated: {e}")
+        return None
 
 # --- Main Execution Logic ---
-def main():
-    """ Builds API params, fetches, processes, and loads data. """
+def build_api_params() -> dict:
+    """ Returns the NVDB query parameters shared by every object type. """
     api_params = {}
     if nvdb_param_inkluder: api_params['inkluder'] = nvdb_param_inkluder
     if nvdb_param_srid: api_params['srid'] = nvdb_param_srid
@@ -171,26 +506,82 @@ def main():
     if nvdb_param_trafikantgruppe: api_params['trafikantgruppe'] = nvdb_param_trafikantgruppe
     if nvdb_param_fylke: api_params['fylke'] = nvdb_param_fylke
     if nvdb_param_endret_etter: api_params['endret_etter'] = nvdb_param_endret_etter
+    return api_params
 
-    print(f"--- Configuration ---")
-    print(f"Fetching Object ID: {nvdb_object_id}")
-    print(f"Using API Params: {api_params}")
-    print(f"---------------------")
+def sync_object_type(spec: ObjectTypeSpec, engine: Engine, api_params: dict, schema: str = "nvdb") -> Optional[int]:
+    """
+    Fetches, processes and loads one object type page by page.
 
-    nvdb_objects = fetch_nvdb_data_paginated(nvdb_object_id, api_params)
-    if not nvdb_objects: return
+    Returns the number of rows synced, or None if the sync was aborted. The
+    high-water mark is only advanced after a complete sync.
+    """
+    object_id = str(spec.object_id)
+    target_table = spec.table
+    api_params = dict(api_params)
+    try:
+        ensure_object_table(engine, spec, schema)
+    except Exception as e:
+        print(f"Error creating/checking {schema}.{target_table}: {e}")
+        return None
+
+    if nvdb_sync_mode == 'incremental':
+        # Only fetch objects changed since the last sync and merge them on nvdb_id.
+        # An explicit NVDB_PARAM_ENDRET_ETTER always wins over the stored mark.
+        if 'endret_etter' not in api_params:
+            high_water_mark = get_high_water_mark(engine, object_id, target_table, schema)
+            if high_water_mark:
+                api_params['endret_etter'] = high_water_mark
+            else:
+                print(f"No high-water mark found for {spec.name}, running a full pull merged on nvdb_id.")
+        write_mode = 'upsert'
+    else:
+        # Full reload - emptied and refilled in one transaction (reload_transaction),
+        # so the primary key and indexes from the migrations survive.
+        write_mode = 'append'
 
-    df_nvdb = process_nvdb_objects(nvdb_objects)
-    if df_nvdb.empty: return
+    max_workers = int(nvdb_fetch_concurrency)
+    if max_workers > 1:
+        # Objects crossing a county border are returned once per fylke, so
+        # partitioned fetches always merge on nvdb_id.
+        write_mode = 'upsert'
 
-    print("\nProcessed Data Sample (first 5 rows):")
-    print(df_nvdb.head())
+    # Stream pages straight into the database as they arrive
+    if max_workers > 1:
+        partition_values = get_partition_values(api_params)
+        pages = iter_nvdb_pages_concurrent(object_id, api_params, partition_values, max_workers=max_workers)
+    else:
+        pages = iter_nvdb_pages(object_id, api_params)
+    # Times the HTTP fetch and decoding separately from processing and loading
+    pages = instrument_iterable('fetch_nvdb_pages', pages, bytes_counter=nvdb_bytes_received)
+    # An incremental pull only touches the veglenker of the changed objects,
+    # so only the rollup years with hendelser on those need recomputing.
+    changed_veglenker = set() if 'endret_etter' in api_params and nvdb_sync_mode == 'incremental' else None
+    transaction = reload_transaction(engine, spec, schema) if nvdb_sync_mode == 'full' else nullcontext()
+    try:
+        with transaction as connection:
+            rows_synced = stream_nvdb_to_postgres(pages, engine, target_table, schema=schema, if_exists=write_mode,
+                                                  changed_veglenker=changed_veglenker, spec=spec, connection=connection)
+        save_high_water_mark(engine, object_id, target_table, schema, rows_synced)
+        if spec.refreshes_rollup:
+            refresh_rollup_after_sync(engine, changed_veglenker)
+        return rows_synced
+    except NvdbFetchError as e:
+        print(f"{spec.name} sync aborted, high-water mark not updated: {e}")
+        print(f"Failed cursor: {e.resume_url}")
+    except RuntimeError as e:
+        print(f"{spec.name} sync aborted, high-water mark not updated: {e}")
+    return None
 
+def main() -> bool:
+    """
+    Builds API params, then syncs every configured object type, several at a time.
+    Returns True if every type synced.
+    """
+    api_params = build_api_params()
     db_engine = get_db_engine(username, password, host, port, database)
     
     if db_engine:
         target_schema = "nvdb"
-        target_table = "vegobjekter_fartsgrense" # **UPDATED**
         
         # Ensure schema exists (Goose should do this, but doesn't hurt)
         try:
@@ -201,16 +592,47 @@ def main():
                 print(f"'{target_schema}' schema confirmed.")
         except Exception as e:
             print(f"Error creating/checking schema: {e}")
-            db_engine.dispose()
-            return
+            return False
 
-        # Load data - Using 'replace' for easy re-runs during testing. 
-        # Change to 'append' if you want to add data incrementally.
-        load_df_to_postgres(df_nvdb, target_table, db_engine, schema=target_schema, if_exists='replace') 
-        
-        db_engine.dispose()
-        print("\nDatabase connection closed.")
+        specs = configured_object_types()
+        type_workers = min(int(nvdb_object_type_concurrency), len(specs))
+
+        print(f"--- Configuration ---")
+        print(f"Object types: {', '.join(f'{spec.object_id} ({spec.name})' for spec in specs)}")
+        print(f"Sync mode: {nvdb_sync_mode}")
+        print(f"PostGIS geometry: {'on' if nvdb_postgis else 'off'}")
+        print(f"Object type concurrency: {type_workers}")
+        print(f"Fetch concurrency: {nvdb_fetch_concurrency}")
+        print(f"Pipeline queue size: {nvdb_pipeline_queue_size}")
+        print(f"Using API Params: {api_params}")
+        print(f"---------------------")
+
+        try:
+            if type_workers > 1:
+                # Every type shares the NVDB session, the engine's pool and the COPY
+                # path. Each task runs in a copy of the current context, so the
+                # connections keep cli.py's phase tag.
+                with ThreadPoolExecutor(max_workers=type_workers, thread_name_prefix='nvdb-type') as executor:
+                    futures = [
+                        executor.submit(contextvars.copy_context().run, sync_object_type,
+                                        spec, db_engine, api_params, target_schema)
+                        for spec in specs
+                    ]
+                    rows_by_type = {spec.name: sync_result(spec, future.result) for spec, future in zip(specs, futures)}
+            else:
+                rows_by_type = {spec.name: sync_result(spec, sync_object_type, spec, db_engine, api_params, target_schema)
+                                for spec in specs}
+        finally:
+            print(f"NVDB client stats: {get_nvdb_client().stats.as_dict()}")
+
+        for name, rows_synced in rows_by_type.items():
+            print(f"{name}: {'aborted' if rows_synced is None else f'{rows_synced} rows synced'}")
+        return all(rows_synced is not None for rows_synced in rows_by_type.values())
+
+    return False
 
 # --- Script Entry Point ---
 if __name__ == "__main__":
-    main()
+    # Same as 'python cli.py sync': loads .env and validates the settings first
+    import cli
+    sys.exit(cli.main(['sync']))
@@ -0,0 +1,63 @@
+"""
+Applies the goose migrations in sql/schema to a benchmark database.
+
+Only the '-- +goose Up' section of each file is run, in file order. Every
+migration is idempotent (IF NOT EXISTS / guarded DO blocks), so re-running
+against an existing database is safe. Use goose itself for real databases;
+this exists so the benchmark suite can bootstrap a throwaway container
+without extra tooling.
+
+Usage:
+    python benchmarks/apply_migrations.py    # BENCH_DATABASE_URL or the compose container
+"""
+import glob
+import os
+
+from sqlalchemy import Engine
+
+SCHEMA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'sql', 'schema'))
+
+def goose_up_sql(path: str) -> str:
+    """ Returns the '-- +goose Up' section of a migration file. """
+    up_lines = []
+    in_up = False
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            marker = line.strip()
+            if marker.startswith('-- +goose Up'):
+                in_up = True
+            elif marker.startswith('-- +goose Down'):
+                break
+            elif in_up:
+                # StatementBegin/End are plain comments to PostgreSQL
+                up_lines.append(line)
+    return "".join(up_lines)
+
+def apply_migrations(engine: Engine, schema_dir: str = SCHEMA_DIR) -> list:
+    """ Runs every migration's Up section in order, each in its own transaction. Returns the files applied. """
+    applied = []
+    raw_connection = engine.raw_connection()
+    try:
+        for path in sorted(glob.glob(os.path.join(schema_dir, '*.sql'))):
+            with raw_connection.cursor() as cursor:
+                cursor.execute(goose_up_sql(path))
+            raw_connection.commit()
+            applied.append(os.path.basename(path))
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+    return applied
+
+if __name__ == "__main__":
+    import sys
+    from sqlalchemy import create_engine
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from benchmarks.run_pipeline import database_url
+
+    engine = create_engine(database_url())
+    for name in apply_migrations(engine):
+        print(f"Applied {name}")
+    engine.dispose()
@@ -0,0 +1,91 @@
+"""
+Benchmark: DataFrame.to_sql(chunksize=1000) vs. COPY FROM STDIN.
+
+Loads the same synthetic vegobjekter_fartsgrense-shaped DataFrame through both
+paths into a scratch table and prints rows/sec for each.
+
+Usage:
+    python benchmarks/bench_bulk_load.py --rows 100000
+
+Uses the POSTGRES_* variables from .env. Run it against a local/test database,
+the scratch table is dropped and recreated on every run.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bulk_load import bulk_load_df
+
+BENCH_SCHEMA = "nvdb"
+BENCH_TABLE = "bench_bulk_load"
+
+def make_fartsgrense_df(rows: int, seed: int = 42) -> pd.DataFrame:
+    """ Creates a synthetic DataFrame with the same columns and dtypes as process_nvdb_objects. """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'nvdb_id': pd.array(np.arange(1, rows + 1), dtype='Int64'),
+        'vegkategori': rng.choice(['E', 'R', 'F', 'K', 'P', 'S'], size=rows),
+        'fylke': pd.array(rng.choice([3, 11, 15, 18, 31, 32, 33, 34, 39, 40, 42, 46, 50, 55, 56], size=rows), dtype='Int64'),
+        'kommune': pd.array(rng.integers(301, 5636, size=rows), dtype='Int64'),
+        'veglenkesekvensid': pd.array(rng.integers(1, 3_000_000, size=rows), dtype='Int64'),
+        'startdato': pd.to_datetime('2015-01-01') + pd.to_timedelta(rng.integers(0, 3000, size=rows), unit='D'),
+        'sist_modifisert': pd.to_datetime('2023-01-01') + pd.to_timedelta(rng.integers(0, 600, size=rows), unit='D'),
+        'geometri_wkt': 'LINESTRING Z (262214.6 6649934.9 111.3, 262240.1 6649958.2 112.0)',
+        'fartsgrense': pd.array(rng.choice([30, 40, 50, 60, 70, 80, 90, 100, 110], size=rows), dtype='Int64'),
+    })
+    # Sprinkle in NULLs so the nullable integer path is exercised
+    df.loc[df.sample(frac=0.05, random_state=seed).index, ['veglenkesekvensid', 'fartsgrense']] = pd.NA
+    return df
+
+def time_load(label: str, load, engine, rows: int) -> float:
+    """ Runs a load function against an empty scratch table and prints rows/sec. """
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {BENCH_SCHEMA}.{BENCH_TABLE}"))
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f} s  {rows / elapsed:12,.0f} rows/sec")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help="Number of synthetic rows to load")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_url = (
+        f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
+        f"@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}?sslmode=disable"
+    )
+    engine = create_engine(db_url)
+    df = make_fartsgrense_df(args.rows)
+    print(f"Loading {args.rows:,} rows into {BENCH_SCHEMA}.{BENCH_TABLE}\n")
+
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}"))
+
+    to_sql_seconds = time_load(
+        "to_sql(chunksize=1000)",
+        lambda: df.to_sql(BENCH_TABLE, engine, schema=BENCH_SCHEMA, if_exists='replace', index=False, chunksize=1000),
+        engine, args.rows
+    )
+    copy_seconds = time_load(
+        "COPY (bulk_load_df)",
+        lambda: bulk_load_df(df, BENCH_TABLE, engine, schema=BENCH_SCHEMA, if_exists='replace'),
+        engine, args.rows
+    )
+    print(f"\nSpeedup: {to_sql_seconds / copy_seconds:.1f}x")
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {BENCH_SCHEMA}.{BENCH_TABLE}"))
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: NVDB page decoding and object extraction.
+
+Compares the previous process_nvdb_objects (per-object dict building with a
+name scan per property, then to_numeric/to_datetime passes over the frame)
+with the compiled single-pass extractor, and json vs. orjson decoding, on a
+synthetic fartsgrense fixture.
+
+Usage:
+    python benchmarks/bench_process_nvdb_objects.py --objects 500000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from nvdb_extract import build_extractor, INT
+from benchmarks.synthetic import make_nvdb_objects
+
+FARTSGRENSE_PROPERTIES = {'fartsgrense': (2021, 'Fartsgrense', INT)}
+
+# --- Previous implementation, kept here for comparison ---
+
+def legacy_get_property(obj, prop_name):
+    try:
+        for prop in obj.get('egenskaper', []):
+            if prop.get('navn', '').lower() == prop_name.lower():
+                return prop.get('verdi')
+        return None
+    except Exception:
+        return None
+
+def legacy_get_veglenke(obj):
+    stedfestinger = obj.get('lokasjon', {}).get('stedfestinger', [])
+    return stedfestinger[0].get('veglenkesekvensid') if stedfestinger else None
+
+def legacy_process_nvdb_objects(objects):
+    processed_list = []
+    for obj in objects:
+        processed_list.append({
+            'nvdb_id': obj.get('id'),
+            'vegkategori': obj.get('lokasjon', {}).get('vegsystemreferanser', [{}])[0].get('vegsystem', {}).get('vegkategori'),
+            'fylke': obj.get('lokasjon', {}).get('fylker', [None])[0],
+            'kommune': obj.get('lokasjon', {}).get('kommuner', [None])[0],
+            'veglenkesekvensid': legacy_get_veglenke(obj),
+            'startdato': obj.get('metadata', {}).get('startdato'),
+            'sist_modifisert': obj.get('metadata', {}).get('sist_modifisert'),
+            'geometri_wkt': obj.get('geometri', {}).get('wkt'),
+            'fartsgrense': legacy_get_property(obj, 'Fartsgrense'),
+        })
+    if not processed_list: return pd.DataFrame()
+    df = pd.DataFrame(processed_list)
+    df['startdato'] = pd.to_datetime(df['startdato'], errors='coerce')
+    df['sist_modifisert'] = pd.to_datetime(df['sist_modifisert'], errors='coerce')
+    df['fartsgrense'] = pd.to_numeric(df['fartsgrense'], errors='coerce')
+    df['nvdb_id'] = pd.to_numeric(df['nvdb_id'], errors='coerce').astype('Int64')
+    df['veglenkesekvensid'] = pd.to_numeric(df['veglenkesekvensid'], errors='coerce').astype('Int64')
+    df['fylke'] = pd.to_numeric(df['fylke'], errors='coerce').astype('Int64')
+    df['kommune'] = pd.to_numeric(df['kommune'], errors='coerce').astype('Int64')
+    return df
+
+def timed(label: str, func, *args):
+    """ Times one call with the garbage collector paused, so runs are comparable. """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    print(f"{label:<34} {elapsed:8.2f} s")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=500_000, help="Number of synthetic objects")
+    parser.add_argument('--page-size', type=int, default=1000, help="Objects per encoded page for the decode benchmark")
+    args = parser.parse_args()
+
+    print(f"Generating {args.objects:,} synthetic fartsgrense objects...\n")
+    objects = make_nvdb_objects(args.objects)
+    pages = [
+        json.dumps({'objekter': objects[i:i + args.page_size]}).encode('utf-8')
+        for i in range(0, len(objects), args.page_size)
+    ]
+
+    _, json_seconds = timed("decode: json.loads", lambda: [json.loads(page) for page in pages])
+    try:
+        import orjson
+        _, orjson_seconds = timed("decode: orjson.loads", lambda: [orjson.loads(page) for page in pages])
+        print(f"{'decode speedup':<34} {json_seconds / orjson_seconds:8.1f}x\n")
+    except ImportError:
+        print("decode: orjson not installed, skipped\n")
+
+    legacy_df, legacy_seconds = timed("extract: legacy process_nvdb_objects", legacy_process_nvdb_objects, objects)
+    extract = build_extractor(FARTSGRENSE_PROPERTIES)
+    compiled_df, compiled_seconds = timed("extract: compiled extractor", extract, objects)
+    print(f"{'extract speedup':<34} {legacy_seconds / compiled_seconds:8.1f}x")
+
+    # Both paths must agree on the values they extract
+    pd.testing.assert_frame_equal(
+        legacy_df.astype({'fartsgrense': 'Int64'}), compiled_df, check_dtype=False
+    )
+
+if __name__ == "__main__":
+    main()
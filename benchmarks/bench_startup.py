@@ -0,0 +1,83 @@
+"""
+Benchmark: start-up time of the CLI and the pipeline modules.
+
+Runs each target in a fresh interpreter under 'python -X importtime' and
+prints the wall time, the total import time and the slowest imports, so a
+heavy import sneaking into the CLI's start-up path shows up immediately.
+
+    cli --help       the entry point alone (must not import pandas/SQLAlchemy/matplotlib)
+    import <module>  what each subcommand pays before doing any work
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 5 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TARGETS = {
+    'cli --help': ['cli.py', '--help'],
+    'import api_to_database': ['-c', 'import api_to_database'],
+    'import load_and_check': ['-c', 'import load_and_check'],
+    'import main': ['-c', 'import main'],
+    'import report': ['-c', 'import report'],
+}
+# Must never be imported just to print the CLI help
+HEAVY_MODULES = ('pandas', 'sqlalchemy', 'matplotlib', 'pyarrow')
+
+def parse_importtime(stderr: str) -> dict:
+    """ Parses '-X importtime' output into {module: (cumulative_us, top_level)}. """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level
+        imports[name.strip()] = (int(cumulative_us), not name[1:].startswith(' '))
+    return imports
+
+def run_target(args: list) -> tuple:
+    """ Runs one target in a fresh interpreter; returns (wall seconds, parsed imports). """
+    # No settings: start-up must not depend on .env or exit when it is missing
+    env = {'PATH': os.environ.get('PATH', ''), 'MPLBACKEND': 'Agg'}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per target; the median is reported")
+    parser.add_argument('--top', type=int, default=8, help="Slowest imports (cumulative) to list per target")
+    args = parser.parse_args()
+
+    failed = False
+    for label, target_args in TARGETS.items():
+        runs = [run_target(target_args) for _ in range(args.repeat)]
+        wall = statistics.median(elapsed for elapsed, _ in runs)
+        imports = runs[-1][1]
+        # Top-level imports' cumulative times add up to the total import time
+        total_us = sum(cumulative for cumulative, top_level in imports.values() if top_level)
+        print(f"\n{label:<26} {wall * 1000:8.1f} ms wall  {total_us / 1000:8.1f} ms importing  {len(imports)} modules")
+        for name, (cumulative, _) in sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+        if label == 'cli --help':
+            heavy = sorted(name for name in imports if name.split('.')[0] in HEAVY_MODULES)
+            if heavy:
+                failed = True
+                print(f"    Error: the CLI start-up imports {', '.join(heavy[:5])}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Synthetic NVDB and hendelser data for the benchmarks.
+
+Everything is deterministic for a given seed, so runs on different commits
+load exactly the same data. Hendelser rows reference the same
+veglenkesekvensid range as the generated fartsgrense objects, so the
+main.py join finds matches at every scale.
+"""
+import csv
+import os
+from typing import Iterator
+
+import numpy as np
+
+FYLKER = [3, 11, 15, 18, 31, 32, 33, 34, 39, 40, 42, 46, 50, 55, 56]
+HENDELSER_YEARS = [2022, 2023, 2024, 2025, 2026]
+HENDELSER_COLUMNS = ['veglenkesekvensid', 'relativ_posisjon', 'vegvedlikehold', 'rand_float', 'year']
+# Three fartsgrense objects share each veglenkesekvens
+FIRST_VEGLENKE = 1_000_000
+OBJECTS_PER_VEGLENKE = 3
+
+def veglenke_count(objects: int) -> int:
+    """ Returns how many distinct veglenkesekvenser 'objects' fartsgrense objects cover. """
+    return max(1, -(-objects // OBJECTS_PER_VEGLENKE))
+
+def make_nvdb_object(i: int) -> dict:
+    """ Creates one synthetic fartsgrense object shaped like the NVDB v3 API with inkluder=alle. """
+    fylke = FYLKER[i % len(FYLKER)]
+    return {
+        'id': 80_000_000 + i,
+        'href': f"https://nvdbapiles-v3.atlas.vegvesen.no/vegobjekter/105/{80_000_000 + i}/1",
+        'metadata': {
+            'type': {'id': 105, 'navn': 'Fartsgrense'},
+            'versjon': 1,
+            'startdato': '2019-01-01',
+            'sist_modifisert': f"2023-{1 + i % 12:02d}-{1 + i % 28:02d}T10:{i % 60:02d}:00",
+        },
+        'egenskaper': [
+            {'id': 5127, 'navn': 'Vedtaksnummer', 'egenskapstype': 'Tekst', 'verdi': f"V-{i}"},
+            {'id': 10278, 'navn': 'Arkivnummer', 'egenskapstype': 'Tekst', 'verdi': f"A-{i}"},
+            {'id': 4368, 'navn': 'Gyldig fra dato', 'egenskapstype': 'Dato', 'verdi': '2019-01-01'},
+            {'id': 2021, 'navn': 'Fartsgrense', 'egenskapstype': 'Tekstenum', 'verdi': (3 + i % 9) * 10, 'enum_id': 11576},
+            {'id': 11010, 'navn': 'Kommentar', 'egenskapstype': 'Tekst', 'verdi': 'Syntetisk'},
+            {'id': 1, 'navn': 'Liste av lokasjonsattributt', 'egenskapstype': 'Liste', 'innhold': []},
+        ],
+        'lokasjon': {
+            'kommuner': [fylke * 100 + 1],
+            'fylker': [fylke],
+            'vegsystemreferanser': [{'vegsystem': {'vegkategori': 'EFKRPS'[i % 6], 'fase': 'V', 'nummer': i % 900}}],
+            'stedfestinger': [{
+                'type': 'Linje', 'veglenkesekvensid': FIRST_VEGLENKE + i // OBJECTS_PER_VEGLENKE,
+                'startposisjon': (i % 3) / 3, 'sluttposisjon': (i % 3 + 1) / 3, 'retning': 'MED',
+            }],
+            'lengde': 123.4,
+        },
+        'geometri': {'wkt': 'LINESTRING Z (262214.6 6649934.9 111.3, 262240.1 6649958.2 112.0)', 'srid': 5973},
+    }
+
+def make_nvdb_objects(count: int) -> list:
+    """ Creates 'count' synthetic fartsgrense objects. """
+    return [make_nvdb_object(i) for i in range(count)]
+
+def make_objects_by_fylke(count: int) -> dict:
+    """ Creates 'count' synthetic objects grouped by fylke, as served by tests/fake_nvdb.FakeNvdbServer. """
+    objects_by_fylke = {fylke: [] for fylke in FYLKER}
+    for i in range(count):
+        obj = make_nvdb_object(i)
+        objects_by_fylke[obj['lokasjon']['fylker'][0]].append(obj)
+    return objects_by_fylke
+
+def iter_hendelser_chunks(rows: int, veglenker: int, seed: int = 42, chunk_rows: int = 1_000_000) -> Iterator[list]:
+    """ Yields synthetic hendelser rows as column lists, 'chunk_rows' at a time. """
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - start)
+        yield [
+            rng.integers(FIRST_VEGLENKE, FIRST_VEGLENKE + veglenker, size=size),
+            rng.random(size).round(6),
+            rng.choice(['ja', 'nei'], size=size),
+            rng.random(size).round(6),
+            rng.choice(HENDELSER_YEARS, size=size),
+        ]
+
+def write_hendelser_csv(path: str, rows: int, veglenker: int, seed: int = 42) -> int:
+    """
+    Writes a synthetic hendelser.csv with the columns load_csv_to_hendelser expects.
+
+    Rows are generated and written in chunks, so 10M-row files never sit in
+    memory at once. Returns the file size in bytes.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HENDELSER_COLUMNS)
+        for columns in iter_hendelser_chunks(rows, veglenker, seed=seed):
+            writer.writerows(zip(*(column.tolist() for column in columns)))
+    return os.path.getsize(path)
@@ -0,0 +1,148 @@
+import tempfile
+from typing import Optional, Sequence
+import pandas as pd
+from sqlalchemy import Engine
+
+# --- COPY Settings ---
+# NULL marker used in the COPY stream. Empty strings stay empty strings.
+COPY_NULL = r'\N'
+# Rows written to the buffer per COPY round trip
+COPY_CHUNK_ROWS = 50_000
+# Buffer is kept in memory up to this size, then spooled to a temp file
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# --- Helper Functions ---
+
+def _quote_ident(name: str) -> str:
+    """ Quotes a PostgreSQL identifier. """
+    return '"' + name.replace('"', '""') + '"'
+
+def qualified_table_name(table_name: str, schema: Optional[str] = None) -> str:
+    """ Returns the quoted 'schema.table' name used in generated SQL. """
+    if schema:
+        return f"{_quote_ident(schema)}.{_quote_ident(table_name)}"
+    return _quote_ident(table_name)
+
+def write_copy_buffer(df: pd.DataFrame, buffer) -> None:
+    """
+    Writes a DataFrame to a buffer in the CSV format expected by COPY.
+
+    Missing values (Int64 <NA>, NaN, NaT, None) are all written as the NULL
+    marker. Integer columns must use the nullable Int64 dtype: a float64
+    column holding whole numbers is written as '1.0', which COPY rejects for
+    INTEGER/BIGINT columns.
+    """
+    df.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+
+def copy_df(cursor, df: pd.DataFrame, table_name: str, schema: Optional[str] = None,
+            chunk_rows: int = COPY_CHUNK_ROWS) -> int:
+    """
+    Streams a DataFrame into an existing table using COPY FROM STDIN.
+
+    Uses an open DB-API (psycopg2) cursor and does not commit, so the caller
+    owns the transaction. Returns the number of rows copied.
+    """
+    if df.empty:
+        return 0
+
+    columns = ", ".join(_quote_ident(col) for col in df.columns)
+    copy_sql = (
+        f"COPY {qualified_table_name(table_name, schema)} ({columns}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+', newline='') as buffer:
+            write_copy_buffer(chunk, buffer)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+    return len(df)
+
+def copy_df_to_postgres(df: pd.DataFrame, table_name: str, engine: Engine, schema: Optional[str] = None,
+                        chunk_rows: int = COPY_CHUNK_ROWS) -> int:
+    """ Copies a DataFrame into an existing table in a single transaction. """
+    if df.empty:
+        return 0
+
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            rows = copy_df(cursor, df, table_name, schema=schema, chunk_rows=chunk_rows)
+        raw_connection.commit()
+        return rows
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+
+def bulk_load_df(df: pd.DataFrame, table_name: str, engine: Engine, schema: Optional[str] = None,
+                 if_exists: str = 'append', chunk_rows: int = COPY_CHUNK_ROWS) -> int:
+    """
+    Drop-in replacement for DataFrame.to_sql that loads rows through COPY.
+
+    The table is created (or replaced) from the DataFrame's columns exactly
+    like to_sql would, by writing zero rows; the data itself is then copied.
+    """
+    if df.empty:
+        return 0
+
+    df.head(0).to_sql(table_name, engine, schema=schema, if_exists=if_exists, index=False)
+    return copy_df_to_postgres(df, table_name, engine, schema=schema, chunk_rows=chunk_rows)
+
+def upsert_df(cursor, df: pd.DataFrame, table_name: str, schema: Optional[str] = None,
+              key_columns: Sequence[str] = ('nvdb_id',), chunk_rows: int = COPY_CHUNK_ROWS) -> int:
+    """
+    Merges a DataFrame into a table through a temporary staging table.
+
+    Rows are COPYed into a staging table shaped like the target, then merged
+    with INSERT ... ON CONFLICT (key) DO UPDATE. Duplicate keys within the
+    batch are collapsed so the merge never touches a row twice. Uses an open
+    DB-API cursor and does not commit. Returns the number of rows merged.
+    """
+    if df.empty:
+        return 0
+
+    target = qualified_table_name(table_name, schema)
+    staging_name = f"_staging_{table_name}"
+    staging = _quote_ident(staging_name)
+    columns = [_quote_ident(col) for col in df.columns]
+    keys = [_quote_ident(col) for col in key_columns]
+    updates = [col for col in columns if col not in keys]
+
+    column_list = ", ".join(columns)
+    key_list = ", ".join(keys)
+    if updates:
+        conflict_action = "DO UPDATE SET " + ", ".join(f"{col} = EXCLUDED.{col}" for col in updates)
+    else:
+        conflict_action = "DO NOTHING"
+
+    cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP")
+    copy_df(cursor, df, staging_name, chunk_rows=chunk_rows)
+    cursor.execute(
+        f"INSERT INTO {target} ({column_list}) "
+        f"SELECT DISTINCT ON ({key_list}) {column_list} FROM {staging} ORDER BY {key_list} "
+        f"ON CONFLICT ({key_list}) {conflict_action}"
+    )
+    merged = cursor.rowcount
+    cursor.execute(f"DROP TABLE {staging}")
+    return merged
+
+def upsert_df_to_postgres(df: pd.DataFrame, table_name: str, engine: Engine, schema: Optional[str] = None,
+                          key_columns: Sequence[str] = ('nvdb_id',), chunk_rows: int = COPY_CHUNK_ROWS) -> int:
+    """ Merges a DataFrame into an existing table in a single transaction. """
+    if df.empty:
+        return 0
+
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            rows = upsert_df(cursor, df, table_name, schema=schema, key_columns=key_columns, chunk_rows=chunk_rows)
+        raw_connection.commit()
+        return rows
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
@@ -0,0 +1,129 @@
+"""
+Single entry point for the pipeline.
+
+    python cli.py sync                 fetch the NVDB object types in NVDB_OBJECT_ID into PostgreSQL (api_to_database.py)
+    python cli.py load [--csv PATH]    load hendelser.csv into nvdb.hendelser (load_and_check.py)
+    python cli.py check                print a sample of nvdb.vegobjekter_fartsgrense
+    python cli.py report               render the report charts (main.py)
+    python cli.py run                  sync, load, then report
+
+Settings come from the environment and .env, read when a subcommand runs.
+Each subcommand imports only the modules it needs, so '--help' and argument
+errors return without loading pandas, SQLAlchemy or matplotlib.
+
+All phases of one invocation share a single pooled engine (db.py); its
+connections are tagged with the phase and closed once when the command ends.
+"""
+import argparse
+import contextlib
+import sys
+from typing import Optional
+
+from config import ConfigError, load_env
+
+# --- Subcommands ---
+# Each run_* returns True if every phase it ran succeeded
+
+def phase(name: str):
+    """ Tags the database connections used inside the block with the phase name. """
+    if 'db' not in sys.modules:
+        # Nothing imported the database layer (e.g. an offline report)
+        return contextlib.nullcontext()
+    return sys.modules['db'].phase(name)
+
+def run_sync(args: argparse.Namespace) -> bool:
+    import api_to_database
+    api_to_database.check_config()
+    with phase('sync'):
+        return api_to_database.main()
+
+def run_load(args: argparse.Namespace) -> bool:
+    import load_and_check
+    load_and_check.check_config()
+    with phase('load'):
+        ok = load_and_check.main(load=True, check=False, csv_path=args.csv, bulk=args.bulk or None)
+    if args.check:
+        with phase('check'):
+            ok = load_and_check.main(load=False, check=True) and ok
+    return ok
+
+def run_check(args: argparse.Namespace) -> bool:
+    import load_and_check
+    load_and_check.check_config()
+    with phase('check'):
+        return load_and_check.main(load=False, check=True)
+
+def run_report(args: argparse.Namespace) -> bool:
+    import main as report_main
+    offline = args.offline or report_main.report_offline
+    report_main.check_config(offline=offline)
+    with phase('report'):
+        return report_main.main(
+            export_details=args.export_details or report_main.report_export_details,
+            cache_dir=args.cache_dir or report_main.report_cache_dir,
+            offline=offline,
+        )
+
+def run_all(args: argparse.Namespace) -> bool:
+    # Validate every step up front, so a bad setting never leaves a half-run pipeline
+    import api_to_database, load_and_check, main as report_main
+    api_to_database.check_config()
+    load_and_check.check_config()
+    report_main.check_config(offline=False)
+    # Every phase checks connections out of the same pool. A failed phase does not
+    # stop the later ones, but fails the run.
+    with phase('sync'):
+        ok = api_to_database.main()
+    with phase('load'):
+        ok = load_and_check.main(load=True, check=False, csv_path=args.csv, bulk=args.bulk or None) and ok
+    with phase('report'):
+        ok = report_main.main(offline=False) and ok
+    return ok
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--env-file', help="Settings file to load (default: the nearest .env)")
+    subcommands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    subcommands.add_parser('sync', help="Fetch NVDB objects into PostgreSQL").set_defaults(func=run_sync)
+
+    # Same as load_and_check.HENDELSER_CSV_PATH, which is only imported once a subcommand runs
+    csv_default = 'sql/hendelser.csv'
+    load = subcommands.add_parser('load', help="Load hendelser.csv into nvdb.hendelser")
+    load.add_argument('--csv', default=csv_default, help=f"CSV file to load (default: {csv_default})")
+    load.add_argument('--bulk', action='store_true', help="Replace partitions and build indexes after the load (HENDELSER_BULK_LOAD)")
+    load.add_argument('--check', action='store_true', help="Also run 'check' afterwards")
+    load.set_defaults(func=run_load)
+
+    subcommands.add_parser('check', help="Print a sample of the synced fartsgrense objects").set_defaults(func=run_check)
+
+    report = subcommands.add_parser('report', help="Render the report charts")
+    report.add_argument('--export-details', action='store_true', help="Also export the joined rows (REPORT_EXPORT_DETAILS)")
+    report.add_argument('--cache-dir', help="Local Parquet cache directory (REPORT_CACHE_DIR)")
+    report.add_argument('--offline', action='store_true', help="Report from the cache only (REPORT_OFFLINE)")
+    report.set_defaults(func=run_report)
+
+    run = subcommands.add_parser('run', help="Sync, load, then report")
+    run.add_argument('--csv', default=csv_default, help=f"CSV file to load (default: {csv_default})")
+    run.add_argument('--bulk', action='store_true', help="Load hendelser in bulk mode")
+    run.set_defaults(func=run_all)
+    return parser
+
+def main(argv: Optional[list] = None) -> int:
+    """ Parses the arguments, loads .env and runs one subcommand. Returns the exit code: 1 if any phase failed. """
+    args = build_parser().parse_args(argv)
+    load_env(args.env_file)
+    try:
+        ok = args.func(args)
+    except ConfigError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        # Once per invocation, after every phase is done with the shared pool
+        if 'db' in sys.modules and sys.modules['db'].dispose_engines():
+            print("\nDatabase connections closed.")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
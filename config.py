@@ -0,0 +1,39 @@
+from typing import Optional
+
+# --- Settings Loading ---
+# The pipeline modules read their settings from os.environ when imported and
+# never load .env or exit themselves: cli.py calls load_env() first, then
+# imports only the module a subcommand needs and validates it with
+# check_config().
+
+DB_SETTINGS = ["POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_PORT", "POSTGRES_DB"]
+
+class ConfigError(Exception):
+    """ Raised when a required setting is missing or invalid. """
+
+_env_loaded = False
+
+def load_env(path: Optional[str] = None) -> None:
+    """ Loads .env into os.environ once. Variables that are already set always win. """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv(path)
+    _env_loaded = True
+
+def require_db_settings(values: dict) -> None:
+    """ Raises ConfigError unless every POSTGRES_* value in 'values' (setting name -> value) is set. """
+    missing = [name for name in DB_SETTINGS if not values.get(name)]
+    if missing:
+        raise ConfigError(f"Database environment variables missing ({', '.join(missing)}). Check .env file.")
+
+def require_int(name: str, value, minimum: int = 0) -> int:
+    """ Returns a setting as an int. Raises ConfigError unless it is an integer of at least 'minimum'. """
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or number < minimum:
+        raise ConfigError(f"{name} must be an integer of at least {minimum}. Check .env file.")
+    return number
@@ -0,0 +1,128 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import create_engine, event, Engine
+from config import require_int
+
+# --- Engine Settings ---
+# Read once at import, like the other pipeline settings; cli.py loads .env first
+# and check_config() validates them before any engine is created.
+db_pool_size = os.getenv("DB_POOL_SIZE", "5")
+db_max_overflow = os.getenv("DB_MAX_OVERFLOW", "10")
+# Recycle connections before a firewall or pgbouncer drops them silently; -1 turns it off
+db_pool_recycle = os.getenv("DB_POOL_RECYCLE", "1800")
+# Server-side limit per statement in milliseconds; 0 turns it off
+db_statement_timeout_ms = os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")
+db_application_name = os.getenv("DB_APPLICATION_NAME", "nvdb-pipeline")
+# Rows per INSERT ... VALUES page (and per execute_batch page for UPDATE/DELETE) in executemany
+db_executemany_page_size = os.getenv("DB_EXECUTEMANY_PAGE_SIZE", "1000")
+
+def check_config() -> None:
+    """ Raises ConfigError if an engine setting is invalid. Called by the pipeline modules' check_config(). """
+    require_int("DB_POOL_SIZE", db_pool_size, minimum=1)
+    require_int("DB_MAX_OVERFLOW", db_max_overflow)
+    require_int("DB_POOL_RECYCLE", db_pool_recycle, minimum=-1)
+    require_int("DB_STATEMENT_TIMEOUT_MS", db_statement_timeout_ms)
+    require_int("DB_EXECUTEMANY_PAGE_SIZE", db_executemany_page_size, minimum=1)
+
+# --- Connection URL ---
+
+def database_url(user, pwd, hst, p, db) -> str:
+    """ Returns the psycopg2 URL with sslmode=disable. The driver is explicit: COPY needs psycopg2. """
+    return f"postgresql+psycopg2://{user}:{pwd}@{hst}:{p}/{db}?sslmode=disable"
+
+# --- Phase Tagging ---
+# Connections are tagged with the running phase, e.g. 'nvdb-pipeline:sync', so
+# pg_stat_activity and the server log show which step a query belongs to.
+# A checkout only re-tags a pooled connection when the phase has changed.
+_current_phase: ContextVar[Optional[str]] = ContextVar('db_phase', default=None)
+
+def application_name(phase_name: Optional[str] = None, base: Optional[str] = None) -> str:
+    """ Returns the application_name for a phase, truncated to PostgreSQL's 63 bytes. """
+    name = base or db_application_name
+    if phase_name:
+        name = f"{name}:{phase_name}"
+    return name.encode()[:63].decode(errors='ignore')
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """ Tags every connection checked out inside the block with 'name'. """
+    token = _current_phase.set(name)
+    try:
+        yield
+    finally:
+        _current_phase.reset(token)
+
+def _listen_for_phases(engine: Engine, base: str) -> None:
+    """ Keeps the application_name of pooled connections in step with the current phase. """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Set through connect_args, so a fresh connection needs no round trip
+        connection_record.info['application_name'] = application_name(base=base)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        name = application_name(_current_phase.get(), base=base)
+        if connection_record.info.get('application_name') == name:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT set_config('application_name', %s, false)", (name,))
+        finally:
+            cursor.close()
+        # Commit so a later rollback on this connection cannot undo the tag
+        dbapi_connection.commit()
+        connection_record.info['application_name'] = name
+
+# --- Engines ---
+
+def create_db_engine(url: str, app_name: Optional[str] = None,
+                     statement_timeout_ms: Optional[int] = None) -> Engine:
+    """
+    Creates a pooled engine tuned for the pipeline: pre-ping and recycling of
+    idle connections, psycopg2 execute_values batching for executemany, and a
+    statement_timeout and application_name set on every new connection.
+    """
+    base = app_name or db_application_name
+    timeout_ms = int(db_statement_timeout_ms) if statement_timeout_ms is None else statement_timeout_ms
+    connect_args = {'application_name': application_name(base=base)}
+    if timeout_ms > 0:
+        connect_args['options'] = f"-c statement_timeout={timeout_ms}"
+
+    engine = create_engine(
+        url,
+        pool_size=int(db_pool_size),
+        max_overflow=int(db_max_overflow),
+        pool_recycle=int(db_pool_recycle),
+        pool_pre_ping=True,
+        executemany_mode='values_plus_batch',
+        insertmanyvalues_page_size=int(db_executemany_page_size),
+        executemany_batch_page_size=int(db_executemany_page_size),
+        connect_args=connect_args,
+    )
+    _listen_for_phases(engine, base)
+    return engine
+
+# One engine (and pool) per database for the whole process, so sync, load and
+# check in a single 'cli.py run' reuse the same connections.
+_engines: dict = {}
+_engines_lock = threading.Lock()
+
+def get_engine(url: str) -> Engine:
+    """ Returns the shared engine for 'url', creating it on first use. """
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _engines[url] = create_db_engine(url)
+        return engine
+
+def dispose_engines() -> int:
+    """ Closes the pooled connections of every shared engine. Returns how many engines were disposed. """
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+    return len(engines)
@@ -0,0 +1,248 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
+# resource is POSIX-only; peak RSS is simply not reported elsewhere
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# --- Settings ---
+# PIPELINE_METRICS=1         emit one JSON log line per stage (to stderr, or PIPELINE_METRICS_LOG)
+# PIPELINE_METRICS_LOG=path  append the JSON lines to this file instead
+# PIPELINE_METRICS_PROM=path keep a Prometheus textfile with per-stage totals (implies PIPELINE_METRICS)
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False
+    log_path: Optional[str] = None
+    prom_path: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> 'MetricsConfig':
+        prom_path = os.getenv("PIPELINE_METRICS_PROM") or None
+        return cls(
+            enabled=os.getenv("PIPELINE_METRICS", "0") == "1" or prom_path is not None,
+            log_path=os.getenv("PIPELINE_METRICS_LOG") or None,
+            prom_path=prom_path,
+        )
+
+# Read lazily: cli.py loads .env after this module is imported
+_config: Optional[MetricsConfig] = None
+_lock = threading.Lock()
+# Per-stage totals for the Prometheus textfile
+_totals: dict = {}
+
+def get_config() -> MetricsConfig:
+    """ Returns the metrics settings, reading them from the environment on first use. """
+    global _config
+    if _config is None:
+        _config = MetricsConfig.from_env()
+    return _config
+
+def configure(config: Optional[MetricsConfig] = None) -> None:
+    """ Replaces the metrics settings (None re-reads the environment) and clears the totals. """
+    global _config
+    with _lock:
+        _config = config
+        _totals.clear()
+
+# --- Measurements ---
+
+def peak_rss_bytes() -> Optional[int]:
+    """ Returns the process's peak resident set size so far, in bytes. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def default_rows(result, args, kwargs) -> Optional[int]:
+    """ Counts rows as len() of the result (DataFrames, lists), or the result itself if it is an int. """
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+def dataframe_bytes(df) -> Optional[int]:
+    """ Returns the shallow in-memory size of a DataFrame, or None for anything else. """
+    try:
+        return int(df.memory_usage(index=False).sum())
+    except AttributeError:
+        return None
+
+# --- Output ---
+
+def _emit(record: dict) -> None:
+    config = get_config()
+    line = json.dumps(record, default=str)
+    with _lock:
+        if config.log_path:
+            with open(config.log_path, 'a') as f:
+                f.write(line + "\n")
+        else:
+            print(line, file=sys.stderr)
+
+        if config.prom_path:
+            totals = _totals.setdefault(record['stage'], {'calls': 0, 'errors': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0})
+            totals['calls'] += 1
+            totals['errors'] += record['error'] is not None
+            totals['seconds'] += record['seconds']
+            totals['rows'] += record['rows'] or 0
+            totals['bytes'] += record['bytes'] or 0
+            _write_prometheus(config.prom_path, record.get('peak_rss_bytes'))
+
+def _write_prometheus(path: str, peak_rss: Optional[int]) -> None:
+    """ Rewrites the textfile atomically, so a scraper never reads half a file. """
+    metrics = [
+        ('calls', 'counter', 'Number of times the stage ran.'),
+        ('errors', 'counter', 'Number of runs of the stage that raised.'),
+        ('seconds', 'counter', 'Total wall time spent in the stage.'),
+        ('rows', 'counter', 'Total rows handled by the stage.'),
+        ('bytes', 'counter', 'Total bytes handled by the stage.'),
+    ]
+    lines = []
+    for key, metric_type, help_text in metrics:
+        name = f"nvdb_pipeline_stage_{key}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for stage_name, totals in sorted(_totals.items()):
+            lines.append(f'{name}{{stage="{stage_name}"}} {totals[key]}')
+    if peak_rss is not None:
+        lines.append("# HELP nvdb_pipeline_peak_rss_bytes Peak resident set size of the process.")
+        lines.append("# TYPE nvdb_pipeline_peak_rss_bytes gauge")
+        lines.append(f"nvdb_pipeline_peak_rss_bytes {peak_rss}")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+# --- Stages ---
+
+@contextmanager
+def stage(name: str, bytes_counter: Optional[Callable[[], int]] = None):
+    """
+    Times a block as one pipeline stage and emits its metrics.
+
+    Yields a dict the block may fill with 'rows' and 'bytes'. With a
+    'bytes_counter' (a running byte total, e.g. bytes received over HTTP),
+    the stage's bytes are the counter's growth during the block. Does nothing
+    but yield when metrics are disabled.
+    """
+    record = {'rows': None, 'bytes': None}
+    if not get_config().enabled:
+        yield record
+        return
+
+    rss_before = peak_rss_bytes()
+    bytes_before = bytes_counter() if bytes_counter else None
+    start = time.perf_counter()
+    error = None
+    try:
+        yield record
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if bytes_counter:
+            record['bytes'] = bytes_counter() - bytes_before
+        _emit(_stage_record(name, seconds, record, rss_before, error))
+
+def _stage_record(name: str, seconds: float, record: dict, rss_before: Optional[int], error: Optional[str],
+                  **extra) -> dict:
+    rss_after = peak_rss_bytes()
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'script': os.path.basename(sys.argv[0]) if sys.argv else None,
+        'stage': name,
+        'seconds': round(seconds, 6),
+        'rows': record['rows'],
+        'bytes': record['bytes'],
+        'peak_rss_bytes': rss_after,
+        # How much this stage pushed up the process's peak memory
+        'peak_rss_growth_bytes': rss_after - rss_before if rss_after is not None else None,
+        'error': error,
+        **extra,
+    }
+
+def instrument_stage(name: Optional[str] = None, count_rows: Optional[Callable] = default_rows,
+                     count_bytes: Optional[Callable] = None, bytes_counter: Optional[Callable[[], int]] = None):
+    """
+    Decorator timing every call of a function as a pipeline stage.
+
+    'count_rows' and 'count_bytes' are called as f(result, args, kwargs).
+    When metrics are disabled the wrapper adds a single settings check.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not get_config().enabled:
+                return func(*args, **kwargs)
+            with stage(stage_name, bytes_counter=bytes_counter) as record:
+                result = func(*args, **kwargs)
+                if count_rows:
+                    record['rows'] = count_rows(result, args, kwargs)
+                if count_bytes:
+                    record['bytes'] = count_bytes(result, args, kwargs)
+            return result
+
+        return wrapper
+    return decorator
+
+def instrument_iterable(name: str, iterable: Iterable, count_rows: Optional[Callable] = len,
+                        bytes_counter: Optional[Callable[[], int]] = None) -> Iterator:
+    """
+    Times only the time spent producing items (e.g. fetching pages), not the
+    time the consumer spends on them, and emits one record once the iterable
+    is exhausted or abandoned. Returns the iterable untouched when metrics
+    are disabled.
+    """
+    if not get_config().enabled:
+        return iterable
+    return _instrumented_iterator(name, iterable, count_rows, bytes_counter)
+
+def _instrumented_iterator(name, iterable, count_rows, bytes_counter) -> Iterator:
+    record = {'rows': 0 if count_rows else None, 'bytes': None}
+    rss_before = peak_rss_bytes()
+    bytes_before = bytes_counter() if bytes_counter else None
+    seconds = 0.0
+    items = 0
+    error = None
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                seconds += time.perf_counter() - start
+                break
+            seconds += time.perf_counter() - start
+            items += 1
+            if count_rows:
+                record['rows'] += count_rows(item)
+            yield item
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if bytes_counter:
+            record['bytes'] = bytes_counter() - bytes_before
+        _emit(_stage_record(name, seconds, record, rss_before, error, items=items))
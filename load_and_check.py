@@ -1,40 +1,141 @@
 import os
 import sys
+import time
+import queue
+import threading
+from typing import Iterator, Optional
 import pandas as pd
-from sqlalchemy import create_engine, Engine
-from dotenv import load_dotenv
+from sqlalchemy import Engine
+from partitions import copy_chunks_to_partitions, ensure_hendelser_partitions, bulk_load_hendelser_partitions
+from rollup import refresh_rollup
+from instrumentation import instrument_stage
+from config import require_db_settings, require_int
+from db import database_url, get_engine, check_config as check_db_config
 
-# --- Load Environment Variables ---
-load_dotenv()
-
-# --- Get DB Credentials (Global) ---
+# --- Get DB Credentials (Global; cli.py loads .env first) ---
 username = os.getenv("POSTGRES_USER")
 password = os.getenv("POSTGRES_PASSWORD")
 host = os.getenv("POSTGRES_HOST")
 port = os.getenv("POSTGRES_PORT")
 database = os.getenv("POSTGRES_DB")
 
+# --- Get CSV Loader Settings (Global) ---
+hendelser_chunk_rows = os.getenv("HENDELSER_CHUNK_ROWS", "100000") # Rows parsed per chunk
+hendelser_queue_chunks = os.getenv("HENDELSER_QUEUE_CHUNKS", "4")  # Parsed chunks buffered ahead of the loader
+hendelser_load_workers = os.getenv("HENDELSER_LOAD_WORKERS", str(min(os.cpu_count() or 1, 8))) # Partitions loaded in parallel
+hendelser_bulk_load = os.getenv("HENDELSER_BULK_LOAD", "false").lower() in ("1", "true", "yes") # Replace partitions, building indexes after the load
+
+# Default input for the 'load' step
+HENDELSER_CSV_PATH = 'sql/hendelser.csv'
+# Integer columns of nvdb.hendelser. Nullable Int64 keeps a column with missing
+# values from being parsed as float64, which COPY would get as '123.0'.
+HENDELSER_CSV_DTYPES = {'veglenkesekvensid': 'Int64', 'year': 'Int64'}
+
 # --- Check if all variables are loaded ---
-if not all([username, password, host, port, database]):
-    print("Error: Database environment variables missing. Check .env file.")
-    sys.exit(1)
+def check_config() -> None:
+    """ Raises ConfigError if a setting is missing or invalid. Called by cli.py before loading or checking. """
+    require_db_settings({'POSTGRES_USER': username, 'POSTGRES_PASSWORD': password, 'POSTGRES_HOST': host,
+                         'POSTGRES_PORT': port, 'POSTGRES_DB': database})
+    check_db_config()
+    require_int("HENDELSER_CHUNK_ROWS", hendelser_chunk_rows, minimum=1)
+    require_int("HENDELSER_QUEUE_CHUNKS", hendelser_queue_chunks, minimum=1)
+    require_int("HENDELSER_LOAD_WORKERS", hendelser_load_workers, minimum=1)
 
 # --- Database Functions ---
 def get_db_engine(user, pwd, hst, p, db):
-    """ Creates and returns a SQLAlchemy engine with sslmode=disable. """
+    """ Returns the shared pooled engine (db.py) with sslmode=disable. """
     try:
-        db_url = f"postgresql://{user}:{pwd}@{hst}:{p}/{db}?sslmode=disable"
-        engine = create_engine(db_url)
-        return engine
+        return get_engine(database_url(user, pwd, hst, p, db))
     except Exception as e:
         print(f"Error creating database engine: {e}")
         return None
 
-# --- CSV Loader Function ---
-def load_csv_to_hendelser(engine: Engine, csv_path: str):
+# --- CSV Loader Functions ---
+
+# Marks the end of the CSV on the chunk queue
+_END_OF_CSV = object()
+
+def read_csv_chunks_in_background(csv_path: str, chunk_rows: int, queue_chunks: int,
+                                  dtype: dict = None) -> Iterator[pd.DataFrame]:
+    """
+    Parses a CSV in chunks on a background thread and yields them in order.
+
+    Parsing runs ahead of the consumer by at most 'queue_chunks' chunks, so
+    parsing and loading overlap while memory stays bounded regardless of the
+    file size. 'dtype' is passed to pd.read_csv. Parser errors are re-raised
+    in the consumer.
+    """
+    chunk_queue = queue.Queue(maxsize=queue_chunks)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=dtype):
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_END_OF_CSV)
+
+    producer = threading.Thread(target=produce, name='csv-reader', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = chunk_queue.get()
+            if item is _END_OF_CSV:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+def scan_csv_years(csv_path: str, chunk_rows: Optional[int] = None) -> set:
+    """ Returns the distinct years in a CSV, parsing only the 'year' column. """
+    chunk_rows = chunk_rows or int(hendelser_chunk_rows)
+    years = set()
+    for df_chunk in pd.read_csv(csv_path, usecols=['year'], chunksize=chunk_rows):
+        years.update(int(year) for year in df_chunk['year'].dropna().unique())
+    return years
+
+def _loaded_csv_bytes(rows, args, kwargs):
+    """ Stage metrics: the size of the CSV, if any rows were loaded from it. """
+    if not rows:
+        return None
+    return os.path.getsize(args[1] if len(args) > 1 else kwargs['csv_path'])
+
+@instrument_stage(count_bytes=_loaded_csv_bytes)
+def load_csv_to_hendelser(engine: Engine, csv_path: str, chunk_rows: Optional[int] = None,
+                          queue_chunks: Optional[int] = None, load_workers: Optional[int] = None,
+                          bulk: bool = hendelser_bulk_load):
     """
     Loads data from hendelser.csv into the nvdb.hendelser table.
 
+    The CSV is streamed: a background thread parses it chunk by chunk while
+    each parsed chunk is split by year and COPYed directly into its
+    nvdb.hendelser_<year> partition. Partitions load in parallel on at most
+    'load_workers' pooled connections. Memory stays constant for multi-GB
+    files, and a failed load is rolled back in every partition. The years
+    are scanned up front and missing partitions are created before any rows
+    are loaded. Afterwards the rollup is refreshed for the loaded years; if
+    that fails the rows stay loaded and a stale-rollup warning is printed.
+
+    With 'bulk' (HENDELSER_BULK_LOAD), the partitions for the years in the
+    CSV are REPLACED instead: rows go into unindexed staging tables whose
+    primary keys and indexes are built afterwards, and the staging tables
+    are then swapped in with ATTACH PARTITION. Use it for full reloads.
+
     **IMPORTANT ASSUMPTION:** This function assumes your hendelser.csv 
     file contains columns that match the target nvdb.hendelser table, 
     specifically: 'veglenkesekvensid', 'relativ_posisjon', 
@@ -42,53 +143,87 @@ def load_csv_to_hendelser(engine: Engine, csv_path: str):
     It assumes it DOES NOT contain 'id', 'created_at', 'updated_at',
     as these have defaults in the DB.
     *** You MAY need to adjust this function based on your CSV! ***
+
+    Returns the number of rows loaded, or None if the load failed.
     """
+    # Defaults come from the HENDELSER_* settings, validated by check_config()
+    chunk_rows = chunk_rows or int(hendelser_chunk_rows)
+    queue_chunks = queue_chunks or int(hendelser_queue_chunks)
+    load_workers = load_workers or int(hendelser_load_workers)
     print(f"\n--- Loading {csv_path} ---")
     if not os.path.exists(csv_path):
         print(f"Error: CSV file not found at {csv_path}")
         return
 
+    # Define target table details
+    table_name = "hendelser"
+    schema_name = "nvdb"
+
+    chunks = None
     try:
-        df_hendelser = pd.read_csv(csv_path)
-        print(f"Read {len(df_hendelser)} rows from {csv_path}.")
-        print("CSV columns found:", df_hendelser.columns.tolist())
+        file_bytes = os.path.getsize(csv_path)
+        start = time.perf_counter()
+
+        csv_columns = pd.read_csv(csv_path, nrows=0).columns.tolist()
+        print("CSV columns found:", csv_columns)
 
         # *** POTENTIAL ADJUSTMENT POINT ***
         # If your CSV columns don't match, you might need to:
         # 1. Select specific columns: 
-        #    df_hendelser = df_hendelser[['csv_col1', 'csv_col5', ...]]
+        #    df_chunk = df_chunk[['csv_col1', 'csv_col5', ...]]
         # 2. Rename columns: 
-        #    df_hendelser.rename(columns={'csv_col1': 'veglenkesekvensid', ...}, inplace=True)
+        #    df_chunk.rename(columns={'csv_col1': 'veglenkesekvensid', ...}, inplace=True)
         # 3. Ensure 'year' exists and is an integer. If not, derive it.
-        
+
         # Check if 'year' column exists - CRUCIAL for partitioning
-        if 'year' not in df_hendelser.columns:
+        if 'year' not in csv_columns:
             print("Error: 'year' column not found in CSV. Cannot load into partitioned table.")
             return
 
-        # Define target table details
-        table_name = "hendelser"
-        schema_name = "nvdb"
-
-        print(f"Attempting to load data into {schema_name}.{table_name}...")
-        df_hendelser.to_sql(
-            table_name,
-            engine,
-            schema=schema_name,
-            if_exists='append', # Use 'append' to add to existing table
-            index=False,
-            chunksize=1000
-        )
-        print(f"Successfully loaded data into {schema_name}.{table_name}.")
+        # Years are scanned up front, so missing partitions exist before any rows load
+        years = scan_csv_years(csv_path, chunk_rows)
+        if not years:
+            print(f"No rows found in {csv_path}.")
+            return 0
+        chunks = read_csv_chunks_in_background(csv_path, chunk_rows, queue_chunks, dtype=HENDELSER_CSV_DTYPES)
+        if bulk:
+            print(f"Bulk-replacing {schema_name}.{table_name} partitions for {sorted(years)} ({load_workers} workers)...")
+            rows_per_year = bulk_load_hendelser_partitions(engine, chunks, years, max_workers=load_workers)
+        else:
+            ensure_hendelser_partitions(engine, years)
+            print(f"Attempting to load data into the {schema_name}.{table_name} partitions ({load_workers} workers)...")
+            # Rows go straight into nvdb.hendelser_<year>, on at most load_workers pooled connections
+            rows_per_year = copy_chunks_to_partitions(
+                engine, chunks, table_name, schema_name, partition_column='year', max_workers=load_workers
+            )
+        total_rows = sum(rows_per_year.values())
+
+        elapsed = time.perf_counter() - start
+        for year, rows in sorted(rows_per_year.items()):
+            print(f"  {schema_name}.{table_name}_{year}: {rows} rows")
+        print(f"Successfully loaded {total_rows} rows into {schema_name}.{table_name} in {elapsed:.1f}s "
+              f"({total_rows / elapsed:,.0f} rows/s, {file_bytes / elapsed / 1024 / 1024:.1f} MB/s).")
+
+        # Only the years that received rows need their rollup recomputed. The rows
+        # are committed by now, so a failed refresh only leaves the rollup stale.
+        try:
+            refresh_rollup(engine, years=rows_per_year.keys())
+        except Exception as e:
+            print(f"Warning: Rollup is stale for years {sorted(rows_per_year)}; could not refresh it: {e}")
+        return total_rows
 
     except FileNotFoundError:
         print(f"Error: Could not find the CSV file at {csv_path}")
     except Exception as e:
         print(f"An error occurred while loading CSV data: {e}")
+    finally:
+        # Stops the background reader if the load ended early
+        if chunks is not None:
+            chunks.close()
 
 # --- Data Checker Function ---
-def check_vegobjekter_data(engine: Engine):
-    """ Checks for data in nvdb.vegobjekter_fartsgrense and prints a sample. """
+def check_vegobjekter_data(engine: Engine) -> bool:
+    """ Checks for data in nvdb.vegobjekter_fartsgrense and prints a sample. Returns False on error. """
     print("\n--- Checking nvdb.vegobjekter_fartsgrense ---")
     table_name = "vegobjekter_fartsgrense"
     schema_name = "nvdb"
@@ -108,35 +243,40 @@ def check_vegobjekter_data(engine: Engine):
             print(df_sample)
         else:
             print("Table appears to be empty.")
+        return True
 
     except Exception as e:
         print(f"An error occurred while checking data: {e}")
+        return False
 
 
 # --- Main Execution ---
-def main():
-    """ Runs the CSV loading and data checking tasks. """
+def main(load: bool = True, check: bool = True, csv_path: str = HENDELSER_CSV_PATH, bulk: bool = None) -> bool:
+    """
+    Runs the CSV loading and/or data checking tasks. 'bulk' defaults to HENDELSER_BULK_LOAD.
+    Returns True if every task that ran succeeded.
+    """
     db_engine = get_db_engine(username, password, host, port, database)
 
     if not db_engine:
         print("Could not connect to database. Exiting.")
-        return
-
-    try:
-        # 1. Load the CSV data
-        csv_file_path = 'sql/hendelser.csv'
-        load_csv_to_hendelser(db_engine, csv_file_path)
+        return False
 
-        # 2. Check the API data
-        check_vegobjekter_data(db_engine)
+    ok = True
+    # The engine is shared with the other phases of the run; cli.py disposes it
+    # 1. Load the CSV data
+    if load:
+        rows_loaded = load_csv_to_hendelser(db_engine, csv_path, bulk=hendelser_bulk_load if bulk is None else bulk)
+        ok = rows_loaded is not None
 
-    finally:
-        # Ensure connection is closed
-        if db_engine:
-            db_engine.dispose()
-            print("\nDatabase connection closed.")
+    # 2. Check the API data
+    if check:
+        ok = check_vegobjekter_data(db_engine) and ok
+    return ok
 
 
 # --- Script Entry Point ---
 if __name__ == "__main__":
-    main()
+    # Same as 'python cli.py load' followed by 'check'
+    import cli
+    sys.exit(cli.main(['load', '--check']))
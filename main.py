@@ -1,43 +1,152 @@
 import os
+import sys
+from typing import Iterable, Iterator
 import pandas as pd
-from sqlalchemy import create_engine, Engine
-from dotenv import load_dotenv
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mticker
+from sqlalchemy import Engine
+from rollup import HENDELSER_FARTSGRENSE_JOIN, ROLLUP_TABLE
+from instrumentation import instrument_stage, instrument_iterable, dataframe_bytes
+from query_profile import profile_query, SEQ_SCAN_MIN_ROWS
+from parquet_cache import LocalDatasetCache, pyarrow_available
+from config import require_db_settings, require_int
+from db import database_url, get_engine, check_config as check_db_config
 
-# --- Load Environment Variables ---
-load_dotenv()
-
-# --- Get DB Credentials (Global) ---
+# --- Get DB Credentials (Global; cli.py loads .env first) ---
 username = os.getenv("POSTGRES_USER")
 password = os.getenv("POSTGRES_PASSWORD")
 host = os.getenv("POSTGRES_HOST")
 port = os.getenv("POSTGRES_PORT")
 database = os.getenv("POSTGRES_DB")
 
+# Set to '1' to also export the full joined rows (slow on large tables)
+report_export_details = os.getenv("REPORT_EXPORT_DETAILS", "0") == "1"
+# Set to '1' to capture EXPLAIN ANALYZE plans for every report query (runs each query twice)
+report_profile_sql = os.getenv("REPORT_PROFILE_SQL", "0") == "1"
+report_profile_dir = os.getenv("REPORT_PROFILE_DIR", "profiles")
+report_profile_seq_scan_rows = os.getenv("REPORT_PROFILE_SEQ_SCAN_ROWS", str(SEQ_SCAN_MIN_ROWS))
+# Set to a directory to keep a local Parquet copy of both tables (needs pyarrow)
+report_cache_dir = os.getenv("REPORT_CACHE_DIR")
+# Set to '1' to report from the local cache only, without connecting to the database
+report_offline = os.getenv("REPORT_OFFLINE", "0") == "1"
+# Charts are written here; unchanged charts are skipped unless REPORT_FORCE_RENDER=1
+report_output_dir = os.getenv("REPORT_OUTPUT_DIR", "images")
+report_force_render = os.getenv("REPORT_FORCE_RENDER", "0") == "1"
+# Processes rendering charts in parallel (default: one per changed chart, up to the CPU count)
+report_render_workers = os.getenv("REPORT_RENDER_WORKERS", "0")
+
 # Check if all variables are loaded
-if not all([username, password, host, port, database]):
-    print("Error: Database environment variables missing. Check .env file.")
-    exit()
+def check_config(offline: bool = report_offline) -> None:
+    """ Raises ConfigError if a setting is missing or invalid. An offline report needs no database settings. """
+    require_int("REPORT_PROFILE_SEQ_SCAN_ROWS", report_profile_seq_scan_rows)
+    require_int("REPORT_RENDER_WORKERS", report_render_workers)
+    if not offline:
+        require_db_settings({'POSTGRES_USER': username, 'POSTGRES_PASSWORD': password, 'POSTGRES_HOST': host,
+                             'POSTGRES_PORT': port, 'POSTGRES_DB': database})
+        check_db_config()
+
+# --- Report Queries ---
+
+# Long names for the vegkategori codes shown in reports
+VEGKATEGORI_MAP = {
+    'E': 'Europaveg',
+    'F': 'Fylkesveg',
+    'K': 'Kommunal veg',
+    'P': 'Privat veg',
+    'R': 'Riksveg',
+    'S': 'Skogsveg'
+}
+
+def vegkategori_case_sql(column: str) -> str:
+    """ Returns a SQL CASE expression mapping vegkategori codes to long names, keeping unknown codes. """
+    whens = " ".join(f"WHEN '{code}' THEN '{name}'" for code, name in VEGKATEGORI_MAP.items())
+    return f"CASE {column} {whens} ELSE {column} END"
+
+# Every dimension the report charts break down by, from the rollup table.
+# One pull feeds all charts; it is at most a few thousand rows.
+ROLLUP_REPORT_SQL = f"""
+SELECT
+    "year",
+    {vegkategori_case_sql('vegkategori')} AS vegkategori,
+    fylke,
+    fartsgrense,
+    vegvedlikehold,
+    SUM(antall)::BIGINT AS antall
+FROM
+    {ROLLUP_TABLE}
+GROUP BY 1, 2, 3, 4, 5
+ORDER BY 1, 2, 3, 4, 5;
+"""
+
+# The same breakdown aggregated live over the join
+REPORT_SQL = f"""
+SELECT
+    h.year,
+    {vegkategori_case_sql('vf.vegkategori')} AS vegkategori,
+    vf.fylke,
+    vf.fartsgrense,
+    h.vegvedlikehold,
+    COUNT(*) AS antall
+FROM
+    {HENDELSER_FARTSGRENSE_JOIN}
+GROUP BY 1, 2, 3, 4, 5
+ORDER BY 1, 2, 3, 4, 5;
+"""
+
+# Counts per year and vegkategori, aggregated live over the join
+INCIDENTS_PER_YEAR_SQL = f"""
+SELECT
+    h.year,
+    {vegkategori_case_sql('vf.vegkategori')} AS vegkategori,
+    COUNT(*) AS antall
+FROM
+    {HENDELSER_FARTSGRENSE_JOIN}
+GROUP BY 1, 2
+ORDER BY 1, 2;
+"""
+
+# Full joined rows - only fetched for an explicit detail export.
+# veglenkesekvensid is the shared key (Fellesnøkkelen) between the tables;
+# relativ_posisjon picks the fartsgrense interval on that sequence.
+DETAIL_JOIN_SQL = f"""
+SELECT
+    vf.nvdb_id,
+    h.veglenkesekvensid,
+    vf.vegkategori,
+    vf.fartsgrense,
+    h.relativ_posisjon,
+    h.vegvedlikehold,
+    h.year
+FROM
+    {HENDELSER_FARTSGRENSE_JOIN};
+"""
 
 # --- Functions ---
 
 def get_db_engine(user, pwd, hst, p, db):
-    """ Creates and returns a SQLAlchemy engine with sslmode=disable. """
+    """ Returns the shared pooled engine (db.py) with sslmode=disable. """
     try:
-        # Using sslmode=disable as per previous request
-        db_url = f"postgresql://{user}:{pwd}@{hst}:{p}/{db}?sslmode=disable"
-        engine = create_engine(db_url)
-        # Test connection
-        with engine.connect() as connection:
-            print("Database connection successful.")
-        return engine
+        # No test connection: pool_pre_ping checks each connection as it is checked out
+        return get_engine(database_url(user, pwd, hst, p, db))
     except Exception as e:
         print(f"Error creating database engine: {e}")
         return None
 
-def sql_request(sql_code: str, db_engine: Engine) -> pd.DataFrame:
-    """ Executes an SQL query and returns the result as a Pandas DataFrame. """
+@instrument_stage(count_bytes=lambda df, args, kwargs: dataframe_bytes(df))
+def sql_request(sql_code: str, db_engine: Engine, profile: bool = None) -> pd.DataFrame:
+    """
+    Executes an SQL query and returns the result as a Pandas DataFrame.
+
+    With 'profile' (default: REPORT_PROFILE_SQL), the query is first run
+    under EXPLAIN ANALYZE and its plan is saved to REPORT_PROFILE_DIR, with
+    large sequential scans flagged. Profiling errors never fail the query.
+    """
+    if profile is None:
+        profile = report_profile_sql
+    if profile:
+        try:
+            profile_query(sql_code, db_engine, output_dir=report_profile_dir, min_rows=int(report_profile_seq_scan_rows))
+        except Exception as e:
+            print(f"Error profiling SQL query: {e}")
+
     try:
         df = pd.read_sql_query(sql_code, db_engine)
         print(f"Query executed successfully, {len(df)} rows returned.")
@@ -46,8 +155,47 @@ def sql_request(sql_code: str, db_engine: Engine) -> pd.DataFrame:
         print(f"Error during SQL query: {e}")
         return pd.DataFrame() # Return an empty DataFrame on error
 
-def plot_incidents_per_year(df: pd.DataFrame) -> None:
-    """ Plots the number of incidents per year per road category. """
+def sql_request_chunks(sql_code: str, db_engine: Engine, chunksize: int = 50_000, as_arrow: bool = False) -> Iterator:
+    """
+    Executes an SQL query and yields the result in chunks of at most 'chunksize' rows.
+
+    Uses a named server-side cursor (stream_results), so neither psycopg2 nor
+    pandas ever holds more than one chunk in memory. Yields DataFrames, or
+    pyarrow RecordBatches when 'as_arrow' is set. Errors are re-raised, since
+    a silently truncated stream would give wrong aggregates.
+    """
+    if as_arrow:
+        import pyarrow as pa # Optional dependency, only needed for Arrow output
+
+    rows = 0
+    try:
+        with db_engine.connect().execution_options(yield_per=chunksize) as connection:
+            for chunk in pd.read_sql_query(sql_code, connection, chunksize=chunksize):
+                rows += len(chunk)
+                yield pa.RecordBatch.from_pandas(chunk, preserve_index=False) if as_arrow else chunk
+    except Exception as e:
+        print(f"Error during streamed SQL query after {rows} rows: {e}")
+        raise
+    print(f"Streamed query finished, {rows} rows returned.")
+
+def aggregate_incidents_per_year(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """ Counts incidents per year and vegkategori incrementally over row chunks. """
+    counts = None
+    for chunk in chunks:
+        chunk_counts = chunk.groupby(['year', 'vegkategori']).size()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+    if counts is None:
+        return pd.DataFrame(columns=['year', 'vegkategori', 'antall'])
+    return counts.astype('int64').rename('antall').reset_index()
+
+def plot_incidents_per_year(df: pd.DataFrame, output_dir: str = "images") -> None:
+    """
+    Plots the number of incidents per year per road category to hendelser_per_aar.png.
+
+    Accepts either pre-aggregated counts (an 'antall' column per year and
+    vegkategori, as returned by INCIDENTS_PER_YEAR_SQL) or one row per incident.
+    Renders headless; see report.render_report for the full chart set.
+    """
     if not isinstance(df, pd.DataFrame) or df.empty:
         print("Input DataFrame is empty or invalid. Skipping plot.")
         return
@@ -56,111 +204,116 @@ def plot_incidents_per_year(df: pd.DataFrame) -> None:
         print("DataFrame is missing 'year' and/or 'vegkategori' columns. Skipping plot.")
         return
 
+    # matplotlib is only imported when a chart is actually drawn
+    from report import render_chart, chart_data, prepare_report_data, INCIDENTS_PER_YEAR_CHART
+
+    plot_data = chart_data(prepare_report_data(df), INCIDENTS_PER_YEAR_CHART)
+    if plot_data.empty:
+        print("No data to plot after grouping.")
+        return
+
     try:
-        print("Preparing data for plotting...")
-        # Group by `year` and `vegkategori`, and count occurrences
-        # *** FIX: Use 'df' instead of 'joined_dataframe' ***
-        counts_per_year_category = df.groupby(['year', 'vegkategori']).size()
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = render_chart(INCIDENTS_PER_YEAR_CHART, plot_data,
+                                   os.path.join(output_dir, INCIDENTS_PER_YEAR_CHART.filename))
+        print(f"Plot saved to {output_path}.")
+    except Exception as e:
+        print(f"An error occurred during plotting: {e}")
 
-        # Unstack, moving `vegkategori` to columns
-        plot_data = counts_per_year_category.unstack(fill_value=0)
 
-        if plot_data.empty:
-            print("No data to plot after grouping.")
-            return
+def export_incident_details(db_engine: Engine, output_path: str = os.path.join("exports", "hendelser_fartsgrense.csv")) -> bool:
+    """ Streams the full joined rows to CSV chunk by chunk, mapping vegkategori to long names. Returns False on error. """
+    print("\n--- Running detail JOIN Query ---")
+    rows_written = 0
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        for chunk in instrument_iterable('sql_request_chunks', sql_request_chunks(DETAIL_JOIN_SQL, db_engine)):
+            # Use .map() to replace codes. .fillna() keeps original if no map found.
+            chunk['vegkategori'] = chunk['vegkategori'].map(VEGKATEGORI_MAP).fillna(chunk['vegkategori'])
+            if rows_written == 0:
+                print("\nJoined DataFrame sample (after mapping):")
+                print(chunk.head())
+            chunk.to_csv(output_path, mode='w' if rows_written == 0 else 'a', header=rows_written == 0, index=False)
+            rows_written += len(chunk)
+    except Exception as e:
+        print(f"An error occurred during detail export: {e}")
+        return False
 
-        print("Making plot...")
-        fig, ax = plt.subplots(figsize=(14, 8)) # Renamed 'fix' to 'fig'
+    if rows_written == 0:
+        print("Joined result is empty - check if both tables have data and if join keys match.")
+    else:
+        print(f"Detail export of {rows_written} rows saved to {output_path}.")
+    return True
 
-        plot_data.plot(kind='bar', ax=ax, width=0.8)
+def report_data_from_db(engine: Engine) -> pd.DataFrame:
+    """ Reads the report breakdown from the rollup table, falling back to the live aggregate over the join. """
+    # The GROUP BY and vegkategori mapping run server-side, so only the
+    # counts are transferred.
+    print("\n--- Reading report data from rollup ---")
+    report_data = sql_request(ROLLUP_REPORT_SQL, engine)
+    if report_data.empty:
+        print("Rollup is empty or missing - aggregating over the join instead.")
+        report_data = sql_request(REPORT_SQL, engine)
+    return report_data
 
-        ax.set_title("Antall hendelser per år og vegkategori", fontsize=18, pad=20)
-        ax.set_xlabel("År", fontsize=14)
-        ax.set_ylabel("Antall hendelser", fontsize=14)
-        ax.tick_params(axis='x', rotation=45, labelsize=12)
-        ax.tick_params(axis='y', labelsize=12)
-        ax.legend(title='Vegkategori', fontsize=11, title_fontsize=13)
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        ax.yaxis.set_major_locator(mticker.MaxNLocator(integer=True))
+def report_data_from_cache(cache_dir: str, engine: Engine = None) -> pd.DataFrame:
+    """ Computes the report breakdown from the local Parquet cache, syncing only changed years first when an engine is given. """
+    print(f"\n--- Reading report data from local cache {cache_dir} ---")
+    cache = LocalDatasetCache(cache_dir)
+    if engine is not None:
+        cache.sync(engine)
+    return cache.incident_breakdown(VEGKATEGORI_MAP)
 
-        plt.tight_layout()
-        plt.show()
-        print("Plot displayed.")
+def write_report(report_data: pd.DataFrame) -> dict:
+    """ Renders the chart set headless into REPORT_OUTPUT_DIR, skipping charts whose data is unchanged. """
+    from report import render_report
 
-    except Exception as e:
-        print(f"An error occurred during plotting: {e}")
-    
-    print("Save plot...")
-    try:
-        output_folder = "images"
-        output_filename = "hendelser_per_aar.png"
-        output_path = os.path.join(output_folder, output_filename)
-        
-        # Create the 'images' folder if it doesn't exist
-        os.makedirs(output_folder, exist_ok=True)
-
-        fig.savefig(output_path, bbox_inches='tight', dpi=150) 
-        print("Plot saved.")
-    except Exception as e:
-        print(f"An error occurred during plot saving: {e}")
+    return render_report(report_data, output_dir=report_output_dir, max_workers=int(report_render_workers) or None,
+                         force=report_force_render)
 
-    plt.close()
+def main(export_details: bool = report_export_details, cache_dir: str = report_cache_dir,
+         offline: bool = report_offline) -> bool:
+    """
+    Main function to connect, aggregate incidents in the database, and render the report charts.
+    Returns False if the report could not be built.
+    """
+    if cache_dir and not pyarrow_available():
+        print("REPORT_CACHE_DIR is set but pyarrow is not installed - reading from the database.")
+        cache_dir = None
 
+    if offline:
+        if not cache_dir:
+            print("Error: REPORT_OFFLINE needs REPORT_CACHE_DIR and pyarrow.")
+            return False
+        write_report(report_data_from_cache(cache_dir))
+        return True
 
-def main() -> None:
-    """ Main function to connect, query, and plot data. """
     engine = get_db_engine(username, password, host, port, database)
 
     if not engine:
-        return
+        return False
 
-    join_sql = """
-    SELECT
-        vf.nvdb_id,
-        vf.veglenkesekvensid,  -- Fellesnøkkelen (Using the name from your DB)
-        vf.vegkategori,
-        vf.fartsgrense,
-        h.relativ_posisjon,
-        h.vegvedlikehold,
-        h.year
-    FROM
-        nvdb.vegobjekter_fartsgrense vf 
-    INNER JOIN
-        nvdb.hendelser h
-    ON
-        vf.veglenkesekvensid = h.veglenkesekvensid; -- *** FIX: Use 'veglenkesekvensid' on both sides ***
-    """
+    if cache_dir:
+        report_data = report_data_from_cache(cache_dir, engine)
+    else:
+        report_data = report_data_from_db(engine)
 
-    print("\n--- Running JOIN Query ---")
-    joined_dataframe = sql_request(join_sql, engine)
-
-    if not joined_dataframe.empty:
-        print("\nJoined DataFrame sample:")
-        print(joined_dataframe.head())
-
-        print("\nMapping 'vegkategori' to long names...")
-        vegkategori_map = {
-            'E': 'Europaveg',
-            'F': 'Fylkesveg',
-            'K': 'Kommunal veg',
-            'P': 'Privat veg',
-            'R': 'Riksveg',
-            'S': 'Skogsveg'
-        }
-        # Use .map() to replace codes. .fillna() keeps original if no map found.
-        joined_dataframe['vegkategori'] = joined_dataframe['vegkategori'].map(vegkategori_map).fillna(joined_dataframe['vegkategori'])
-        print("\nJoined DataFrame sample (after mapping):")
-        print(joined_dataframe.head())
+    if not report_data.empty:
+        print("\nIncidents per year, vegkategori, fylke, fartsgrense and vegvedlikehold:")
+        print(report_data.head())
     else:
-        print("Joined DataFrame is empty - check if both tables have data and if join keys match.")
+        print("Aggregate is empty - check if both tables have data and if join keys match.")
 
-    # --- Plotting ---
-    plot_incidents_per_year(joined_dataframe)
+    # --- Charts ---
+    write_report(report_data)
 
-    # --- Clean up ---
-    engine.dispose()
-    print("\nDatabase connection closed.")
+    # --- Optional detail export ---
+    if export_details:
+        return export_incident_details(engine)
+    return True
 
 
 if __name__ == "__main__":
-    main()
+    # Same as 'python cli.py report': loads .env and validates the settings first
+    import cli
+    sys.exit(cli.main(['report']))
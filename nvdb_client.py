@@ -0,0 +1,246 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from page_cache import PageCache
+
+# orjson decodes NVDB pages several times faster; fall back to the standard library
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# --- Client Settings ---
+NVDB_ACCEPT = 'application/vnd.vegvesen.nvdb-v3-rev1+json'
+# Responses worth retrying: rate limiting and transient server/gateway errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Connection-level errors worth retrying
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+class NvdbFetchError(RuntimeError):
+    """
+    Raised when a page could not be fetched after all retries.
+
+    'resume_url' and 'resume_params' point at the cursor that failed, so a
+    caller can continue the same chain later instead of starting over.
+    """
+
+    def __init__(self, message: str, resume_url: Optional[str] = None, resume_params: Optional[dict] = None):
+        super().__init__(message)
+        self.resume_url = resume_url
+        self.resume_params = resume_params or {}
+
+def decode_page(raw_page: bytes, url: str, params: Optional[dict] = None) -> dict:
+    """ Decodes a raw page body. Raises NvdbFetchError, resumable at 'url', if it is not valid JSON. """
+    try:
+        return json_loads(raw_page)
+    except ValueError as e:
+        raise NvdbFetchError(f"Invalid JSON in page from {url}: {e}", url, params) from e
+
+@dataclass
+class ClientStats:
+    """ Request counters and latencies for monitoring. Safe to update from several threads. """
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    bytes_received: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    recent_latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_request(self, latency: float, size: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.recent_latencies.append(latency)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def as_dict(self) -> dict:
+        """ Returns a snapshot of the counters, with latencies in seconds. """
+        with self._lock:
+            latencies = sorted(self.recent_latencies)
+            requests_made = self.requests
+            snapshot = {
+                'requests': requests_made,
+                'retries': self.retries,
+                'failures': self.failures,
+                'bytes_received': self.bytes_received,
+                'mean_latency': self.total_latency / requests_made if requests_made else 0.0,
+                'max_latency': self.max_latency,
+            }
+        snapshot['p50_latency'] = latencies[len(latencies) // 2] if latencies else 0.0
+        snapshot['p95_latency'] = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        return snapshot
+
+class NvdbClient:
+    """
+    Reusable NVDB API client.
+
+    Keeps a pooled keep-alive requests.Session, asks for gzip responses and
+    retries transient failures with bounded exponential backoff (honouring
+    Retry-After). Retries happen on the current 'neste' cursor, so a
+    transient error never throws away the pages already fetched.
+    """
+
+    def __init__(self, max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 timeout: float = 60.0, pool_size: int = 10, session: Optional[requests.Session] = None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.stats = ClientStats()
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept': NVDB_ACCEPT, 'Accept-Encoding': 'gzip'})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """ Closes the pooled connections. """
+        self.session.close()
+
+    def retry_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Returns the wait before the next attempt: Retry-After if given, else
+        jittered backoff. Only the backoff is capped at 'backoff_max'; the
+        server's Retry-After is honoured in full.
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    except (TypeError, ValueError):
+                        delay = None
+                if delay is not None:
+                    return max(delay, 0.0)
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(backoff / 2, backoff)
+
+    def get_page(self, url: str, params: Optional[dict] = None) -> dict:
+        """ Fetches and decodes one page. """
+        return decode_page(self.get_page_raw(url, params), url, params)
+
+    def get_page_raw(self, url: str, params: Optional[dict] = None) -> bytes:
+        """ Fetches one raw page body, retrying transient errors. Raises NvdbFetchError when retries run out. """
+        for attempt in range(self.max_retries + 1):
+            response = None
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                self.stats.record_request(time.perf_counter() - start, len(response.content or b''))
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.content
+                reason = f"HTTP {response.status_code}"
+            except RETRY_EXCEPTIONS as e:
+                self.stats.record_request(time.perf_counter() - start)
+                reason = str(e)
+            except requests.exceptions.RequestException as e:
+                # Client errors (4xx) will not get better by retrying
+                self.stats.record_failure()
+                raise NvdbFetchError(f"Error during API request: {e}", url, params) from e
+
+            if attempt == self.max_retries:
+                break
+            delay = self.retry_delay(attempt, response)
+            self.stats.record_retry()
+            print(f"Transient error ({reason}), retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1} of {self.max_retries})...")
+            time.sleep(delay)
+
+        self.stats.record_failure()
+        raise NvdbFetchError(f"Giving up on {url} after {self.max_retries} retries ({reason}).", url, params)
+
+    def iter_pages(self, url: str, params: Optional[dict] = None, cache: Optional[PageCache] = None) -> Iterator[list]:
+        """
+        Yields the objects on each page, following the 'neste' cursor until an empty page.
+
+        With a cache, every raw page and the next cursor are checkpointed to
+        disk. A fully cached query is replayed without any requests; a partly
+        cached one is replayed and then resumed from its checkpoint.
+        """
+        params = dict(params or {})
+        query_url, query_params = url, dict(params)
+        fetched = 0
+        page_index = 0
+        key = None
+
+        if cache is not None:
+            key = cache.make_key(query_url, query_params)
+            checkpoint = cache.read_checkpoint(key)
+            if checkpoint:
+                print(f"Replaying {checkpoint['pages']} cached pages"
+                      f"{'' if checkpoint['complete'] else ', then resuming from checkpoint'}.")
+                raw_pages = cache.iter_pages(key, checkpoint)
+                while True:
+                    try:
+                        raw_page = next(raw_pages, None)
+                        if raw_page is None:
+                            break
+                        objects_on_page = json_loads(raw_page).get('objekter', [])
+                    except (OSError, ValueError) as e:
+                        # A missing or corrupt page file: drop the entry so the next run fetches the query again
+                        cache.remove(key)
+                        raise NvdbFetchError(f"Unreadable cached page for {query_url}: {e}",
+                                             query_url, query_params) from e
+                    fetched += len(objects_on_page)
+                    yield objects_on_page
+                if checkpoint['complete']:
+                    return
+                page_index = checkpoint['pages']
+                url, params = checkpoint['next_url'], {}
+
+        while url:
+            raw_page = self.get_page_raw(url, params)
+            data = decode_page(raw_page, url, params)
+            objects_on_page = data.get('objekter', [])
+
+            if not objects_on_page and fetched > 0: # Check if empty *after* getting some data
+                print("Fetched 0 objects, assuming end of data. Stopping pagination.")
+                break
+            elif not objects_on_page: # Handle case where first page is empty
+                print("Fetched 0 objects on the first page. No data found for these criteria.")
+                break
+
+            fetched += len(objects_on_page)
+            # The 'neste' href already carries every query parameter
+            url = data.get('metadata', {}).get('neste', {}).get('href')
+            params = {}
+            if cache is not None:
+                cache.write_page(key, page_index, raw_page, url, query_url, query_params)
+                page_index += 1
+            yield objects_on_page
+
+        if cache is not None and page_index > 0:
+            cache.mark_complete(key, cache.read_checkpoint(key))
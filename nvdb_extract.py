@@ -0,0 +1,161 @@
+from typing import Callable
+import pandas as pd
+
+# --- Column Types ---
+INT = 'Int64'          # Nullable integer
+FLOAT = 'Float64'      # Nullable float
+TEXT = 'text'          # Plain Python strings
+TIMESTAMP = 'timestamp'
+
+# Columns every vegobjekt table gets, in table order
+BASE_COLUMNS = {
+    'nvdb_id': INT,
+    'vegkategori': TEXT,
+    'fylke': INT,
+    'kommune': INT,
+    'veglenkesekvensid': INT,
+    'startdato': TIMESTAMP,
+    'sist_modifisert': TIMESTAMP,
+    'geometri_wkt': TEXT,
+}
+
+# --- Typed Column Builders ---
+
+def to_int_array(values: list) -> pd.api.extensions.ExtensionArray:
+    """ Builds a nullable Int64 array, coercing unparseable or non-integral values to <NA>. """
+    try:
+        return pd.array(values, dtype=INT)
+    except (TypeError, ValueError):
+        numeric = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+        return pd.array(numeric.where(numeric == numeric.round()), dtype=INT)
+
+def to_float_array(values: list) -> pd.api.extensions.ExtensionArray:
+    """ Builds a nullable Float64 array, coercing unparseable values to <NA>. """
+    try:
+        return pd.array(values, dtype=FLOAT)
+    except (TypeError, ValueError):
+        return pd.array(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce'), dtype=FLOAT)
+
+def to_timestamp_array(values: list) -> pd.DatetimeIndex:
+    """ Parses NVDB ISO 8601 dates/timestamps in one vectorised pass, coercing bad values to NaT. """
+    return pd.to_datetime(values, errors='coerce', format='ISO8601')
+
+COLUMN_BUILDERS = {
+    INT: to_int_array,
+    FLOAT: to_float_array,
+    TIMESTAMP: to_timestamp_array,
+    TEXT: lambda values: values,
+}
+
+# --- Extractor ---
+
+def build_extractor(properties: dict) -> Callable[[list], pd.DataFrame]:
+    """
+    Compiles a single-pass extractor for one NVDB object type.
+
+    'properties' maps column name -> (property id, property name, column type).
+    Properties are matched on their NVDB id; the name (case-insensitive) is
+    only used when the id is unknown (None) or missing from the response.
+    The returned function turns a list of raw NVDB objects into a DataFrame
+    with BASE_COLUMNS followed by the property columns, each already typed.
+    """
+    id_lookup = {prop_id: column for column, (prop_id, _, _) in properties.items() if prop_id is not None}
+    name_lookup = {name.lower(): column for column, (_, name, _) in properties.items()}
+    # Properties without a known id can only ever be matched by name
+    unresolved_names = {name.lower(): column for column, (prop_id, name, _) in properties.items() if prop_id is None}
+    column_types = dict(BASE_COLUMNS, **{column: col_type for column, (_, _, col_type) in properties.items()})
+
+    def extract(objects: list) -> pd.DataFrame:
+        columns = {column: [] for column in column_types}
+        nvdb_id, vegkategori = columns['nvdb_id'].append, columns['vegkategori'].append
+        fylke, kommune = columns['fylke'].append, columns['kommune'].append
+        veglenke = columns['veglenkesekvensid'].append
+        startdato, sist_modifisert = columns['startdato'].append, columns['sist_modifisert'].append
+        geometri_wkt = columns['geometri_wkt'].append
+        property_values = {column: columns[column] for column in properties}
+        property_count = len(properties)
+        empty = {}
+
+        for obj in objects:
+            lokasjon = obj.get('lokasjon') or empty
+            metadata = obj.get('metadata') or empty
+
+            nvdb_id(obj.get('id'))
+            vegsystemreferanser = lokasjon.get('vegsystemreferanser')
+            vegkategori((vegsystemreferanser[0].get('vegsystem') or empty).get('vegkategori') if vegsystemreferanser else None)
+            fylker = lokasjon.get('fylker')
+            fylke(fylker[0] if fylker else None)
+            kommuner = lokasjon.get('kommuner')
+            kommune(kommuner[0] if kommuner else None)
+            stedfestinger = lokasjon.get('stedfestinger')
+            veglenke(stedfestinger[0].get('veglenkesekvensid') if stedfestinger else None)
+            startdato(metadata.get('startdato'))
+            sist_modifisert(metadata.get('sist_modifisert'))
+            geometri_wkt((obj.get('geometri') or empty).get('wkt'))
+
+            # Every property column gets a slot, filled in place when the property is found
+            for column_values in property_values.values():
+                column_values.append(None)
+            found = 0
+            for prop in obj.get('egenskaper') or ():
+                prop_id = prop.get('id')
+                if prop_id is not None:
+                    column = id_lookup.get(prop_id)
+                    if column is None and unresolved_names:
+                        column = unresolved_names.get(str(prop.get('navn', '')).lower())
+                else:
+                    column = name_lookup.get(str(prop.get('navn', '')).lower())
+                if column is not None:
+                    property_values[column][-1] = prop.get('verdi')
+                    found += 1
+                    if found == property_count:
+                        break
+
+        if not columns['nvdb_id']:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            column: COLUMN_BUILDERS[column_types[column]](values) for column, values in columns.items()
+        })
+
+    return extract
+
+# --- Stedfestinger ---
+
+STEDFESTING_COLUMNS = {
+    'nvdb_id': INT,
+    'veglenkesekvensid': INT,
+    'startposisjon': FLOAT,
+    'sluttposisjon': FLOAT,
+}
+
+def extract_stedfestinger(objects: list) -> pd.DataFrame:
+    """
+    Returns one row per stedfesting (location interval) of each object.
+
+    Line stedfestinger keep their start/end positions; point stedfestinger
+    ('relativPosisjon') become a zero-length interval. Entries without a
+    sequence or position cannot be matched on and are skipped.
+    """
+    columns = {column: [] for column in STEDFESTING_COLUMNS}
+    nvdb_id, veglenke = columns['nvdb_id'].append, columns['veglenkesekvensid'].append
+    start, end = columns['startposisjon'].append, columns['sluttposisjon'].append
+    empty = {}
+
+    for obj in objects:
+        object_id = obj.get('id')
+        for stedfesting in (obj.get('lokasjon') or empty).get('stedfestinger') or ():
+            sequence = stedfesting.get('veglenkesekvensid')
+            position = stedfesting.get('relativPosisjon')
+            start_position = stedfesting.get('startposisjon', position)
+            end_position = stedfesting.get('sluttposisjon', position)
+            if sequence is None or start_position is None or end_position is None:
+                continue
+            nvdb_id(object_id)
+            veglenke(sequence)
+            # Intervals are stored low to high, whatever the direction
+            start(min(start_position, end_position))
+            end(max(start_position, end_position))
+
+    return pd.DataFrame({
+        column: COLUMN_BUILDERS[col_type](columns[column]) for column, col_type in STEDFESTING_COLUMNS.items()
+    })
@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Optional
+import pandas as pd
+from nvdb_extract import build_extractor, BASE_COLUMNS, INT, FLOAT, TEXT, TIMESTAMP
+
+# --- Object Type Mapping ---
+# One ObjectTypeSpec per NVDB object type the sync can ingest: which
+# properties become which typed columns, and the table they are loaded into.
+# Property ids are given where they are known; None falls back to matching the
+# property name (see nvdb_extract.build_extractor).
+
+# PostgreSQL column types for the extractor's column types
+SQL_TYPES = {
+    INT: 'INTEGER',
+    FLOAT: 'DOUBLE PRECISION',
+    TEXT: 'TEXT',
+    TIMESTAMP: 'TIMESTAMP WITH TIME ZONE',
+}
+# NVDB ids can exceed INTEGER; the other base columns use SQL_TYPES
+BASE_SQL_TYPES = {'nvdb_id': 'BIGINT', 'veglenkesekvensid': 'BIGINT'}
+# Base columns that get a plain b-tree index, for filtering and joining
+INDEXED_COLUMNS = {'fylke': 'fylke', 'kommune': 'kommune', 'veglenkesekvensid': 'veglenke'}
+
+@dataclass(frozen=True, eq=False)
+class ObjectTypeSpec:
+    """
+    How one NVDB object type is stored.
+
+    'properties' maps column name -> (property id, property name, column type),
+    as for build_extractor. 'stedfesting_table' also stores every location
+    interval of the objects, 'postgis_geom' fills the PostGIS geom column
+    (migration 011) and 'refreshes_rollup' marks the type the hendelser
+    rollup is built on.
+    """
+    object_id: int
+    name: str
+    table: str
+    properties: dict
+    index_prefix: str
+    stedfesting_table: Optional[str] = None
+    postgis_geom: bool = False
+    refreshes_rollup: bool = False
+
+    @cached_property
+    def extract(self) -> Callable[[list], pd.DataFrame]:
+        """ The compiled single-pass extractor for this object type. """
+        return build_extractor(self.properties)
+
+    @property
+    def column_types(self) -> dict:
+        """ Column name -> extractor column type, in table order. """
+        return dict(BASE_COLUMNS, **{column: col_type for column, (_, _, col_type) in self.properties.items()})
+
+    def create_table_sql(self, schema: str = 'nvdb') -> str:
+        """ Returns idempotent DDL for the table, its primary key and indexes. """
+        columns = ",\n".join(
+            f"    {column} {BASE_SQL_TYPES.get(column, SQL_TYPES[col_type])}{' NOT NULL' if column == 'nvdb_id' else ''}"
+            for column, col_type in self.column_types.items()
+        )
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {schema}.{self.table} (\n{columns},\n"
+            f"    CONSTRAINT {self.table}_pkey PRIMARY KEY (nvdb_id)\n);"
+        ]
+        statements += [
+            f"CREATE INDEX IF NOT EXISTS {self.index_prefix}_{suffix} ON {schema}.{self.table}({column});"
+            for column, suffix in INDEXED_COLUMNS.items()
+        ]
+        return "\n".join(statements)
+
+# --- Registry ---
+
+FARTSGRENSE = ObjectTypeSpec(
+    object_id=105,
+    name='Fartsgrense',
+    table='vegobjekter_fartsgrense',
+    properties={
+        'fartsgrense': (2021, 'Fartsgrense', INT),
+    },
+    # Same names as migrations 005/006
+    index_prefix='idx_vegobj_fart',
+    stedfesting_table='fartsgrense_stedfesting',
+    postgis_geom=True,
+    refreshes_rollup=True,
+)
+
+VEGBREDDE = ObjectTypeSpec(
+    object_id=583,
+    name='Vegbredde',
+    table='vegobjekter_vegbredde',
+    properties={
+        'vegbredde_totalt': (None, 'Vegbredde, totalt', FLOAT),
+        'kjorebanebredde': (None, 'Kjørebanebredde', FLOAT),
+    },
+    index_prefix='idx_vegobj_vegbredde',
+)
+
+VEGDEKKE = ObjectTypeSpec(
+    object_id=241,
+    name='Vegdekke',
+    table='vegobjekter_vegdekke',
+    properties={
+        'massetype': (None, 'Massetype', TEXT),
+        'dekkelegging_dato': (None, 'Dekkeleggingsdato', TIMESTAMP),
+    },
+    index_prefix='idx_vegobj_vegdekke',
+)
+
+TRAFIKKMENGDE = ObjectTypeSpec(
+    object_id=540,
+    name='Trafikkmengde',
+    table='vegobjekter_trafikkmengde',
+    properties={
+        'adt_total': (4623, 'ÅDT, total', INT),
+        'aar_gjelder_for': (None, 'År, gjelder for', INT),
+        'andel_lange_kjoretoy': (None, 'ÅDT, andel lange kjøretøy', FLOAT),
+    },
+    index_prefix='idx_vegobj_trafikkmengde',
+)
+
+OBJECT_TYPES = {spec.object_id: spec for spec in (FARTSGRENSE, VEGBREDDE, VEGDEKKE, TRAFIKKMENGDE)}
+
+def get_object_type(object_id) -> ObjectTypeSpec:
+    """ Returns the spec for an NVDB object type id (int or string). Raises KeyError if it has none. """
+    try:
+        return OBJECT_TYPES[int(object_id)]
+    except (TypeError, ValueError):
+        raise KeyError(object_id) from None
+
+def parse_object_ids(value: str) -> list:
+    """ Splits a comma-separated NVDB_OBJECT_ID value into specs, keeping the order and dropping repeats. """
+    specs = []
+    for object_id in str(value).split(','):
+        if object_id.strip():
+            spec = get_object_type(object_id.strip())
+            if spec not in specs:
+                specs.append(spec)
+    return specs
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Iterator, Optional
+
+# --- File Layout ---
+# <directory>/<key>/checkpoint.json    cursor state for the query
+# <directory>/<key>/page_000000.json   raw page bodies, in fetch order
+CHECKPOINT_FILE = "checkpoint.json"
+PAGE_FILE_TEMPLATE = "page_{:06d}.json"
+
+class PageCache:
+    """
+    On-disk cache of raw NVDB pages with a resumable cursor checkpoint.
+
+    Each query (URL + params) gets its own directory holding every raw page
+    fetched so far and the 'neste' cursor to continue from. A complete entry
+    can be replayed without touching the network; an incomplete one is
+    replayed and then resumed from its checkpoint. Entries are evicted by age
+    and, oldest first, by total size.
+    """
+
+    def __init__(self, directory: str, max_age_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[dict] = None) -> str:
+        """ Returns a stable cache key for a query URL (which holds the object id) and its params. """
+        query = json.dumps({'url': url, 'params': {k: str(v) for k, v in (params or {}).items()}}, sort_keys=True)
+        return hashlib.sha256(query.encode('utf-8')).hexdigest()[:32]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        """ Writes a file so readers never see it half-written. """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _is_expired(self, checkpoint: dict) -> bool:
+        if self.max_age_seconds is None:
+            return False
+        return time.time() - checkpoint.get('updated_at', 0) > self.max_age_seconds
+
+    def read_checkpoint(self, key: str) -> Optional[dict]:
+        """ Returns the checkpoint for a key, or None if missing, unreadable or expired. """
+        try:
+            with open(os.path.join(self._entry_dir(key), CHECKPOINT_FILE), 'rb') as f:
+                checkpoint = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if self._is_expired(checkpoint):
+            self.remove(key)
+            return None
+        return checkpoint
+
+    def iter_pages(self, key: str, checkpoint: dict) -> Iterator[bytes]:
+        """ Yields the raw cached pages recorded in a checkpoint, in fetch order. """
+        entry_dir = self._entry_dir(key)
+        for index in range(checkpoint.get('pages', 0)):
+            with open(os.path.join(entry_dir, PAGE_FILE_TEMPLATE.format(index)), 'rb') as f:
+                yield f.read()
+
+    def write_page(self, key: str, index: int, raw_page: bytes, next_url: Optional[str],
+                   url: str, params: Optional[dict] = None) -> None:
+        """ Stores a raw page, then moves the checkpoint past it. """
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+        self._write_atomic(os.path.join(entry_dir, PAGE_FILE_TEMPLATE.format(index)), raw_page)
+        self._write_checkpoint(key, {
+            'url': url,
+            'params': params or {},
+            'pages': index + 1,
+            'next_url': next_url,
+            'complete': next_url is None,
+        })
+
+    def mark_complete(self, key: str, checkpoint: dict) -> None:
+        """ Marks a query as fully fetched so later runs replay it from disk. """
+        self._write_checkpoint(key, dict(checkpoint, next_url=None, complete=True))
+
+    def _write_checkpoint(self, key: str, checkpoint: dict) -> None:
+        checkpoint = dict(checkpoint, updated_at=time.time())
+        path = os.path.join(self._entry_dir(key), CHECKPOINT_FILE)
+        self._write_atomic(path, json.dumps(checkpoint).encode('utf-8'))
+
+    def remove(self, key: str) -> None:
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _entry_size(self, key: str) -> int:
+        entry_dir = self._entry_dir(key)
+        return sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+
+    def evict(self) -> int:
+        """ Removes expired entries, then the oldest entries until under max_bytes. Returns entries removed. """
+        entries = []
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            checkpoint = self.read_checkpoint(entry.name)
+            if checkpoint is None:
+                # Expired (already removed by read_checkpoint) or never checkpointed
+                self.remove(entry.name)
+                removed += 1
+                continue
+            entries.append((checkpoint.get('updated_at', 0), entry.name, self._entry_size(entry.name)))
+
+        if self.max_bytes is not None:
+            total_bytes = sum(size for _, _, size in entries)
+            for _, key, size in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                self.remove(key)
+                total_bytes -= size
+                removed += 1
+        if removed:
+            print(f"Page cache: evicted {removed} entries from {self.directory}.")
+        return removed
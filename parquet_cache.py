@@ -0,0 +1,293 @@
+import importlib.util
+import json
+import os
+import shutil
+from typing import Iterable, Iterator, Optional
+import pandas as pd
+from sqlalchemy import Engine, text
+
+# pyarrow is optional: without it the report simply reads from PostgreSQL.
+# It is imported on first use of the cache, not when this module is imported.
+pa = None
+pq = None
+
+# --- Cache Layout ---
+# <directory>/hendelser/year=2023.parquet     one file per year
+# <directory>/vegobjekter_fartsgrense.parquet
+# <directory>/fartsgrense_stedfesting.parquet  refreshed together with fartsgrense
+# <directory>/manifest.json                   fingerprint of every cached file
+MANIFEST_FILE = "manifest.json"
+FARTSGRENSE_FILE = "vegobjekter_fartsgrense.parquet"
+STEDFESTING_FILE = "fartsgrense_stedfesting.parquet"
+HENDELSER_DIR = "hendelser"
+EXPORT_CHUNK_ROWS = 200_000
+
+# Cheap change detection: a year (or the fartsgrense table) is re-exported
+# when its row count or newest modification time differs from the cache.
+HENDELSER_FINGERPRINT_SQL = """
+SELECT "year", COUNT(*) AS row_count, MAX(updated_at)::text AS max_modified
+FROM nvdb.hendelser
+GROUP BY 1;
+"""
+
+FARTSGRENSE_FINGERPRINT_SQL = """
+SELECT COUNT(*) AS row_count, MAX(sist_modifisert)::text AS max_modified,
+       (SELECT COUNT(*) FROM nvdb.fartsgrense_stedfesting) AS stedfesting_rows
+FROM nvdb.vegobjekter_fartsgrense;
+"""
+
+HENDELSER_EXPORT_SQL = """
+SELECT id::text AS id, veglenkesekvensid, relativ_posisjon, vegvedlikehold, rand_float, "year", updated_at
+FROM nvdb.hendelser
+WHERE "year" = :year;
+"""
+
+# geometri_wkt is left out: it dominates the table size and no analysis uses it
+FARTSGRENSE_EXPORT_SQL = """
+SELECT nvdb_id, vegkategori, fylke, kommune, veglenkesekvensid, startdato, sist_modifisert, fartsgrense
+FROM nvdb.vegobjekter_fartsgrense;
+"""
+
+STEDFESTING_EXPORT_SQL = """
+SELECT nvdb_id, veglenkesekvensid, startposisjon, sluttposisjon
+FROM nvdb.fartsgrense_stedfesting;
+"""
+
+# Column types of each export, so an empty result is still written with its
+# columns ('timestamp' is a UTC timestamp, the rest are pyarrow type names)
+HENDELSER_EXPORT_COLUMNS = {
+    'id': 'string', 'veglenkesekvensid': 'int64', 'relativ_posisjon': 'double', 'vegvedlikehold': 'string',
+    'rand_float': 'double', 'year': 'int32', 'updated_at': 'timestamp',
+}
+FARTSGRENSE_EXPORT_COLUMNS = {
+    'nvdb_id': 'int64', 'vegkategori': 'string', 'fylke': 'int32', 'kommune': 'int32', 'veglenkesekvensid': 'int64',
+    'startdato': 'timestamp', 'sist_modifisert': 'timestamp', 'fartsgrense': 'int32',
+}
+STEDFESTING_EXPORT_COLUMNS = {
+    'nvdb_id': 'int64', 'veglenkesekvensid': 'int64', 'startposisjon': 'double', 'sluttposisjon': 'double',
+}
+
+def pyarrow_available() -> bool:
+    """ Returns True if pyarrow is installed, so the cache can be used. """
+    return pa is not None or importlib.util.find_spec('pyarrow') is not None
+
+def _import_pyarrow() -> None:
+    global pa, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.parquet
+        pa, pq = pyarrow, pyarrow.parquet
+
+def export_schema(columns: dict):
+    """ Returns the pyarrow schema for an export's column types. """
+    return pa.schema([
+        (name, pa.timestamp('us', tz='UTC') if col_type == 'timestamp' else pa.type_for_alias(col_type))
+        for name, col_type in columns.items()
+    ])
+
+def stale_entries(cached: dict, current: dict) -> tuple:
+    """ Compares fingerprints: returns (keys to (re)export, cached keys that no longer exist). """
+    stale = sorted(key for key, fingerprint in current.items() if cached.get(key) != fingerprint)
+    removed = sorted(key for key in cached if key not in current)
+    return stale, removed
+
+class LocalDatasetCache:
+    """
+    Local Parquet copy of nvdb.vegobjekter_fartsgrense (with its stedfesting
+    intervals) and nvdb.hendelser.
+
+    hendelser is stored one file per year, like its partitions, so a change
+    to one year only re-exports that year. sync() compares row counts and the
+    newest modification time per year with the database and re-exports only
+    what changed; reads are memory-mapped, so analysis and plotting run
+    offline without loading the shared database.
+    """
+
+    def __init__(self, directory: str):
+        if not pyarrow_available():
+            raise ImportError("pyarrow is required for the local dataset cache (pip install pyarrow).")
+        _import_pyarrow()
+        self.directory = directory
+        os.makedirs(os.path.join(self.directory, HENDELSER_DIR), exist_ok=True)
+
+    # --- Manifest ---
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def read_manifest(self) -> dict:
+        """ Returns the cached fingerprints, or an empty manifest if none is stored. """
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'fartsgrense': None, 'hendelser': {}}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    def hendelser_path(self, year: int) -> str:
+        return os.path.join(self.directory, HENDELSER_DIR, f"year={int(year)}.parquet")
+
+    def fartsgrense_path(self) -> str:
+        return os.path.join(self.directory, FARTSGRENSE_FILE)
+
+    def stedfesting_path(self) -> str:
+        return os.path.join(self.directory, STEDFESTING_FILE)
+
+    # --- Sync ---
+
+    def sync(self, engine: Engine) -> dict:
+        """
+        Brings the cache up to date with the database.
+
+        Only fingerprints are queried when nothing changed. Returns what was
+        refreshed: {'fartsgrense': bool, 'years': [...], 'removed_years': [...]}.
+        """
+        manifest = self.read_manifest()
+        with engine.connect() as connection:
+            hendelser_now = {
+                str(row.year): {'rows': row.row_count, 'max_modified': row.max_modified}
+                for row in connection.execute(text(HENDELSER_FINGERPRINT_SQL))
+            }
+            row = connection.execute(text(FARTSGRENSE_FINGERPRINT_SQL)).one()
+            fartsgrense_now = {'rows': row.row_count, 'max_modified': row.max_modified,
+                               'stedfesting_rows': row.stedfesting_rows}
+
+        refreshed_fartsgrense = (manifest.get('fartsgrense') != fartsgrense_now
+                                 or not os.path.exists(self.fartsgrense_path())
+                                 or not os.path.exists(self.stedfesting_path()))
+        if refreshed_fartsgrense:
+            self._export(engine, FARTSGRENSE_EXPORT_SQL, {}, self.fartsgrense_path(), FARTSGRENSE_EXPORT_COLUMNS)
+            self._export(engine, STEDFESTING_EXPORT_SQL, {}, self.stedfesting_path(), STEDFESTING_EXPORT_COLUMNS)
+            manifest['fartsgrense'] = fartsgrense_now
+            self._write_manifest(manifest)
+
+        cached_years = {year: fingerprint for year, fingerprint in manifest.get('hendelser', {}).items()
+                        if os.path.exists(self.hendelser_path(int(year)))}
+        stale_years, removed_years = stale_entries(cached_years, hendelser_now)
+        for year in stale_years:
+            self._export(engine, HENDELSER_EXPORT_SQL, {'year': int(year)}, self.hendelser_path(int(year)),
+                         HENDELSER_EXPORT_COLUMNS)
+            manifest.setdefault('hendelser', {})[year] = hendelser_now[year]
+            # Written after every year, so an interrupted sync keeps the years already exported
+            self._write_manifest(manifest)
+        for year in removed_years:
+            if os.path.exists(self.hendelser_path(int(year))):
+                os.remove(self.hendelser_path(int(year)))
+            manifest['hendelser'].pop(year, None)
+        if removed_years:
+            self._write_manifest(manifest)
+
+        print(f"Local cache: fartsgrense {'refreshed' if refreshed_fartsgrense else 'up to date'}, "
+              f"hendelser years refreshed: {stale_years or 'none'}"
+              f"{f', removed: {removed_years}' if removed_years else ''}.")
+        return {
+            'fartsgrense': refreshed_fartsgrense,
+            'years': [int(year) for year in stale_years],
+            'removed_years': [int(year) for year in removed_years],
+        }
+
+    def _read_chunks(self, engine: Engine, sql_code: str, params: dict) -> Iterator[pd.DataFrame]:
+        with engine.connect().execution_options(yield_per=EXPORT_CHUNK_ROWS) as connection:
+            yield from pd.read_sql_query(text(sql_code), connection, params=params, chunksize=EXPORT_CHUNK_ROWS,
+                                         dtype_backend='pyarrow')
+
+    def _export(self, engine: Engine, sql_code: str, params: dict, path: str, columns: dict) -> int:
+        """ Streams a query into a Parquet file chunk by chunk, replacing the file atomically. """
+        tmp_path = f"{path}.tmp"
+        writer = None
+        rows = 0
+        try:
+            for chunk in self._read_chunks(engine, sql_code, params):
+                if chunk.empty:
+                    continue
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                else:
+                    # A chunk of all-NULLs must not change the file's schema
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+                rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # Empty result: still write a file, with the export's columns, so the entry counts as cached
+            pq.write_table(export_schema(columns).empty_table(), tmp_path)
+        os.replace(tmp_path, path)
+        return rows
+
+    # --- Reads ---
+
+    def cached_years(self) -> list:
+        return sorted(int(year) for year in self.read_manifest().get('hendelser', {}))
+
+    def read_hendelser(self, years: Optional[Iterable[int]] = None, columns: Optional[list] = None) -> pd.DataFrame:
+        """ Reads cached hendelser for the given years (default: all), memory-mapped. """
+        years = self.cached_years() if years is None else sorted(set(years))
+        tables = [pq.read_table(self.hendelser_path(year), columns=columns, memory_map=True) for year in years]
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        return pa.concat_tables(tables).to_pandas()
+
+    def read_fartsgrense(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """ Reads the cached fartsgrense objects, memory-mapped. """
+        return pq.read_table(self.fartsgrense_path(), columns=columns, memory_map=True).to_pandas()
+
+    def read_stedfestinger(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """ Reads the cached stedfesting intervals of the fartsgrense objects, memory-mapped. """
+        return pq.read_table(self.stedfesting_path(), columns=columns, memory_map=True).to_pandas()
+
+    def _matched_counts(self, fartsgrense_columns: list, hendelser_columns: list, group_by: list) -> pd.DataFrame:
+        """
+        Counts hendelser per 'group_by' after matching each to its fartsgrense
+        object, one year at a time to bound memory.
+
+        Each hendelse counts once, for the interval containing its
+        relativ_posisjon; where intervals touch, the one starting last wins,
+        as in rollup.HENDELSER_FARTSGRENSE_JOIN.
+        """
+        fartsgrense = self.read_fartsgrense(columns=['nvdb_id'] + fartsgrense_columns)
+        stedfestinger = self.read_stedfestinger()
+        counts = []
+        # Nothing can match before the first sync of fartsgrense (e.g. right after migration 010)
+        years = self.cached_years() if not fartsgrense.empty and not stedfestinger.empty else []
+        for year in years:
+            hendelser = self.read_hendelser([year], columns=['veglenkesekvensid', 'relativ_posisjon'] + hendelser_columns)
+            if hendelser.empty:
+                continue
+            candidates = hendelser.reset_index(names='hendelse').merge(stedfestinger, on='veglenkesekvensid', how='inner')
+            candidates = candidates[(candidates['startposisjon'] <= candidates['relativ_posisjon'])
+                                    & (candidates['relativ_posisjon'] <= candidates['sluttposisjon'])]
+            matched = (candidates.sort_values(['startposisjon', 'nvdb_id'], ascending=[False, True])
+                       .drop_duplicates('hendelse'))
+            joined = matched.merge(fartsgrense, on='nvdb_id', how='inner')
+            counts.append(joined.groupby(group_by, dropna=False).size().rename('antall').reset_index())
+        if not counts:
+            return pd.DataFrame(columns=group_by + ['antall'])
+        return pd.concat(counts, ignore_index=True)
+
+    def _finish_counts(self, df: pd.DataFrame, group_by: list, vegkategori_names: Optional[dict]) -> pd.DataFrame:
+        if vegkategori_names:
+            df['vegkategori'] = df['vegkategori'].map(vegkategori_names).fillna(df['vegkategori'])
+        df = df.groupby(group_by, as_index=False, dropna=False)['antall'].sum()
+        return df.astype({'year': 'int64', 'antall': 'int64'}).sort_values(group_by, ignore_index=True)
+
+    def incident_breakdown(self, vegkategori_names: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Counts incidents per year, vegkategori, fylke, fartsgrense and
+        vegvedlikehold from the cache, like main.py's REPORT_SQL.
+        """
+        group_by = ['year', 'vegkategori', 'fylke', 'fartsgrense', 'vegvedlikehold']
+        df = self._matched_counts(['vegkategori', 'fylke', 'fartsgrense'], ['year', 'vegvedlikehold'], group_by)
+        return self._finish_counts(df, group_by, vegkategori_names)
+
+    def clear(self) -> None:
+        """ Removes every cached file. """
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(os.path.join(self.directory, HENDELSER_DIR), exist_ok=True)
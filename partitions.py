@@ -0,0 +1,255 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable
+import pandas as pd
+from sqlalchemy import Engine, text
+from bulk_load import copy_df
+
+# --- Partition Naming ---
+
+def partition_table_name(table_name: str, partition_value) -> str:
+    """ Returns the name of a yearly partition, e.g. 'hendelser_2023'. """
+    return f"{table_name}_{int(partition_value)}"
+
+# --- Partition Provisioning ---
+# Same DDL as migrations 003/004/007: the partition, its (id, year) primary
+# key and the veglenkesekvensid index. Every statement is idempotent.
+HENDELSER_PARTITION_SQL = [
+    """
+CREATE TABLE IF NOT EXISTS nvdb.{partition} PARTITION OF nvdb.hendelser
+    FOR VALUES FROM ({year}) TO ({next_year});
+""",
+    """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{partition}_pkey') THEN
+        ALTER TABLE nvdb.{partition} ADD PRIMARY KEY (id, "year");
+    END IF;
+END;
+$$;
+""",
+    """
+CREATE INDEX IF NOT EXISTS idx_{partition}_veglenkesekvensid ON nvdb.{partition}(veglenkesekvensid);
+""",
+]
+
+EXISTING_PARTITIONS_SQL = """
+SELECT child.relname
+FROM pg_inherits i
+JOIN pg_class child ON child.oid = i.inhrelid
+JOIN pg_class parent ON parent.oid = i.inhparent
+JOIN pg_namespace n ON n.oid = parent.relnamespace
+WHERE n.nspname = 'nvdb' AND parent.relname = 'hendelser';
+"""
+
+def ensure_hendelser_partitions(engine: Engine, years: Iterable[int]) -> list:
+    """
+    Creates any missing nvdb.hendelser_<year> partitions for the given years.
+
+    Meant to run before a load, so a year without a partition never aborts
+    it halfway. Concurrent loaders are serialised with an advisory lock.
+    Returns the years whose partitions were created.
+    """
+    years = sorted({int(year) for year in years})
+    if not years:
+        return []
+
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('nvdb.hendelser partitions'));"))
+        existing = {row[0] for row in connection.execute(text(EXISTING_PARTITIONS_SQL))}
+        missing = [year for year in years if partition_table_name('hendelser', year) not in existing]
+        for year in missing:
+            for statement in HENDELSER_PARTITION_SQL:
+                connection.execute(text(statement.format(
+                    partition=partition_table_name('hendelser', year), year=year, next_year=year + 1
+                )))
+
+    if missing:
+        print(f"Created nvdb.hendelser partitions for years: {missing}")
+    return missing
+
+# --- Partition-Aware Loader ---
+
+class _PartitionWriter:
+    """ One pooled connection COPYing into the partitions routed to it. """
+
+    def __init__(self, engine: Engine, schema: str):
+        self.schema = schema
+        self.rows = {}
+        self.lock = threading.Lock()
+        self.connection = engine.raw_connection()
+
+    def copy(self, value: int, df: pd.DataFrame, table_name: str) -> int:
+        # Chunks routed to the same connection take turns
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                rows = copy_df(cursor, df, table_name, schema=self.schema)
+            self.rows[value] = self.rows.get(value, 0) + rows
+            return rows
+
+def copy_chunks_to_partitions(engine: Engine, chunks: Iterable[pd.DataFrame], table_name: str, schema: str,
+                              partition_column: str = 'year', max_workers: int = 4, suffix: str = '') -> dict:
+    """
+    COPYs DataFrame chunks straight into the yearly partitions of a table.
+
+    Each chunk is split on 'partition_column' and every group is COPYed into
+    its own partition (e.g. nvdb.hendelser_2023), skipping partition routing
+    in the parent table ('suffix' targets e.g. hendelser_2023_staging
+    instead). At most 'max_workers' pooled connections are opened, however
+    many years the data spans: each partition value is routed to one of them
+    in turn, so chunks for a partition always load in order on the same
+    connection. At most two chunks per worker are in flight, so memory stays
+    bounded.
+
+    The partitions are committed together once every chunk has loaded; any
+    error rolls all of them back and is re-raised. Returns rows loaded per
+    partition value.
+    """
+    writers = []
+    writer_for = {}
+    pending = set()
+    max_pending = max_workers * 2
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='partition-copy') as executor:
+            try:
+                for df_chunk in chunks:
+                    if df_chunk[partition_column].isna().any():
+                        raise ValueError(f"Column '{partition_column}' has missing values; cannot pick a partition.")
+
+                    for value, df_group in df_chunk.groupby(partition_column, sort=False):
+                        value = int(value)
+                        if value not in writer_for:
+                            if len(writers) < max_workers:
+                                writers.append(_PartitionWriter(engine, schema))
+                            writer_for[value] = writers[len(writer_for) % max_workers]
+                        pending.add(executor.submit(
+                            writer_for[value].copy, value, df_group, partition_table_name(table_name, value) + suffix
+                        ))
+
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+
+                done, pending = wait(pending)
+                for future in done:
+                    future.result()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        for writer in writers:
+            writer.connection.commit()
+        return {value: writer.rows.get(value, 0) for value, writer in writer_for.items()}
+
+    except BaseException:
+        for writer in writers:
+            try:
+                writer.connection.rollback()
+            except Exception as e:
+                print(f"Error rolling back a {writer.schema}.{table_name} partition load: {e}")
+        raise
+    finally:
+        for writer in writers:
+            writer.connection.close()
+
+# --- Bulk Mode ---
+# Full reloads COPY into unindexed staging tables, build the primary key and
+# index once per table afterwards, then swap the staging tables in as the
+# partitions. Readers keep seeing the old partitions until the swap commits.
+STAGING_SUFFIX = "_staging"
+# Memory for each index build; one build runs per worker
+BULK_MAINTENANCE_WORK_MEM = "256MB"
+
+def _staging_name(year: int) -> str:
+    return partition_table_name('hendelser', year) + STAGING_SUFFIX
+
+def drop_staging_partitions(engine: Engine, years: Iterable[int]) -> None:
+    """ Drops staging tables left behind by a bulk load. """
+    with engine.begin() as connection:
+        for year in sorted({int(year) for year in years}):
+            connection.execute(text(f"DROP TABLE IF EXISTS nvdb.{_staging_name(year)};"))
+
+def create_staging_partitions(engine: Engine, years: Iterable[int]) -> None:
+    """
+    Creates an empty, unindexed staging table for each year.
+
+    The CHECK constraint matches the partition bounds, so ATTACH PARTITION
+    can trust it instead of scanning the table.
+    """
+    years = sorted({int(year) for year in years})
+    drop_staging_partitions(engine, years)
+    with engine.begin() as connection:
+        for year in years:
+            staging = _staging_name(year)
+            connection.execute(text(
+                f"CREATE TABLE nvdb.{staging} (LIKE nvdb.hendelser INCLUDING DEFAULTS, "
+                f'CONSTRAINT {staging}_year_check CHECK ("year" >= {year} AND "year" < {year + 1}));'
+            ))
+
+def _build_staging_indexes(engine: Engine, year: int) -> None:
+    staging = _staging_name(year)
+    with engine.begin() as connection:
+        connection.execute(text(f"SET LOCAL maintenance_work_mem = '{BULK_MAINTENANCE_WORK_MEM}';"))
+        connection.execute(text(f'ALTER TABLE nvdb.{staging} ADD CONSTRAINT {staging}_pkey PRIMARY KEY (id, "year");'))
+        connection.execute(text(f"CREATE INDEX idx_{staging}_veglenkesekvensid ON nvdb.{staging}(veglenkesekvensid);"))
+        connection.execute(text(f"ANALYZE nvdb.{staging};"))
+
+def build_staging_indexes(engine: Engine, years: Iterable[int], max_workers: int = 4) -> None:
+    """ Builds the primary key and veglenkesekvensid index of each staging table, years in parallel. """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='partition-index') as executor:
+        for future in [executor.submit(_build_staging_indexes, engine, year) for year in sorted(set(years))]:
+            future.result()
+
+def swap_in_staging_partitions(engine: Engine, years: Iterable[int]) -> None:
+    """
+    Replaces each year's partition with its indexed staging table, in one transaction.
+
+    The old partition is dropped, the staging table and its index names are
+    renamed to the names the migrations use, and it is attached with
+    ATTACH PARTITION. Readers see either the old or the new partitions.
+    """
+    with engine.begin() as connection:
+        for year in sorted({int(year) for year in years}):
+            partition = partition_table_name('hendelser', year)
+            staging = _staging_name(year)
+            connection.execute(text(f"DROP TABLE IF EXISTS nvdb.{partition};"))
+            connection.execute(text(f"ALTER TABLE nvdb.{staging} RENAME TO {partition};"))
+            connection.execute(text(f"ALTER TABLE nvdb.{partition} RENAME CONSTRAINT {staging}_pkey TO {partition}_pkey;"))
+            connection.execute(text(
+                f"ALTER INDEX nvdb.idx_{staging}_veglenkesekvensid RENAME TO idx_{partition}_veglenkesekvensid;"
+            ))
+            connection.execute(text(
+                f"ALTER TABLE nvdb.hendelser ATTACH PARTITION nvdb.{partition} FOR VALUES FROM ({year}) TO ({year + 1});"
+            ))
+            # The partition bound enforces the same rule from now on
+            connection.execute(text(f"ALTER TABLE nvdb.{partition} DROP CONSTRAINT {staging}_year_check;"))
+
+def bulk_load_hendelser_partitions(engine: Engine, chunks: Iterable[pd.DataFrame], years: Iterable[int],
+                                   max_workers: int = 4) -> dict:
+    """
+    Replaces the nvdb.hendelser partitions for 'years' with the rows in 'chunks'.
+
+    Meant for full reloads and backfills: rows are COPYed into unindexed
+    staging tables, the primary keys and indexes are built afterwards (one
+    sort per table instead of per-row maintenance), and the staging tables
+    are swapped in. Existing rows for those years are replaced, not kept.
+    On error the staging tables are dropped and the live partitions are left
+    untouched. Returns rows loaded per year.
+    """
+    years = sorted({int(year) for year in years})
+    create_staging_partitions(engine, years)
+    try:
+        rows_per_year = copy_chunks_to_partitions(
+            engine, chunks, 'hendelser', 'nvdb', partition_column='year', max_workers=max_workers,
+            suffix=STAGING_SUFFIX
+        )
+        print(f"Bulk mode: building indexes for {len(years)} partitions...")
+        build_staging_indexes(engine, years, max_workers=max_workers)
+        swap_in_staging_partitions(engine, years)
+    except BaseException:
+        drop_staging_partitions(engine, years)
+        raise
+    return rows_per_year
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Callable, Iterable
+
+# --- Overlapped Stages ---
+# Runs fetch -> transform -> write as three asyncio tasks joined by bounded
+# queues, so the NVDB fetch, the pandas transform and the COPY into PostgreSQL
+# overlap instead of taking turns. Each blocking step runs in a worker thread
+# (asyncio.to_thread), so the existing requests client, page cache and
+# psycopg2 COPY path are reused as they are. A full queue pauses the stage
+# before it, which keeps at most 'queue_size' pages waiting between stages.
+
+# Marks the end of the page stream on a stage queue
+_END = object()
+
+async def _fetch(iterator, out_queue: asyncio.Queue) -> None:
+    """ Pulls items from a blocking iterator in a worker thread. """
+    while True:
+        item = await asyncio.to_thread(next, iterator, _END)
+        await out_queue.put(item)
+        if item is _END:
+            return
+
+async def _transform(func: Callable, in_queue: asyncio.Queue, out_queue: asyncio.Queue) -> None:
+    """ Applies 'func' to each item in a worker thread and passes the result on. """
+    while True:
+        item = await in_queue.get()
+        if item is not _END:
+            item = await asyncio.to_thread(func, item)
+        await out_queue.put(item)
+        if item is _END:
+            return
+
+async def _write(func: Callable, in_queue: asyncio.Queue) -> None:
+    """ Hands each item to 'func' in a worker thread, one at a time and in order. """
+    while True:
+        item = await in_queue.get()
+        if item is _END:
+            return
+        await asyncio.to_thread(func, item)
+
+async def run_stages_async(items: Iterable, transform: Callable[[Any], Any], write: Callable[[Any], Any],
+                           queue_size: int = 2) -> None:
+    """
+    Streams 'items' through 'transform' and 'write' with the three stages overlapping.
+
+    The first exception from any stage cancels the others and is re-raised.
+    """
+    iterator = iter(items)
+    fetched = asyncio.Queue(maxsize=queue_size)
+    transformed = asyncio.Queue(maxsize=queue_size)
+    tasks = [
+        asyncio.create_task(_fetch(iterator, fetched), name='fetch'),
+        asyncio.create_task(_transform(transform, fetched, transformed), name='transform'),
+        asyncio.create_task(_write(write, transformed), name='write'),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+def run_stages(items: Iterable, transform: Callable[[Any], Any], write: Callable[[Any], Any],
+               queue_size: int = 2) -> None:
+    """
+    Runs run_stages_async to completion from synchronous code.
+
+    With 'queue_size' 0 the stages run one item at a time in the calling
+    thread instead, which is easier to debug and profile.
+    """
+    if queue_size <= 0:
+        for item in items:
+            write(transform(item))
+        return
+    try:
+        asyncio.run(run_stages_async(items, transform, write, queue_size=queue_size))
+    finally:
+        # asyncio.run has joined the worker threads, so a generator (e.g. the
+        # concurrent fetcher) can be closed safely to stop its own workers
+        close = getattr(items, 'close', None)
+        if close:
+            close()
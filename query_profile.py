@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+from sqlalchemy import Engine, text
+
+# --- Profiling Settings ---
+# A sequential scan reading at least this many rows is flagged
+SEQ_SCAN_MIN_ROWS = 100_000
+# Node types that read a relation through an index
+INDEX_NODE_TYPES = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+# --- Plan Helpers ---
+
+def iter_plan_nodes(plan: dict) -> Iterator[dict]:
+    """ Yields every node of an EXPLAIN (FORMAT JSON) plan tree, depth first. """
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+def rows_read(node: dict) -> int:
+    """ Returns the rows a scan node actually read: rows returned plus rows its filter removed, over all loops. """
+    loops = node.get('Actual Loops', 1) or 1
+    return int((node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * loops)
+
+def find_seq_scans(plan: dict, min_rows: int = SEQ_SCAN_MIN_ROWS) -> list:
+    """ Returns the sequential scans that read at least 'min_rows' rows, largest first. """
+    seq_scans = [
+        {'relation': f"{node.get('Schema', '')}.{node['Relation Name']}".lstrip('.'), 'rows_read': rows_read(node),
+         'filter': node.get('Filter')}
+        for node in iter_plan_nodes(plan)
+        if node.get('Node Type') == 'Seq Scan' and 'Relation Name' in node and rows_read(node) >= min_rows
+    ]
+    return sorted(seq_scans, key=lambda scan: scan['rows_read'], reverse=True)
+
+def find_indexes_used(plan: dict) -> list:
+    """ Returns the names of the indexes the plan read, e.g. idx_vegobj_fart_veglenke. """
+    return sorted({node['Index Name'] for node in iter_plan_nodes(plan)
+                   if node.get('Node Type') in INDEX_NODE_TYPES and 'Index Name' in node})
+
+# --- Profiling ---
+
+def explain_analyze(sql_code: str, db_engine: Engine) -> dict:
+    """
+    Runs a query under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and returns the plan.
+
+    ANALYZE really executes the query, so it runs inside a transaction that
+    is always rolled back.
+    """
+    explain_sql = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql_code.strip().rstrip(';')}"
+    with db_engine.connect() as connection:
+        try:
+            result = connection.execute(text(explain_sql)).scalar()
+        finally:
+            connection.rollback()
+    # psycopg2 decodes the json column; other drivers may hand back text
+    explained = json.loads(result) if isinstance(result, str) else result
+    return explained[0]
+
+def profile_query(sql_code: str, db_engine: Engine, output_dir: Optional[str] = None,
+                  min_rows: int = SEQ_SCAN_MIN_ROWS) -> dict:
+    """
+    Captures the plan and timing of a query and flags large sequential scans.
+
+    The profile (plan, timings, indexes used, flagged scans) is written as
+    JSON to 'output_dir' when given, named by time and query hash so runs
+    of the same query can be compared. Returns the profile.
+    """
+    start = time.perf_counter()
+    explained = explain_analyze(sql_code, db_engine)
+    wall_seconds = time.perf_counter() - start
+    plan = explained['Plan']
+
+    profile = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'sql_hash': hashlib.sha256(sql_code.encode('utf-8')).hexdigest()[:12],
+        'sql': sql_code,
+        'wall_seconds': round(wall_seconds, 6),
+        'planning_ms': explained.get('Planning Time'),
+        'execution_ms': explained.get('Execution Time'),
+        'shared_hit_blocks': plan.get('Shared Hit Blocks'),
+        'shared_read_blocks': plan.get('Shared Read Blocks'),
+        'indexes_used': find_indexes_used(plan),
+        'seq_scans': find_seq_scans(plan, min_rows),
+        'plan': explained,
+    }
+
+    print(f"Query profile {profile['sql_hash']}: {profile['execution_ms']} ms execution, "
+          f"{profile['planning_ms']} ms planning, indexes used: {profile['indexes_used'] or 'none'}")
+    for scan in profile['seq_scans']:
+        print(f"  Warning: sequential scan on {scan['relation']} read {scan['rows_read']:,} rows"
+              f"{' (filter: ' + scan['filter'] + ')' if scan['filter'] else ''}")
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"{datetime.now():%Y%m%dT%H%M%S}-{profile['sql_hash']}.json")
+        with open(path, 'w') as f:
+            json.dump(profile, f, indent=2, default=str)
+        print(f"  Plan saved to {path}")
+    return profile
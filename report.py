@@ -0,0 +1,191 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Optional
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg') # Headless: never open a window, render straight to files
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mticker
+
+# --- Report Settings ---
+MANIFEST_FILE = "report_manifest.json"
+UNKNOWN_LABEL = "Ukjent"
+# Bumped when the chart styling changes, so every chart is re-rendered once
+RENDER_VERSION = 1
+
+# Speed-limit bands (km/t) for the fartsgrense chart
+FARTSGRENSE_BINS = [-float('inf'), 50, 70, 90, float('inf')]
+FARTSGRENSE_BANDS = ["≤ 50 km/t", "60–70 km/t", "80–90 km/t", "≥ 100 km/t"]
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """ One bar chart: counts grouped by 'index' along the x-axis and 'columns' as bars. """
+    name: str
+    title: str
+    index: str
+    columns: str
+    xlabel: str
+    legend_title: str
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.png"
+
+INCIDENTS_PER_YEAR_CHART = ChartSpec('hendelser_per_aar', "Antall hendelser per år og vegkategori",
+                                     'year', 'vegkategori', "År", "Vegkategori")
+
+REPORT_CHARTS = [
+    INCIDENTS_PER_YEAR_CHART,
+    ChartSpec('hendelser_per_fylke', "Antall hendelser per fylke og år", 'fylke', 'year', "Fylke", "År"),
+    ChartSpec('hendelser_per_fartsgrense', "Antall hendelser per fartsgrense og år",
+              'fartsgrense_band', 'year', "Fartsgrense", "År"),
+    ChartSpec('hendelser_per_vegvedlikehold', "Antall hendelser per år og vegvedlikehold",
+              'year', 'vegvedlikehold', "År", "Vegvedlikehold"),
+]
+
+# --- Chart Data ---
+
+def prepare_report_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the derived dimensions the charts group by.
+
+    fartsgrense becomes a speed band, fylke a zero-padded label so counties
+    sort numerically, and missing values an explicit 'Ukjent' bar instead of
+    silently dropped counts.
+    """
+    df = df.copy()
+    if 'fartsgrense' in df.columns:
+        bands = pd.cut(pd.to_numeric(df['fartsgrense'], errors='coerce'), FARTSGRENSE_BINS, labels=FARTSGRENSE_BANDS)
+        df['fartsgrense_band'] = bands.cat.add_categories([UNKNOWN_LABEL]).fillna(UNKNOWN_LABEL)
+    if 'fylke' in df.columns:
+        fylke = pd.to_numeric(df['fylke'], errors='coerce').astype('Int64')
+        df['fylke'] = fylke.map(lambda value: UNKNOWN_LABEL if pd.isna(value) else f"{int(value):02d}")
+    for column in ('vegkategori', 'vegvedlikehold'):
+        if column in df.columns:
+            df[column] = df[column].fillna(UNKNOWN_LABEL)
+    return df
+
+def chart_data(df: pd.DataFrame, spec: ChartSpec) -> pd.DataFrame:
+    """ Pivots prepared report data into the chart's table: one row per x value, one column per bar. """
+    if df.empty or not {spec.index, spec.columns}.issubset(df.columns):
+        return pd.DataFrame()
+    grouped = df.groupby([spec.index, spec.columns], observed=True)
+    # Pre-aggregated counts are summed, one-row-per-incident input is counted
+    counts = grouped['antall'].sum() if 'antall' in df.columns else grouped.size()
+    return counts.astype('int64').unstack(fill_value=0)
+
+def chart_hash(spec: ChartSpec, plot_data: pd.DataFrame) -> str:
+    """ Fingerprints a chart's input, so unchanged charts are not re-rendered. """
+    digest = hashlib.sha256(f"{RENDER_VERSION}|{spec!r}|".encode('utf-8'))
+    digest.update(plot_data.to_csv().encode('utf-8'))
+    return digest.hexdigest()
+
+# --- Rendering ---
+
+def render_chart(spec: ChartSpec, plot_data: pd.DataFrame, output_path: str) -> str:
+    """ Renders one chart to a PNG file and returns its path. Runs in a worker process. """
+    fig, ax = plt.subplots(figsize=(14, 8))
+    try:
+        plot_data.plot(kind='bar', ax=ax, width=0.8)
+
+        ax.set_title(spec.title, fontsize=18, pad=20)
+        ax.set_xlabel(spec.xlabel, fontsize=14)
+        ax.set_ylabel("Antall hendelser", fontsize=14)
+        ax.tick_params(axis='x', rotation=45, labelsize=12)
+        ax.tick_params(axis='y', labelsize=12)
+        ax.legend(title=spec.legend_title, fontsize=11, title_fontsize=13)
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        ax.yaxis.set_major_locator(mticker.MaxNLocator(integer=True))
+
+        fig.tight_layout()
+        # Written next to the target and renamed, so a reader never sees half a PNG
+        tmp_path = f"{output_path}.tmp.png"
+        fig.savefig(tmp_path, bbox_inches='tight', dpi=150)
+        os.replace(tmp_path, output_path)
+    finally:
+        plt.close(fig)
+    return output_path
+
+def _read_manifest(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(output_dir: str, manifest: dict) -> None:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+def render_report(df: pd.DataFrame, output_dir: str = "images", charts: Iterable[ChartSpec] = REPORT_CHARTS,
+                  max_workers: Optional[int] = None, force: bool = False) -> dict:
+    """
+    Renders every chart of the report from one aggregate.
+
+    Each chart's input table is hashed; charts whose input and file are
+    unchanged since the last run are skipped unless 'force' is set. Changed
+    charts render in a process pool (matplotlib is single-threaded), or
+    inline when only one needs rendering. Returns {chart name: status},
+    with status 'rendered', 'unchanged', 'empty' or 'failed'.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _read_manifest(output_dir)
+    prepared = prepare_report_data(df) if isinstance(df, pd.DataFrame) else pd.DataFrame()
+
+    status = {}
+    pending = []
+    for spec in charts:
+        plot_data = chart_data(prepared, spec)
+        output_path = os.path.join(output_dir, spec.filename)
+        if plot_data.empty:
+            # A chart from an earlier run would no longer match the data
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            manifest.pop(spec.name, None)
+            status[spec.name] = 'empty'
+            continue
+        fingerprint = chart_hash(spec, plot_data)
+        if not force and manifest.get(spec.name) == fingerprint and os.path.exists(output_path):
+            status[spec.name] = 'unchanged'
+            continue
+        pending.append((spec, plot_data, output_path, fingerprint))
+
+    if max_workers is None:
+        max_workers = min(len(pending), os.cpu_count() or 1)
+
+    def finished(spec, fingerprint, error=None):
+        if error is not None:
+            print(f"An error occurred rendering chart '{spec.name}': {error}")
+            status[spec.name] = 'failed'
+            manifest.pop(spec.name, None)
+        else:
+            status[spec.name] = 'rendered'
+            manifest[spec.name] = fingerprint
+
+    if len(pending) > 1 and max_workers > 1:
+        # spawn, not fork: the pipeline modules may have background threads running
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(render_chart, spec, plot_data, output_path): (spec, fingerprint)
+                       for spec, plot_data, output_path, fingerprint in pending}
+            for future in as_completed(futures):
+                spec, fingerprint = futures[future]
+                finished(spec, fingerprint, future.exception())
+    else:
+        for spec, plot_data, output_path, fingerprint in pending:
+            try:
+                render_chart(spec, plot_data, output_path)
+                finished(spec, fingerprint)
+            except Exception as e:
+                finished(spec, fingerprint, e)
+
+    _write_manifest(output_dir, manifest)
+    failed = [name for name, state in status.items() if state == 'failed']
+    print(f"Report written to {output_dir}: {list(status.values()).count('rendered')} rendered, "
+          f"{list(status.values()).count('unchanged')} unchanged{f', failed: {failed}' if failed else ''}.")
+    return status
@@ -0,0 +1,88 @@
+from typing import Iterable, Optional
+from sqlalchemy import Engine, text
+
+# --- Shared Join ---
+# FROM clause linking each hendelse to the one fartsgrense object whose
+# stedfesting interval contains its position. Reports, detail exports and
+# the rollup all use this, so they always count the same rows. The LATERAL
+# lookup is served by the GiST index on (veglenkesekvensid, posisjon);
+# where intervals overlap, the one starting last wins.
+HENDELSER_FARTSGRENSE_JOIN = """
+    nvdb.hendelser h
+CROSS JOIN LATERAL (
+    SELECT fs.nvdb_id
+    FROM nvdb.fartsgrense_stedfesting fs
+    WHERE fs.veglenkesekvensid = h.veglenkesekvensid
+      AND fs.posisjon @> h.relativ_posisjon::numeric
+    ORDER BY fs.startposisjon DESC, fs.nvdb_id
+    LIMIT 1
+) s
+INNER JOIN
+    nvdb.vegobjekter_fartsgrense vf
+ON
+    vf.nvdb_id = s.nvdb_id
+"""
+
+ROLLUP_TABLE = "nvdb.hendelser_fartsgrense_rollup"
+
+# Held for the refresh transaction, so concurrent refreshes (e.g. a CLI run and
+# a load) take turns instead of both inserting the same years
+ROLLUP_LOCK_SQL = f"SELECT pg_advisory_xact_lock(hashtext('{ROLLUP_TABLE}'));"
+
+ROLLUP_INSERT_SQL = f"""
+INSERT INTO {ROLLUP_TABLE} ("year", vegkategori, fylke, fartsgrense, vegvedlikehold, antall)
+SELECT
+    h.year,
+    vf.vegkategori,
+    vf.fylke,
+    vf.fartsgrense,
+    h.vegvedlikehold,
+    COUNT(*) AS antall
+FROM
+    {HENDELSER_FARTSGRENSE_JOIN}
+{{where}}
+GROUP BY 1, 2, 3, 4, 5
+"""
+
+# --- Rollup Functions ---
+
+def refresh_rollup(engine: Engine, years: Optional[Iterable[int]] = None) -> int:
+    """
+    Recomputes the rollup for the given years, or for every year if None.
+
+    Only the affected years are deleted and re-aggregated, so partition
+    pruning keeps an append to one year cheap. Runs in one transaction, so
+    readers see either the old or the new counts, never a half-refreshed year;
+    concurrent refreshes are serialised with an advisory lock.
+    Returns the number of rollup rows written.
+    """
+    if years is not None:
+        years = sorted({int(year) for year in years})
+        if not years:
+            print("No affected years, rollup left unchanged.")
+            return 0
+
+    with engine.begin() as connection:
+        connection.execute(text(ROLLUP_LOCK_SQL))
+        if years is None:
+            connection.execute(text(f"DELETE FROM {ROLLUP_TABLE};"))
+            result = connection.execute(text(ROLLUP_INSERT_SQL.format(where="")))
+        else:
+            params = {'years': years}
+            connection.execute(text(f'DELETE FROM {ROLLUP_TABLE} WHERE "year" = ANY(:years);'), params)
+            result = connection.execute(text(ROLLUP_INSERT_SQL.format(where="WHERE h.year = ANY(:years)")), params)
+
+    print(f"Rollup refreshed for {'all years' if years is None else years}: {result.rowcount} rows.")
+    return result.rowcount
+
+def years_for_veglenker(engine: Engine, veglenkesekvensids: Iterable[int]) -> list:
+    """ Returns the years that have hendelser on any of the given veglenkesekvenser. """
+    ids = sorted({int(veglenke) for veglenke in veglenkesekvensids})
+    if not ids:
+        return []
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text('SELECT DISTINCT "year" FROM nvdb.hendelser WHERE veglenkesekvensid = ANY(:ids);'),
+            {'ids': ids}
+        )
+        return sorted(row[0] for row in rows)
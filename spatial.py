@@ -0,0 +1,103 @@
+import os
+from typing import Optional
+import pandas as pd
+from sqlalchemy import Engine, text
+from rollup import HENDELSER_FARTSGRENSE_JOIN
+
+# --- Settings ---
+# NVDB returns geometry in EPSG:5973 (UTM 33 + NN2000 height) unless 'srid' is requested
+NVDB_DEFAULT_SRID = 5973
+
+def configured_srid() -> int:
+    """ Returns the SRID geometry is stored in: NVDB_PARAM_SRID, or NVDB's default. """
+    return int(os.getenv("NVDB_PARAM_SRID") or NVDB_DEFAULT_SRID)
+
+def ewkt_geometry(wkt: pd.Series, srid: int) -> pd.Series:
+    """
+    Prefixes WKT strings with their SRID (EWKT), keeping nulls.
+
+    PostGIS parses EWKT text straight into a geometry column, so the geom
+    column loads through the same COPY as the rest of the row.
+    """
+    return f"SRID={int(srid)};" + wkt.astype('string')
+
+# --- Area Filters ---
+# Coordinates are in the SRID the geometry is stored in; radius is in its units (metres for UTM)
+BBOX_FILTER = "ST_Intersects({column}, ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, :srid))"
+RADIUS_FILTER = "ST_DWithin({column}, ST_SetSRID(ST_MakePoint(:x, :y), :srid), :radius)"
+
+FARTSGRENSE_IN_AREA_SQL = """
+SELECT nvdb_id, vegkategori, fylke, kommune, veglenkesekvensid, fartsgrense{extra_columns}
+FROM nvdb.vegobjekter_fartsgrense vf
+WHERE {area}
+ORDER BY {order_by};
+"""
+
+# Hendelser are narrowed to the veglenker of objects in the area first, so the
+# partition indexes on veglenkesekvensid are used instead of a full scan.
+INCIDENTS_IN_AREA_SQL = f"""
+SELECT
+    h.year,
+    vf.vegkategori,
+    COUNT(*) AS antall
+FROM
+    {HENDELSER_FARTSGRENSE_JOIN}
+WHERE h.veglenkesekvensid IN (
+    SELECT fs.veglenkesekvensid
+    FROM nvdb.fartsgrense_stedfesting fs
+    INNER JOIN nvdb.vegobjekter_fartsgrense v ON v.nvdb_id = fs.nvdb_id
+    WHERE {{inner_area}}
+)
+  AND {{area}}
+GROUP BY 1, 2
+ORDER BY 1, 2;
+"""
+
+def _query(engine: Engine, sql_code: str, params: dict) -> pd.DataFrame:
+    with engine.connect() as connection:
+        return pd.read_sql_query(text(sql_code), connection, params=params)
+
+def _bbox_params(xmin: float, ymin: float, xmax: float, ymax: float, srid: Optional[int]) -> dict:
+    if xmin > xmax or ymin > ymax:
+        raise ValueError(f"Invalid bounding box: ({xmin}, {ymin}, {xmax}, {ymax}).")
+    return {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax, 'srid': srid or configured_srid()}
+
+def _radius_params(x: float, y: float, radius: float, srid: Optional[int]) -> dict:
+    if radius < 0:
+        raise ValueError(f"Radius must not be negative, got {radius}.")
+    return {'x': x, 'y': y, 'radius': radius, 'srid': srid or configured_srid()}
+
+# --- Queries ---
+# All filtering runs in PostGIS on the GiST index idx_vegobj_fart_geom; these
+# need the migration's geom column and a load with NVDB_POSTGIS=1.
+
+def fartsgrense_in_bbox(engine: Engine, xmin: float, ymin: float, xmax: float, ymax: float,
+                        srid: Optional[int] = None) -> pd.DataFrame:
+    """ Returns the fartsgrense objects intersecting a bounding box. """
+    sql_code = FARTSGRENSE_IN_AREA_SQL.format(extra_columns="", area=BBOX_FILTER.format(column='vf.geom'),
+                                              order_by='nvdb_id')
+    return _query(engine, sql_code, _bbox_params(xmin, ymin, xmax, ymax, srid))
+
+def fartsgrense_within_radius(engine: Engine, x: float, y: float, radius: float,
+                              srid: Optional[int] = None) -> pd.DataFrame:
+    """ Returns the fartsgrense objects within 'radius' of a point, nearest first, with their distance. """
+    sql_code = FARTSGRENSE_IN_AREA_SQL.format(
+        extra_columns=",\n       ST_Distance(vf.geom, ST_SetSRID(ST_MakePoint(:x, :y), :srid)) AS distance",
+        area=RADIUS_FILTER.format(column='vf.geom'),
+        order_by='distance, nvdb_id',
+    )
+    return _query(engine, sql_code, _radius_params(x, y, radius, srid))
+
+def incidents_in_bbox(engine: Engine, xmin: float, ymin: float, xmax: float, ymax: float,
+                      srid: Optional[int] = None) -> pd.DataFrame:
+    """ Counts hendelser per year and vegkategori whose fartsgrense segment intersects a bounding box. """
+    sql_code = INCIDENTS_IN_AREA_SQL.format(inner_area=BBOX_FILTER.format(column='v.geom'),
+                                            area=BBOX_FILTER.format(column='vf.geom'))
+    return _query(engine, sql_code, _bbox_params(xmin, ymin, xmax, ymax, srid))
+
+def incidents_within_radius(engine: Engine, x: float, y: float, radius: float,
+                            srid: Optional[int] = None) -> pd.DataFrame:
+    """ Counts hendelser per year and vegkategori whose fartsgrense segment lies within 'radius' of a point. """
+    sql_code = INCIDENTS_IN_AREA_SQL.format(inner_area=RADIUS_FILTER.format(column='v.geom'),
+                                            area=RADIUS_FILTER.format(column='vf.geom'))
+    return _query(engine, sql_code, _radius_params(x, y, radius, srid))
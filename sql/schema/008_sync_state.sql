@@ -0,0 +1,13 @@
+-- +goose Up
+-- High-water marks for incremental NVDB syncs (one row per object type)
+CREATE TABLE IF NOT EXISTS nvdb.sync_state (
+    nvdb_object_id TEXT NOT NULL,          -- NVDB object type, e.g. '105'
+    target_table TEXT NOT NULL,            -- Table the object type is synced into
+    high_water_mark TIMESTAMP WITH TIME ZONE, -- Max sist_modifisert after the last successful sync
+    last_run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    rows_synced BIGINT,                    -- Rows written by the last sync
+    CONSTRAINT sync_state_pkey PRIMARY KEY (nvdb_object_id)
+);
+
+-- +goose Down
+DROP TABLE IF EXISTS nvdb.sync_state;
@@ -0,0 +1,18 @@
+-- +goose Up
+-- Pre-aggregated hendelser x fartsgrense counts for reports.
+-- Maintained per year by rollup.refresh_rollup() after each load/sync.
+CREATE TABLE IF NOT EXISTS nvdb.hendelser_fartsgrense_rollup (
+    "year" INTEGER NOT NULL,
+    vegkategori TEXT,                  -- Code, e.g. 'E', 'F', 'K'
+    fylke INTEGER,                     -- County number of the speed-limit object
+    fartsgrense INTEGER,
+    vegvedlikehold TEXT,
+    antall BIGINT NOT NULL,            -- Number of joined hendelser
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_hendelser_fartsgrense_rollup_year ON nvdb.hendelser_fartsgrense_rollup("year");
+
+-- +goose Down
+DROP INDEX IF EXISTS nvdb.idx_hendelser_fartsgrense_rollup_year;
+DROP TABLE IF EXISTS nvdb.hendelser_fartsgrense_rollup;
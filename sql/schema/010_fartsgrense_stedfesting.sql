@@ -0,0 +1,25 @@
+-- +goose Up
+-- btree_gist lets one GiST index cover both the sequence id and the interval
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- Every stedfesting (location interval) of each fartsgrense object. An object
+-- can span several veglenkesekvenser, and a sequence carries many objects,
+-- so hendelser are matched on the interval, not just the sequence.
+CREATE TABLE IF NOT EXISTS nvdb.fartsgrense_stedfesting (
+    nvdb_id BIGINT NOT NULL,                 -- The fartsgrense object (vegobjekter_fartsgrense.nvdb_id)
+    veglenkesekvensid BIGINT NOT NULL,
+    startposisjon DOUBLE PRECISION NOT NULL, -- Relative position 0..1 along the sequence
+    sluttposisjon DOUBLE PRECISION NOT NULL, -- Equal to startposisjon for point objects
+    posisjon NUMRANGE GENERATED ALWAYS AS (
+        numrange(startposisjon::numeric, sluttposisjon::numeric, '[]')
+    ) STORED,
+    CONSTRAINT fartsgrense_stedfesting_pkey PRIMARY KEY (nvdb_id, veglenkesekvensid, startposisjon)
+);
+
+-- Answers "which interval on this sequence contains this position"
+CREATE INDEX IF NOT EXISTS idx_fartsgrense_stedfesting_posisjon
+    ON nvdb.fartsgrense_stedfesting USING GIST (veglenkesekvensid, posisjon);
+
+-- +goose Down
+DROP INDEX IF EXISTS nvdb.idx_fartsgrense_stedfesting_posisjon;
+DROP TABLE IF EXISTS nvdb.fartsgrense_stedfesting;
@@ -0,0 +1,20 @@
+-- +goose Up
+-- Native PostGIS geometry for spatial filtering inside the database.
+-- PostGIS is optional: on servers without the extension this migration is a
+-- no-op and geometri_wkt stays the only geometry column. The loader fills
+-- geom only when NVDB_POSTGIS=1 (see api_to_database.py).
+-- +goose StatementBegin
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'postgis') THEN
+        CREATE EXTENSION IF NOT EXISTS postgis;
+        -- No SRID typmod: the SRID follows NVDB_PARAM_SRID (NVDB default 5973)
+        ALTER TABLE nvdb.vegobjekter_fartsgrense ADD COLUMN IF NOT EXISTS geom geometry;
+        CREATE INDEX IF NOT EXISTS idx_vegobj_fart_geom ON nvdb.vegobjekter_fartsgrense USING GIST (geom);
+    END IF;
+END $$;
+-- +goose StatementEnd
+
+-- +goose Down
+DROP INDEX IF EXISTS nvdb.idx_vegobj_fart_geom;
+ALTER TABLE nvdb.vegobjekter_fartsgrense DROP COLUMN IF EXISTS geom;
@@ -0,0 +1,65 @@
+-- +goose Up
+-- Tables for the non-fartsgrense object types in object_types.py. This is
+-- ObjectTypeSpec.create_table_sql() verbatim; tests/test_object_types.py
+-- fails if the two drift apart. The sync also runs the same DDL before
+-- loading, so a newly registered type works before its migration exists.
+
+-- Vegbredde (NVDB object type 583)
+CREATE TABLE IF NOT EXISTS nvdb.vegobjekter_vegbredde (
+    nvdb_id BIGINT NOT NULL,
+    vegkategori TEXT,
+    fylke INTEGER,
+    kommune INTEGER,
+    veglenkesekvensid BIGINT,
+    startdato TIMESTAMP WITH TIME ZONE,
+    sist_modifisert TIMESTAMP WITH TIME ZONE,
+    geometri_wkt TEXT,
+    vegbredde_totalt DOUBLE PRECISION,
+    kjorebanebredde DOUBLE PRECISION,
+    CONSTRAINT vegobjekter_vegbredde_pkey PRIMARY KEY (nvdb_id)
+);
+CREATE INDEX IF NOT EXISTS idx_vegobj_vegbredde_fylke ON nvdb.vegobjekter_vegbredde(fylke);
+CREATE INDEX IF NOT EXISTS idx_vegobj_vegbredde_kommune ON nvdb.vegobjekter_vegbredde(kommune);
+CREATE INDEX IF NOT EXISTS idx_vegobj_vegbredde_veglenke ON nvdb.vegobjekter_vegbredde(veglenkesekvensid);
+
+-- Vegdekke (NVDB object type 241)
+CREATE TABLE IF NOT EXISTS nvdb.vegobjekter_vegdekke (
+    nvdb_id BIGINT NOT NULL,
+    vegkategori TEXT,
+    fylke INTEGER,
+    kommune INTEGER,
+    veglenkesekvensid BIGINT,
+    startdato TIMESTAMP WITH TIME ZONE,
+    sist_modifisert TIMESTAMP WITH TIME ZONE,
+    geometri_wkt TEXT,
+    massetype TEXT,
+    dekkelegging_dato TIMESTAMP WITH TIME ZONE,
+    CONSTRAINT vegobjekter_vegdekke_pkey PRIMARY KEY (nvdb_id)
+);
+CREATE INDEX IF NOT EXISTS idx_vegobj_vegdekke_fylke ON nvdb.vegobjekter_vegdekke(fylke);
+CREATE INDEX IF NOT EXISTS idx_vegobj_vegdekke_kommune ON nvdb.vegobjekter_vegdekke(kommune);
+CREATE INDEX IF NOT EXISTS idx_vegobj_vegdekke_veglenke ON nvdb.vegobjekter_vegdekke(veglenkesekvensid);
+
+-- Trafikkmengde (NVDB object type 540)
+CREATE TABLE IF NOT EXISTS nvdb.vegobjekter_trafikkmengde (
+    nvdb_id BIGINT NOT NULL,
+    vegkategori TEXT,
+    fylke INTEGER,
+    kommune INTEGER,
+    veglenkesekvensid BIGINT,
+    startdato TIMESTAMP WITH TIME ZONE,
+    sist_modifisert TIMESTAMP WITH TIME ZONE,
+    geometri_wkt TEXT,
+    adt_total INTEGER,
+    aar_gjelder_for INTEGER,
+    andel_lange_kjoretoy DOUBLE PRECISION,
+    CONSTRAINT vegobjekter_trafikkmengde_pkey PRIMARY KEY (nvdb_id)
+);
+CREATE INDEX IF NOT EXISTS idx_vegobj_trafikkmengde_fylke ON nvdb.vegobjekter_trafikkmengde(fylke);
+CREATE INDEX IF NOT EXISTS idx_vegobj_trafikkmengde_kommune ON nvdb.vegobjekter_trafikkmengde(kommune);
+CREATE INDEX IF NOT EXISTS idx_vegobj_trafikkmengde_veglenke ON nvdb.vegobjekter_trafikkmengde(veglenkesekvensid);
+
+-- +goose Down
+DROP TABLE IF EXISTS nvdb.vegobjekter_trafikkmengde;
+DROP TABLE IF EXISTS nvdb.vegobjekter_vegdekke;
+DROP TABLE IF EXISTS nvdb.vegobjekter_vegbredde;
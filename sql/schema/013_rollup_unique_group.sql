@@ -0,0 +1,22 @@
+-- +goose Up
+-- One row per rollup group, so a refresh racing another one fails instead of
+-- silently double-counting in the report's SUM(antall). rollup.refresh_rollup()
+-- also serialises refreshes with an advisory lock. Every dimension except
+-- "year" may be NULL, hence NULLS NOT DISTINCT (PostgreSQL 15+).
+
+-- Drop duplicate groups left by earlier concurrent refreshes
+DELETE FROM nvdb.hendelser_fartsgrense_rollup r
+USING nvdb.hendelser_fartsgrense_rollup d
+WHERE r.ctid > d.ctid
+  AND r."year" = d."year"
+  AND r.vegkategori IS NOT DISTINCT FROM d.vegkategori
+  AND r.fylke IS NOT DISTINCT FROM d.fylke
+  AND r.fartsgrense IS NOT DISTINCT FROM d.fartsgrense
+  AND r.vegvedlikehold IS NOT DISTINCT FROM d.vegvedlikehold;
+
+ALTER TABLE nvdb.hendelser_fartsgrense_rollup
+    ADD CONSTRAINT hendelser_fartsgrense_rollup_group_key
+    UNIQUE NULLS NOT DISTINCT ("year", vegkategori, fylke, fartsgrense, vegvedlikehold);
+
+-- +goose Down
+ALTER TABLE nvdb.hendelser_fartsgrense_rollup DROP CONSTRAINT IF EXISTS hendelser_fartsgrense_rollup_group_key;
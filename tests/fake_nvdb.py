@@ -0,0 +1,112 @@
+"""
+A small local stand-in for the NVDB API (les v3) used by tests and benchmarks.
+
+Serves /vegobjekter/<object_id> with 'neste' cursor pagination and optional
+'fylke' filtering, so fetch code can be exercised over real HTTP without
+touching the network.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+class FakeNvdbServer:
+    """ Runs a fake NVDB server on localhost in a background thread. """
+
+    def __init__(self, objects_by_fylke: dict, page_size: int = 2):
+        self.objects_by_fylke = objects_by_fylke
+        self.page_size = page_size
+        self.requests = []
+        self._failures = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def fail_next(self, count: int, status: int = 503, retry_after: str = None) -> None:
+        """ Makes the next 'count' requests fail with 'status' (and an optional Retry-After header). """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _objects_for(self, query: dict) -> list:
+        """ Returns all objects matching the query, honouring a comma-separated 'fylke' filter. """
+        if 'fylke' in query:
+            fylker = [int(f) for f in query['fylke'].split(',')]
+        else:
+            fylker = sorted(self.objects_by_fylke)
+        return [obj for fylke in fylker for obj in self.objects_by_fylke.get(fylke, [])]
+
+    def _page(self, path: str, query: dict) -> dict:
+        """ Builds one page of the response, with a 'neste' href while more objects remain. """
+        objects = self._objects_for(query)
+        start = int(query.get('start', 0))
+        page = objects[start:start + self.page_size]
+        next_query = dict(query, start=start + self.page_size)
+        return {
+            'objekter': page,
+            'metadata': {
+                'returnert': len(page),
+                'neste': {'start': str(start + self.page_size), 'href': f"{self.base_url}{path}?{urlencode(next_query)}"},
+            },
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                with server._lock:
+                    server.requests.append((parsed.path, query))
+                    failure = server._failures.pop(0) if server._failures else None
+                if failure:
+                    status, retry_after = failure
+                    self.send_response(status)
+                    if retry_after is not None:
+                        self.send_header('Retry-After', retry_after)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps(server._page(parsed.path, query)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def make_objects(fylke: int, count: int, first_id: int = 1) -> list:
+    """ Creates 'count' minimal fartsgrense objects located in one fylke. """
+    return [
+        {
+            'id': first_id + i,
+            'lokasjon': {
+                'fylker': [fylke],
+                'kommuner': [fylke * 100 + 1],
+                'vegsystemreferanser': [{'vegsystem': {'vegkategori': 'F'}}],
+                'stedfestinger': [{'veglenkesekvensid': 1000 + first_id + i}],
+            },
+            'metadata': {'startdato': '2020-01-01', 'sist_modifisert': '2024-01-01T10:00:00'},
+            'egenskaper': [{'id': 2021, 'navn': 'Fartsgrense', 'verdi': 80}],
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import os
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bulk_load import (
+    qualified_table_name,
+    copy_df,
+    copy_df_to_postgres,
+    bulk_load_df,
+    upsert_df
+)
+
+
+class RecordingCursor:
+    """Minimal stand-in for a psycopg2 cursor that records COPY payloads."""
+
+    def __init__(self):
+        self.statements = []
+        self.payloads = []
+        self.rowcount = -1
+
+    def execute(self, sql):
+        self.statements.append(sql)
+        if sql.startswith("INSERT"):
+            self.rowcount = 2
+
+    def copy_expert(self, sql, file):
+        self.statements.append(sql)
+        self.payloads.append(file.read())
+
+
+class TestBulkLoad(unittest.TestCase):
+
+    def test_qualified_table_name(self):
+        self.assertEqual(qualified_table_name("hendelser", "nvdb"), '"nvdb"."hendelser"')
+        self.assertEqual(qualified_table_name("hendelser"), '"hendelser"')
+
+    def test_copy_df_writes_nulls_for_nullable_columns(self):
+        """Tests that Int64 <NA>, NaN and NaT all become the COPY NULL marker."""
+        df = pd.DataFrame({
+            'nvdb_id': pd.array([1, None], dtype='Int64'),
+            'fartsgrense': [80.0, None],
+            'startdato': pd.to_datetime(['2023-01-01', None]),
+            'vegkategori': ['E', None]
+        })
+        cursor = RecordingCursor()
+        rows = copy_df(cursor, df, "vegobjekter_fartsgrense", schema="nvdb")
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(cursor.statements, [
+            'COPY "nvdb"."vegobjekter_fartsgrense" ("nvdb_id", "fartsgrense", "startdato", "vegkategori") '
+            "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        ])
+        self.assertEqual(cursor.payloads[0].splitlines(), [
+            '1,80.0,2023-01-01,E',
+            '\\N,\\N,\\N,\\N'
+        ])
+
+    def test_copy_df_splits_into_chunks(self):
+        df = pd.DataFrame({'year': [2023, 2024, 2025, 2026, 2026]})
+        cursor = RecordingCursor()
+        copy_df(cursor, df, "hendelser", schema="nvdb", chunk_rows=2)
+        self.assertEqual(len(cursor.payloads), 3)
+        self.assertEqual(cursor.payloads[2], '2026\n')
+
+    def test_copy_df_empty(self):
+        cursor = RecordingCursor()
+        self.assertEqual(copy_df(cursor, pd.DataFrame(), "hendelser"), 0)
+        self.assertEqual(cursor.statements, [])
+
+    @patch('bulk_load.copy_df', return_value=1)
+    def test_copy_df_to_postgres_commits(self, mock_copy_df):
+        mock_engine = MagicMock()
+        raw_connection = mock_engine.raw_connection.return_value
+        copy_df_to_postgres(pd.DataFrame({'a': [1]}), "t", mock_engine, schema="s")
+
+        mock_copy_df.assert_called_once()
+        raw_connection.commit.assert_called_once()
+        raw_connection.rollback.assert_not_called()
+        raw_connection.close.assert_called_once()
+
+    @patch('bulk_load.copy_df', side_effect=Exception("COPY failed"))
+    def test_copy_df_to_postgres_rolls_back_on_error(self, mock_copy_df):
+        mock_engine = MagicMock()
+        raw_connection = mock_engine.raw_connection.return_value
+        with self.assertRaises(Exception):
+            copy_df_to_postgres(pd.DataFrame({'a': [1]}), "t", mock_engine, schema="s")
+
+        raw_connection.commit.assert_not_called()
+        raw_connection.rollback.assert_called_once()
+        raw_connection.close.assert_called_once()
+
+    @patch('bulk_load.copy_df_to_postgres', return_value=2)
+    @patch('bulk_load.pd.DataFrame.to_sql')
+    def test_bulk_load_df_creates_table_then_copies(self, mock_to_sql, mock_copy):
+        df = pd.DataFrame({'a': [1, 2]})
+        mock_engine = MagicMock()
+        rows = bulk_load_df(df, "t", mock_engine, schema="s", if_exists="replace")
+
+        self.assertEqual(rows, 2)
+        mock_to_sql.assert_called_once_with("t", mock_engine, schema="s", if_exists="replace", index=False)
+        mock_copy.assert_called_once_with(df, "t", mock_engine, schema="s", chunk_rows=50_000)
+
+    def test_upsert_df_merges_through_staging_table(self):
+        df = pd.DataFrame({'nvdb_id': [1, 2], 'fartsgrense': [80, 60]})
+        cursor = RecordingCursor()
+        rows = upsert_df(cursor, df, "vegobjekter_fartsgrense", schema="nvdb", key_columns=('nvdb_id',))
+
+        self.assertEqual(rows, 2)
+        create_sql, copy_sql, insert_sql, drop_sql = cursor.statements
+        self.assertEqual(create_sql,
+            'CREATE TEMP TABLE "_staging_vegobjekter_fartsgrense" '
+            '(LIKE "nvdb"."vegobjekter_fartsgrense" INCLUDING DEFAULTS) ON COMMIT DROP')
+        self.assertTrue(copy_sql.startswith('COPY "_staging_vegobjekter_fartsgrense" ("nvdb_id", "fartsgrense")'))
+        self.assertIn('SELECT DISTINCT ON ("nvdb_id")', insert_sql)
+        self.assertIn('ON CONFLICT ("nvdb_id") DO UPDATE SET "fartsgrense" = EXCLUDED."fartsgrense"', insert_sql)
+        self.assertEqual(drop_sql, 'DROP TABLE "_staging_vegobjekter_fartsgrense"')
+
+    def test_upsert_df_key_only_does_nothing_on_conflict(self):
+        cursor = RecordingCursor()
+        upsert_df(cursor, pd.DataFrame({'nvdb_id': [1]}), "t", key_columns=('nvdb_id',))
+        self.assertTrue(cursor.statements[2].endswith('ON CONFLICT ("nvdb_id") DO NOTHING'))
+
+
+if __name__ == '__main__':
+    unittest.main()
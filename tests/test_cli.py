@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch
+import os
+import subprocess
+
+# Add the parent directory to sys.path
+import sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import cli
+from config import ConfigError
+
+
+@patch('cli.load_env')
+class TestCli(unittest.TestCase):
+
+    @patch('api_to_database.main')
+    @patch('api_to_database.check_config')
+    def test_sync_validates_then_runs(self, mock_check, mock_main, mock_load_env):
+        self.assertEqual(cli.main(['sync']), 0)
+        mock_load_env.assert_called_once_with(None)
+        mock_check.assert_called_once()
+        mock_main.assert_called_once()
+
+    @patch('api_to_database.main')
+    @patch('api_to_database.check_config', side_effect=ConfigError("NVDB_OBJECT_ID environment variable missing."))
+    def test_config_error_exits_with_1(self, mock_check, mock_main, mock_load_env):
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(cli.main(['sync']), 1)
+        mock_main.assert_not_called()
+        mock_print.assert_called_once_with("Error: NVDB_OBJECT_ID environment variable missing.")
+
+    @patch('api_to_database.main', return_value=False)
+    @patch('api_to_database.check_config')
+    def test_failed_sync_exits_with_1(self, mock_check, mock_main, mock_load_env):
+        self.assertEqual(cli.main(['sync']), 1)
+
+    @patch('main.main', return_value=True)
+    @patch('load_and_check.main', return_value=True)
+    @patch('api_to_database.main', return_value=False)
+    @patch('main.check_config')
+    @patch('load_and_check.check_config')
+    @patch('api_to_database.check_config')
+    def test_run_fails_if_any_phase_fails(self, mock_sync_check, mock_load_check, mock_report_check,
+                                          mock_sync, mock_load, mock_report, mock_load_env):
+        """Tests that a failed sync still lets the later phases run, but fails the run."""
+        self.assertEqual(cli.main(['run']), 1)
+        mock_load.assert_called_once()
+        mock_report.assert_called_once_with(offline=False)
+
+    @patch('load_and_check.main')
+    @patch('load_and_check.check_config')
+    def test_load_and_check_subcommands(self, mock_check, mock_main, mock_load_env):
+        cli.main(['--env-file', 'ci.env', 'load', '--csv', 'data.csv', '--bulk'])
+        mock_load_env.assert_called_once_with('ci.env')
+        mock_main.assert_called_once_with(load=True, check=False, csv_path='data.csv', bulk=True)
+
+        mock_main.reset_mock()
+        cli.main(['check'])
+        mock_main.assert_called_once_with(load=False, check=True)
+
+    @patch('db.dispose_engines', return_value=1)
+    @patch('load_and_check.main')
+    @patch('load_and_check.check_config')
+    def test_phases_share_one_engine_disposed_at_exit(self, mock_check, mock_main, mock_dispose, mock_load_env):
+        import db
+        phases = []
+        mock_main.side_effect = lambda **kwargs: phases.append(db._current_phase.get())
+
+        with patch('builtins.print'):
+            cli.main(['load', '--check'])
+
+        self.assertEqual(phases, ['load', 'check'])
+        mock_dispose.assert_called_once()
+
+    @patch('main.main')
+    @patch('main.check_config')
+    def test_report_offline_needs_no_database_settings(self, mock_check, mock_main, mock_load_env):
+        cli.main(['report', '--offline', '--cache-dir', 'cache'])
+        mock_check.assert_called_once_with(offline=True)
+        self.assertEqual(mock_main.call_args.kwargs['cache_dir'], 'cache')
+        self.assertTrue(mock_main.call_args.kwargs['offline'])
+
+
+class TestCliStartup(unittest.TestCase):
+
+    def test_help_does_not_import_heavy_modules(self):
+        """Tests that the CLI itself starts without pandas, SQLAlchemy or matplotlib."""
+        code = ("import sys, contextlib, io, cli\n"
+                "with contextlib.redirect_stdout(io.StringIO()):\n"
+                "    try: cli.main(['--help'])\n"
+                "    except SystemExit: pass\n"
+                "print(sorted(m for m in ('pandas', 'sqlalchemy', 'matplotlib') if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_modules_import_without_settings(self):
+        """Tests that importing a pipeline module with no settings neither exits nor loads .env."""
+        env = {'PATH': os.environ.get('PATH', ''), 'MPLBACKEND': 'Agg'}
+        code = "import api_to_database, load_and_check, main; print(main.username)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), 'None')
+
+
+if __name__ == '__main__':
+    unittest.main()
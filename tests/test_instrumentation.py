@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import patch
+import pandas as pd
+import json
+import os
+import tempfile
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instrumentation
+from instrumentation import MetricsConfig, configure, instrument_stage, instrument_iterable, stage, dataframe_bytes
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.log_path = os.path.join(self.tmpdir.name, 'metrics.jsonl')
+        self.prom_path = os.path.join(self.tmpdir.name, 'metrics.prom')
+        self.addCleanup(configure, None)
+
+    def enable(self, prom=False):
+        configure(MetricsConfig(enabled=True, log_path=self.log_path, prom_path=self.prom_path if prom else None))
+
+    def read_records(self):
+        with open(self.log_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_config_from_env(self):
+        with patch.dict(os.environ, {'PIPELINE_METRICS': '0', 'PIPELINE_METRICS_PROM': '/tmp/x.prom'}):
+            config = MetricsConfig.from_env()
+        self.assertTrue(config.enabled) # A Prometheus path implies metrics
+        with patch.dict(os.environ, {'PIPELINE_METRICS': '0', 'PIPELINE_METRICS_PROM': ''}):
+            self.assertFalse(MetricsConfig.from_env().enabled)
+
+    def test_disabled_stage_records_nothing(self):
+        configure(MetricsConfig(enabled=False, log_path=self.log_path))
+
+        @instrument_stage()
+        def work():
+            return [1, 2, 3]
+
+        with patch('instrumentation._emit') as mock_emit:
+            self.assertEqual(work(), [1, 2, 3])
+            pages = [[1], [2]]
+            self.assertIs(instrument_iterable('pages', pages), pages)
+        mock_emit.assert_not_called()
+
+    def test_instrument_stage_records_rows_bytes_and_memory(self):
+        self.enable()
+        df = pd.DataFrame({'a': [1, 2, 3]})
+
+        @instrument_stage(count_bytes=lambda result, args, kwargs: dataframe_bytes(result))
+        def make_frame():
+            return df
+
+        self.assertIs(make_frame(), df)
+        record = self.read_records()[0]
+        self.assertEqual(record['stage'], 'make_frame')
+        self.assertEqual(record['rows'], 3)
+        self.assertEqual(record['bytes'], 24)
+        self.assertGreaterEqual(record['seconds'], 0)
+        self.assertIsNone(record['error'])
+        if instrumentation.resource is not None:
+            self.assertGreater(record['peak_rss_bytes'], 0)
+
+    def test_instrument_stage_records_error_and_reraises(self):
+        self.enable()
+
+        @instrument_stage(name='failing')
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(self.read_records()[0]['error'], "ValueError: boom")
+
+    def test_stage_bytes_counter_measures_growth(self):
+        self.enable()
+        counter = {'bytes': 100}
+        with stage('download', bytes_counter=lambda: counter['bytes']) as record:
+            counter['bytes'] += 50
+            record['rows'] = 7
+        record = self.read_records()[0]
+        self.assertEqual((record['rows'], record['bytes']), (7, 50))
+
+    def test_instrument_iterable_times_only_production(self):
+        """Tests that consumer time between items is not counted against the producer."""
+        self.enable()
+        pages = [[1, 2], [3]]
+        with patch('instrumentation.time.perf_counter', side_effect=[0.0, 1.0, 10.0, 11.0, 20.0, 21.0]):
+            consumed = list(instrument_iterable('fetch', pages))
+        self.assertEqual(consumed, pages)
+        record = self.read_records()[0]
+        self.assertEqual(record['seconds'], 3.0)
+        self.assertEqual((record['rows'], record['items']), (3, 2))
+
+    def test_prometheus_textfile_accumulates_per_stage(self):
+        self.enable(prom=True)
+
+        @instrument_stage(name='load')
+        def load(rows):
+            return rows
+
+        load(10)
+        load(5)
+        with open(self.prom_path) as f:
+            text = f.read()
+        self.assertIn('# TYPE nvdb_pipeline_stage_calls_total counter', text)
+        self.assertIn('nvdb_pipeline_stage_calls_total{stage="load"} 2', text)
+        self.assertIn('nvdb_pipeline_stage_rows_total{stage="load"} 15', text)
+        self.assertFalse(os.path.exists(self.prom_path + '.tmp'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+import json
+import tempfile
+from unittest.mock import patch, Mock
+import os
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from nvdb_client import NvdbClient, NvdbFetchError
+from page_cache import PageCache
+from tests.fake_nvdb import FakeNvdbServer, make_objects
+
+
+def make_response(status_code, json_data=None, headers=None):
+    response = Mock(status_code=status_code, headers=headers or {})
+    response.content = json.dumps(json_data or {}).encode('utf-8')
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status_code} Error")
+    return response
+
+
+class TestNvdbClient(unittest.TestCase):
+
+    def test_session_negotiates_gzip_and_nvdb_media_type(self):
+        client = NvdbClient()
+        self.assertEqual(client.session.headers['Accept-Encoding'], 'gzip')
+        self.assertEqual(client.session.headers['Accept'], 'application/vnd.vegvesen.nvdb-v3-rev1+json')
+        client.close()
+
+    @patch('nvdb_client.time.sleep')
+    def test_get_page_retries_transient_errors(self, mock_sleep):
+        client = NvdbClient(max_retries=3)
+        client.session.get = Mock(side_effect=[
+            make_response(503, headers={'Retry-After': '2'}),
+            requests.exceptions.ConnectionError("connection reset"),
+            make_response(200, {'objekter': [{'id': 1}]}),
+        ])
+
+        data = client.get_page("http://nvdb/vegobjekter/105")
+
+        self.assertEqual(data['objekter'], [{'id': 1}])
+        self.assertEqual(client.session.get.call_count, 3)
+        # Retry-After is honoured for the 503
+        self.assertEqual(mock_sleep.call_args_list[0].args[0], 2.0)
+        stats = client.stats.as_dict()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['failures'], 0)
+
+    @patch('nvdb_client.time.sleep')
+    def test_get_page_gives_up_with_resume_cursor(self, mock_sleep):
+        client = NvdbClient(max_retries=2)
+        client.session.get = Mock(return_value=make_response(503))
+
+        with self.assertRaises(NvdbFetchError) as context:
+            client.get_page("http://nvdb/vegobjekter/105?start=abc", {'fylke': '3'})
+
+        self.assertEqual(client.session.get.call_count, 3)
+        self.assertEqual(context.exception.resume_url, "http://nvdb/vegobjekter/105?start=abc")
+        self.assertEqual(context.exception.resume_params, {'fylke': '3'})
+        self.assertEqual(client.stats.as_dict()['failures'], 1)
+
+    @patch('nvdb_client.time.sleep')
+    def test_get_page_does_not_retry_client_errors(self, mock_sleep):
+        client = NvdbClient(max_retries=3)
+        client.session.get = Mock(return_value=make_response(404))
+
+        with self.assertRaises(NvdbFetchError):
+            client.get_page("http://nvdb/vegobjekter/999")
+        client.session.get.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_get_page_wraps_invalid_json(self):
+        client = NvdbClient(max_retries=0)
+        response = make_response(200)
+        response.content = b'<html>Bad gateway</html>'
+        client.session.get = Mock(return_value=response)
+
+        with self.assertRaises(NvdbFetchError) as context:
+            list(client.iter_pages("http://nvdb/vegobjekter/105", {'fylke': '3'}))
+        self.assertEqual(context.exception.resume_url, "http://nvdb/vegobjekter/105")
+        self.assertEqual(context.exception.resume_params, {'fylke': '3'})
+
+    def test_retry_delay_caps_backoff_but_honours_retry_after(self):
+        client = NvdbClient(backoff_base=1.0, backoff_max=5.0)
+        self.assertLessEqual(client.retry_delay(10), 5.0)
+        self.assertEqual(client.retry_delay(0, make_response(429, headers={'Retry-After': '600'})), 600.0)
+        self.assertEqual(client.retry_delay(0, make_response(429, headers={'Retry-After': '-3'})), 0.0)
+
+    @patch('nvdb_client.time.sleep')
+    def test_iter_pages_resumes_on_same_cursor_against_fake_server(self, mock_sleep):
+        with FakeNvdbServer({3: make_objects(3, 5)}, page_size=2) as server:
+            client = NvdbClient(max_retries=3)
+            pages = client.iter_pages(f"{server.base_url}/vegobjekter/105", {'fylke': '3'})
+            first_page = next(pages)
+            # Two 503s in the middle of the chain are retried on the same cursor
+            server.fail_next(2, status=503, retry_after='0')
+            remaining = list(pages)
+            client.close()
+
+        ids = [obj['id'] for page in [first_page] + remaining for obj in page]
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+        starts = [query.get('start') for _, query in server.requests]
+        self.assertEqual(starts, [None, '2', '2', '2', '4', '6'])
+        self.assertEqual(client.stats.as_dict()['retries'], 2)
+
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_make_key_depends_on_url_and_params(self):
+        key = PageCache.make_key("http://nvdb/vegobjekter/105", {'fylke': '3', 'srid': '5973'})
+        self.assertEqual(key, PageCache.make_key("http://nvdb/vegobjekter/105", {'srid': '5973', 'fylke': '3'}))
+        self.assertNotEqual(key, PageCache.make_key("http://nvdb/vegobjekter/105", {'fylke': '11'}))
+        self.assertNotEqual(key, PageCache.make_key("http://nvdb/vegobjekter/583", {'fylke': '3'}))
+
+    def test_complete_query_is_replayed_without_network(self):
+        cache = PageCache(self.tmp_dir.name)
+        with FakeNvdbServer({3: make_objects(3, 5)}, page_size=2) as server:
+            url = f"{server.base_url}/vegobjekter/105"
+            first_run = [obj['id'] for page in NvdbClient().iter_pages(url, {'fylke': '3'}, cache=cache) for obj in page]
+            requests_after_first_run = len(server.requests)
+            second_run = [obj['id'] for page in NvdbClient().iter_pages(url, {'fylke': '3'}, cache=cache) for obj in page]
+
+        self.assertEqual(first_run, [1, 2, 3, 4, 5])
+        self.assertEqual(second_run, first_run)
+        self.assertEqual(len(server.requests), requests_after_first_run)
+
+    @patch('nvdb_client.time.sleep')
+    def test_interrupted_query_resumes_from_checkpoint(self, mock_sleep):
+        cache = PageCache(self.tmp_dir.name)
+        with FakeNvdbServer({3: make_objects(3, 5)}, page_size=2) as server:
+            url = f"{server.base_url}/vegobjekter/105"
+            pages = NvdbClient(max_retries=0).iter_pages(url, {'fylke': '3'}, cache=cache)
+            next(pages)
+            server.fail_next(1, status=503)
+            with self.assertRaises(NvdbFetchError):
+                next(pages)
+
+            server.requests.clear()
+            resumed = [obj['id'] for page in NvdbClient().iter_pages(url, {'fylke': '3'}, cache=cache) for obj in page]
+
+        self.assertEqual(resumed, [1, 2, 3, 4, 5])
+        # The first page came from disk, the network picked up at the saved cursor
+        self.assertEqual(server.requests[0][1].get('start'), '2')
+
+    def test_missing_cached_page_raises_fetch_error_and_drops_entry(self):
+        cache = PageCache(self.tmp_dir.name)
+        with FakeNvdbServer({3: make_objects(3, 5)}, page_size=2) as server:
+            url = f"{server.base_url}/vegobjekter/105"
+            list(NvdbClient().iter_pages(url, {'fylke': '3'}, cache=cache))
+            key = cache.make_key(url, {'fylke': '3'})
+            os.remove(os.path.join(self.tmp_dir.name, key, 'page_000001.json'))
+
+            with self.assertRaises(NvdbFetchError) as context:
+                list(NvdbClient().iter_pages(url, {'fylke': '3'}, cache=cache))
+            self.assertEqual(context.exception.resume_url, url)
+            self.assertIsNone(cache.read_checkpoint(key))
+
+            # The next run fetches the query again
+            refetched = [obj['id'] for page in NvdbClient().iter_pages(url, {'fylke': '3'}, cache=cache) for obj in page]
+        self.assertEqual(refetched, [1, 2, 3, 4, 5])
+
+    def test_evict_by_age_and_size(self):
+        cache = PageCache(self.tmp_dir.name, max_bytes=400)
+        # Each entry is roughly 250 bytes (page + checkpoint), so only one fits
+        for key in ['old', 'new']:
+            cache.write_page(key, 0, b'x' * 100, None, f"http://nvdb/{key}")
+        # Age the first entry so it is the eviction candidate
+        checkpoint = cache.read_checkpoint('old')
+        checkpoint_path = os.path.join(self.tmp_dir.name, 'old', 'checkpoint.json')
+        with open(checkpoint_path, 'w') as f:
+            json.dump(dict(checkpoint, updated_at=checkpoint['updated_at'] - 60), f)
+
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.read_checkpoint('old'))
+        self.assertIsNotNone(cache.read_checkpoint('new'))
+
+        cache.max_age_seconds = 0
+        self.assertIsNone(cache.read_checkpoint('new'))
+
+
+if __name__ == '__main__':
+    unittest.main()
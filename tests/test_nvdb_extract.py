@@ -0,0 +1,118 @@
+import unittest
+import pandas as pd
+import os
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nvdb_extract import build_extractor, extract_stedfestinger, to_int_array, INT, FLOAT, TEXT
+
+
+class TestNvdbExtract(unittest.TestCase):
+
+    def setUp(self):
+        self.extract = build_extractor({
+            'fartsgrense': (2021, 'Fartsgrense', INT),
+            'bredde': (None, 'Dekkebredde', FLOAT),
+            'merknad': (1234, 'Merknad', TEXT),
+        })
+
+    def test_extracts_base_and_property_columns_in_one_pass(self):
+        objects = [
+            {
+                'id': 1,
+                'lokasjon': {
+                    'vegsystemreferanser': [{'vegsystem': {'vegkategori': 'E'}}],
+                    'fylker': [50], 'kommuner': [5001],
+                    'stedfestinger': [{'veglenkesekvensid': 100}, {'veglenkesekvensid': 200}]
+                },
+                'metadata': {'startdato': '2023-01-01', 'sist_modifisert': '2023-01-02T10:11:12'},
+                'geometri': {'wkt': 'LINESTRING Z (1 2 3, 4 5 6)'},
+                'egenskaper': [
+                    {'id': 2021, 'navn': 'Fartsgrense', 'verdi': 80},
+                    {'id': 5555, 'navn': 'Dekkebredde', 'verdi': 6.5},
+                    {'id': 1234, 'navn': 'Merknad', 'verdi': 'ok'},
+                ]
+            }
+        ]
+        df = self.extract(objects)
+
+        self.assertEqual(list(df.columns), [
+            'nvdb_id', 'vegkategori', 'fylke', 'kommune', 'veglenkesekvensid',
+            'startdato', 'sist_modifisert', 'geometri_wkt', 'fartsgrense', 'bredde', 'merknad'
+        ])
+        row = df.iloc[0]
+        self.assertEqual(row['nvdb_id'], 1)
+        self.assertEqual(row['vegkategori'], 'E')
+        self.assertEqual(row['veglenkesekvensid'], 100)
+        self.assertEqual(row['sist_modifisert'], pd.Timestamp('2023-01-02 10:11:12'))
+        self.assertEqual(row['fartsgrense'], 80)
+        # Property without a known id is matched by name
+        self.assertEqual(row['bredde'], 6.5)
+        self.assertEqual(row['merknad'], 'ok')
+        self.assertEqual(str(df['nvdb_id'].dtype), 'Int64')
+        self.assertEqual(str(df['fartsgrense'].dtype), 'Int64')
+        self.assertEqual(str(df['bredde'].dtype), 'Float64')
+
+    def test_id_takes_precedence_over_name(self):
+        objects = [{'id': 1, 'egenskaper': [
+            {'id': 9999, 'navn': 'Fartsgrense', 'verdi': 30},
+            {'id': 2021, 'navn': 'Annet navn', 'verdi': 60},
+        ]}]
+        self.assertEqual(self.extract(objects)['fartsgrense'].iloc[0], 60)
+
+    def test_name_fallback_when_response_has_no_ids(self):
+        objects = [{'id': 1, 'egenskaper': [{'navn': 'fartsgrense', 'verdi': 50}]}]
+        self.assertEqual(self.extract(objects)['fartsgrense'].iloc[0], 50)
+
+    def test_missing_data_becomes_null(self):
+        df = self.extract([{'id': 1, 'lokasjon': {'vegsystemreferanser': [], 'fylker': []}}, {}])
+        self.assertEqual(len(df), 2)
+        self.assertTrue(df['vegkategori'].isna().all())
+        self.assertTrue(df['fylke'].isna().all())
+        self.assertTrue(df['fartsgrense'].isna().all())
+        self.assertTrue(df['startdato'].isna().all())
+        self.assertTrue(pd.isna(df['nvdb_id'].iloc[1]))
+
+    def test_missing_veglenke_and_property_become_null(self):
+        df = self.extract([
+            {'id': 1, 'lokasjon': {'stedfestinger': []}, 'egenskaper': [{'navn': 'AnnenEgenskap', 'verdi': 'x'}]},
+            {'id': 2, 'lokasjon': {'stedfestinger': [{}]}},
+        ])
+        self.assertTrue(df['veglenkesekvensid'].isna().all())
+        self.assertTrue(df['fartsgrense'].isna().all())
+
+    def test_empty_input(self):
+        self.assertTrue(self.extract([]).empty)
+
+    def test_to_int_array_coerces_bad_values(self):
+        self.assertEqual(to_int_array(['80', 'x', 80.5, None, 3]).tolist(), [80, pd.NA, pd.NA, pd.NA, 3])
+
+    def test_extract_stedfestinger_one_row_per_interval(self):
+        objects = [
+            {'id': 1, 'lokasjon': {'stedfestinger': [
+                {'veglenkesekvensid': 100, 'startposisjon': 0.0, 'sluttposisjon': 0.5},
+                {'veglenkesekvensid': 200, 'startposisjon': 0.8, 'sluttposisjon': 0.2},
+            ]}},
+            {'id': 2, 'lokasjon': {'stedfestinger': [{'veglenkesekvensid': 300, 'relativPosisjon': 0.4}]}},
+            {'id': 3, 'lokasjon': {'stedfestinger': [{'veglenkesekvensid': 400}]}},
+            {'id': 4},
+        ]
+        df = extract_stedfestinger(objects)
+
+        self.assertEqual(df['nvdb_id'].tolist(), [1, 1, 2])
+        self.assertEqual(df['veglenkesekvensid'].tolist(), [100, 200, 300])
+        # Reversed intervals are stored low to high, points as zero-length intervals
+        self.assertEqual(df['startposisjon'].tolist(), [0.0, 0.2, 0.4])
+        self.assertEqual(df['sluttposisjon'].tolist(), [0.5, 0.8, 0.4])
+        self.assertEqual(str(df['veglenkesekvensid'].dtype), 'Int64')
+
+    def test_extract_stedfestinger_empty_input(self):
+        df = extract_stedfestinger([])
+        self.assertEqual(list(df.columns), ['nvdb_id', 'veglenkesekvensid', 'startposisjon', 'sluttposisjon'])
+        self.assertEqual(len(df), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
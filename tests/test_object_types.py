@@ -0,0 +1,79 @@
+import unittest
+import os
+import re
+
+# Add the parent directory to sys.path
+import sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from object_types import (
+    OBJECT_TYPES,
+    FARTSGRENSE,
+    VEGBREDDE,
+    VEGDEKKE,
+    TRAFIKKMENGDE,
+    get_object_type,
+    parse_object_ids,
+)
+
+
+def read_migration(name):
+    """ Returns the Up section of a migration, whitespace-normalised. """
+    with open(os.path.join(ROOT, 'sql', 'schema', name), encoding='utf-8') as f:
+        up = f.read().split('-- +goose Down')[0]
+    return normalise(up)
+
+def normalise(sql):
+    sql = re.sub(r'--[^\n]*', '', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class TestObjectTypes(unittest.TestCase):
+
+    def test_registry(self):
+        self.assertEqual(set(OBJECT_TYPES), {105, 583, 241, 540})
+        self.assertIs(get_object_type('540'), TRAFIKKMENGDE)
+        with self.assertRaises(KeyError):
+            get_object_type('abc')
+        tables = [spec.table for spec in OBJECT_TYPES.values()]
+        self.assertEqual(len(tables), len(set(tables)))
+
+    def test_parse_object_ids(self):
+        self.assertEqual(parse_object_ids('105, 583,105,'), [FARTSGRENSE, VEGBREDDE])
+        self.assertEqual(parse_object_ids(''), [])
+        with self.assertRaises(KeyError):
+            parse_object_ids('105,999')
+
+    def test_fartsgrense_ddl_matches_migrations_005_and_006(self):
+        ddl = normalise(FARTSGRENSE.create_table_sql())
+        migration_005 = read_migration('005_vegobjekter_fartsgrense.sql')
+        for column, _ in FARTSGRENSE.column_types.items():
+            self.assertRegex(migration_005, rf"\b{column} ")
+        for statement in read_migration('006_vegobjekter_fartsgrense_index.sql').split(';'):
+            self.assertIn(statement.strip(), ddl)
+
+    def test_migration_012_is_the_generated_ddl(self):
+        migration = read_migration('012_vegobjekter_types.sql')
+        for spec in (VEGBREDDE, VEGDEKKE, TRAFIKKMENGDE):
+            self.assertIn(normalise(spec.create_table_sql()), migration)
+
+    def test_extractor_types_columns(self):
+        objects = [{
+            'id': 1,
+            'egenskaper': [
+                {'id': 4623, 'navn': 'ÅDT, total', 'verdi': 5400},
+                {'id': 4621, 'navn': 'År, gjelder for', 'verdi': 2023},
+                {'id': 4625, 'navn': 'ÅDT, andel lange kjøretøy', 'verdi': 12.5},
+            ],
+        }]
+        df = TRAFIKKMENGDE.extract(objects)
+        self.assertEqual(list(df.columns), list(TRAFIKKMENGDE.column_types))
+        self.assertEqual(df.loc[0, ['adt_total', 'aar_gjelder_for', 'andel_lange_kjoretoy']].tolist(),
+                         [5400, 2023, 12.5])
+        self.assertEqual(str(df['adt_total'].dtype), 'Int64')
+        self.assertTrue(str(VEGDEKKE.extract([{'id': 2}])['dekkelegging_dato'].dtype).startswith('datetime64'))
+
+
+if __name__ == '__main__':
+    unittest.main()
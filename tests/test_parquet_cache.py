@@ -0,0 +1,155 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+import pandas as pd
+import os
+import tempfile
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parquet_cache import LocalDatasetCache, stale_entries, pyarrow_available
+
+FARTSGRENSE = pd.DataFrame({
+    'nvdb_id': [1, 2, 3, 4],
+    'vegkategori': ['E', 'F', 'F', 'E'],
+    'fylke': [3, 50, 50, 3],
+    'veglenkesekvensid': [100, 200, 300, 200],
+    'fartsgrense': [80, 60, 50, 70],
+})
+
+# Objects 2 and 4 share veglenke 200 and touch at 0.5
+STEDFESTINGER = pd.DataFrame({
+    'nvdb_id': [1, 2, 3, 4],
+    'veglenkesekvensid': [100, 200, 300, 200],
+    'startposisjon': [0.0, 0.0, 0.0, 0.5],
+    'sluttposisjon': [1.0, 0.5, 0.5, 1.0],
+})
+
+HENDELSER = {
+    2023: pd.DataFrame({'veglenkesekvensid': [100, 200, 200, 999], 'relativ_posisjon': [0.3, 0.2, 0.5, 0.1],
+                        'vegvedlikehold': ['ja', 'nei', 'ja', 'ja'], 'year': [2023] * 4}),
+    2024: pd.DataFrame({'veglenkesekvensid': [300, 300], 'relativ_posisjon': [0.1, 0.9],
+                        'vegvedlikehold': ['nei', 'nei'], 'year': [2024] * 2}),
+}
+
+
+def make_engine(hendelser_fingerprints, fartsgrense_fingerprint):
+    """Returns a mock engine whose fingerprint queries return the given values."""
+    engine = MagicMock()
+    connection = engine.connect.return_value.__enter__.return_value
+
+    def execute(statement, *args):
+        result = MagicMock()
+        if 'GROUP BY' in str(statement):
+            result.__iter__.return_value = iter([
+                SimpleNamespace(year=year, row_count=rows, max_modified=modified)
+                for year, (rows, modified) in hendelser_fingerprints.items()
+            ])
+        else:
+            rows, modified = fartsgrense_fingerprint
+            result.one.return_value = SimpleNamespace(row_count=rows, max_modified=modified,
+                                                      stedfesting_rows=len(STEDFESTINGER))
+        return result
+
+    connection.execute.side_effect = execute
+    return engine
+
+
+def read_chunks(self, engine, sql_code, params):
+    """Stand-in for the database export: yields the fixture rows for the query."""
+    if 'year' in params:
+        yield HENDELSER[params['year']]
+    elif 'fartsgrense_stedfesting' in sql_code:
+        yield STEDFESTINGER
+    else:
+        yield FARTSGRENSE
+
+
+class TestParquetCacheHelpers(unittest.TestCase):
+
+    def test_stale_entries(self):
+        cached = {'2022': {'rows': 1}, '2023': {'rows': 5}, '2024': {'rows': 7}}
+        current = {'2023': {'rows': 5}, '2024': {'rows': 8}, '2025': {'rows': 1}}
+        self.assertEqual(stale_entries(cached, current), (['2024', '2025'], ['2022']))
+
+
+@unittest.skipUnless(pyarrow_available(), "pyarrow is not installed")
+@patch.object(LocalDatasetCache, '_read_chunks', read_chunks)
+class TestLocalDatasetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache = LocalDatasetCache(self.tmpdir.name)
+
+    def test_sync_exports_everything_then_only_changes(self):
+        engine = make_engine({2023: (4, 't1'), 2024: (1, 't1')}, (3, 't1'))
+        with patch('builtins.print'):
+            first = self.cache.sync(engine)
+            second = self.cache.sync(engine)
+            changed = self.cache.sync(make_engine({2023: (4, 't1'), 2024: (2, 't2')}, (3, 't1')))
+            removed = self.cache.sync(make_engine({2023: (4, 't1')}, (3, 't1')))
+
+        self.assertEqual(first, {'fartsgrense': True, 'years': [2023, 2024], 'removed_years': []})
+        self.assertEqual(second, {'fartsgrense': False, 'years': [], 'removed_years': []})
+        self.assertEqual(changed, {'fartsgrense': False, 'years': [2024], 'removed_years': []})
+        self.assertEqual(removed['removed_years'], [2024])
+        self.assertFalse(os.path.exists(self.cache.hendelser_path(2024)))
+        self.assertEqual(self.cache.cached_years(), [2023])
+
+    def test_sync_reexports_missing_files(self):
+        engine = make_engine({2023: (4, 't1')}, (3, 't1'))
+        with patch('builtins.print'):
+            self.cache.sync(engine)
+            os.remove(self.cache.hendelser_path(2023))
+            self.assertEqual(self.cache.sync(engine)['years'], [2023])
+
+    def test_incident_breakdown_keeps_every_report_dimension(self):
+        """Tests that the cached join counts each hendelse once, for the interval containing it."""
+        with patch('builtins.print'):
+            self.cache.sync(make_engine({2023: (4, 't1'), 2024: (2, 't1')}, (4, 't1')))
+
+        df = self.cache.incident_breakdown({'E': 'Europaveg', 'F': 'Fylkesveg'})
+        # 200@0.5 lies on both 2 and 4 and goes to 4, which starts last; 300@0.9 lies outside 3
+        self.assertEqual(df.to_dict('records'), [
+            {'year': 2023, 'vegkategori': 'Europaveg', 'fylke': 3, 'fartsgrense': 70, 'vegvedlikehold': 'ja', 'antall': 1},
+            {'year': 2023, 'vegkategori': 'Europaveg', 'fylke': 3, 'fartsgrense': 80, 'vegvedlikehold': 'ja', 'antall': 1},
+            {'year': 2023, 'vegkategori': 'Fylkesveg', 'fylke': 50, 'fartsgrense': 60, 'vegvedlikehold': 'nei', 'antall': 1},
+            {'year': 2024, 'vegkategori': 'Fylkesveg', 'fylke': 50, 'fartsgrense': 50, 'vegvedlikehold': 'nei', 'antall': 1},
+        ])
+
+    def test_empty_fartsgrense_tables_keep_their_columns(self):
+        """Tests an offline report before the first fartsgrense sync: empty exports, no matches, no crash."""
+        def read_chunks_without_fartsgrense(cache, engine, sql_code, params):
+            if 'year' in params:
+                yield HENDELSER[params['year']]
+            else:
+                # pandas yields one empty frame for an empty result
+                yield pd.DataFrame()
+
+        with patch.object(LocalDatasetCache, '_read_chunks', read_chunks_without_fartsgrense), \
+                patch('builtins.print'):
+            self.cache.sync(make_engine({2023: (4, 't1')}, (0, None)))
+
+        df = self.cache.read_fartsgrense(columns=['nvdb_id', 'fartsgrense'])
+        self.assertEqual(df.columns.tolist(), ['nvdb_id', 'fartsgrense'])
+        self.assertTrue(df.empty)
+        self.assertEqual(self.cache.read_stedfestinger().columns.tolist(),
+                         ['nvdb_id', 'veglenkesekvensid', 'startposisjon', 'sluttposisjon'])
+        breakdown = self.cache.incident_breakdown({'E': 'Europaveg'})
+        self.assertTrue(breakdown.empty)
+        self.assertEqual(breakdown.columns.tolist(),
+                         ['year', 'vegkategori', 'fylke', 'fartsgrense', 'vegvedlikehold', 'antall'])
+
+    def test_read_hendelser_selects_years_and_columns(self):
+        with patch('builtins.print'):
+            self.cache.sync(make_engine({2023: (4, 't1'), 2024: (1, 't1')}, (3, 't1')))
+        df = self.cache.read_hendelser([2024], columns=['veglenkesekvensid'])
+        self.assertEqual(df.columns.tolist(), ['veglenkesekvensid'])
+        self.assertEqual(df['veglenkesekvensid'].tolist(), [300, 300])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import os
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from partitions import (
+    partition_table_name,
+    copy_chunks_to_partitions,
+    ensure_hendelser_partitions,
+    bulk_load_hendelser_partitions
+)
+
+
+def make_engine():
+    """Returns a mock engine handing out a fresh mock connection per raw_connection() call."""
+    engine = MagicMock()
+    engine.raw_connection.side_effect = lambda: MagicMock()
+    return engine
+
+
+class TestPartitions(unittest.TestCase):
+
+    def test_partition_table_name(self):
+        self.assertEqual(partition_table_name("hendelser", 2023), "hendelser_2023")
+        self.assertEqual(partition_table_name("hendelser", 2023.0), "hendelser_2023")
+
+    @patch('partitions.copy_df')
+    def test_copy_chunks_to_partitions_routes_rows_by_year(self, mock_copy_df):
+        """Tests that each year is COPYed into its own partition."""
+        mock_copy_df.side_effect = lambda cursor, df, table_name, schema: len(df)
+        chunks = [
+            pd.DataFrame({'veglenkesekvensid': [1, 2, 3], 'year': [2023, 2024, 2023]}),
+            pd.DataFrame({'veglenkesekvensid': [4], 'year': [2024]}),
+        ]
+        engine = make_engine()
+
+        rows = copy_chunks_to_partitions(engine, iter(chunks), "hendelser", "nvdb", max_workers=2)
+
+        self.assertEqual(rows, {2023: 2, 2024: 2})
+        self.assertEqual(engine.raw_connection.call_count, 2)
+        copied = {}
+        for call in mock_copy_df.call_args_list:
+            df, table_name = call.args[1], call.args[2]
+            self.assertEqual(call.kwargs, {'schema': "nvdb"})
+            copied.setdefault(table_name, []).extend(df['veglenkesekvensid'].tolist())
+        self.assertEqual(sorted(copied["hendelser_2023"]), [1, 3])
+        self.assertEqual(sorted(copied["hendelser_2024"]), [2, 4])
+
+    @patch('partitions.copy_df')
+    def test_copy_chunks_to_partitions_opens_at_most_max_workers_connections(self, mock_copy_df):
+        """Tests that data spanning more years than the pool holds shares max_workers connections."""
+        mock_copy_df.side_effect = lambda cursor, df, table_name, schema: len(df)
+        years = list(range(2000, 2030))
+        chunks = [pd.DataFrame({'year': years}), pd.DataFrame({'year': years[::-1]})]
+        engine = make_engine()
+
+        rows = copy_chunks_to_partitions(engine, iter(chunks), "hendelser", "nvdb", max_workers=3)
+
+        self.assertEqual(engine.raw_connection.call_count, 3)
+        self.assertEqual(rows, {year: 2 for year in years})
+        # Both chunks for a year go through the same connection
+        cursor_for = {}
+        for call in mock_copy_df.call_args_list:
+            cursor_for.setdefault(call.args[2], set()).add(id(call.args[0]))
+        self.assertEqual(len(cursor_for), 30)
+        self.assertTrue(all(len(cursors) == 1 for cursors in cursor_for.values()))
+
+    @patch('partitions.copy_df')
+    def test_copy_chunks_to_partitions_commits_every_partition(self, mock_copy_df):
+        mock_copy_df.return_value = 1
+        connections = [MagicMock(), MagicMock()]
+        engine = MagicMock()
+        engine.raw_connection.side_effect = connections
+
+        copy_chunks_to_partitions(engine, [pd.DataFrame({'year': [2022, 2023]})], "hendelser", "nvdb")
+
+        for connection in connections:
+            connection.commit.assert_called_once()
+            connection.rollback.assert_not_called()
+            connection.close.assert_called_once()
+
+    @patch('partitions.copy_df')
+    def test_copy_chunks_to_partitions_rolls_back_all_on_error(self, mock_copy_df):
+        """Tests that one failing partition rolls back every partition."""
+        def copy(cursor, df, table_name, schema):
+            if table_name == "hendelser_2024":
+                raise Exception("COPY failed")
+            return len(df)
+
+        mock_copy_df.side_effect = copy
+        connections = [MagicMock(), MagicMock()]
+        engine = MagicMock()
+        engine.raw_connection.side_effect = connections
+
+        with self.assertRaises(Exception):
+            copy_chunks_to_partitions(engine, [pd.DataFrame({'year': [2023, 2024]})], "hendelser", "nvdb")
+
+        for connection in connections:
+            connection.commit.assert_not_called()
+            connection.rollback.assert_called_once()
+            connection.close.assert_called_once()
+
+    @patch('partitions.copy_df')
+    def test_copy_chunks_to_partitions_rejects_missing_year(self, mock_copy_df):
+        engine = make_engine()
+        with self.assertRaises(ValueError):
+            copy_chunks_to_partitions(engine, [pd.DataFrame({'year': [2023, None]})], "hendelser", "nvdb")
+        mock_copy_df.assert_not_called()
+
+
+    def test_ensure_hendelser_partitions_creates_only_missing_years(self):
+        """Tests that partition, primary key and index DDL runs only for years without a partition."""
+        engine = MagicMock()
+        connection = engine.begin.return_value.__enter__.return_value
+        existing = MagicMock()
+        existing.__iter__.return_value = iter([("hendelser_2023",), ("hendelser_2024",)])
+        statements = []
+
+        def execute(statement, *args):
+            statements.append(str(statement))
+            return existing if "pg_inherits" in str(statement) else MagicMock()
+
+        connection.execute.side_effect = execute
+
+        created = ensure_hendelser_partitions(engine, [2024, 2027, 2023, 2027])
+
+        self.assertEqual(created, [2027])
+        self.assertIn("pg_advisory_xact_lock", statements[0])
+        ddl = "\n".join(statements[2:])
+        self.assertIn("CREATE TABLE IF NOT EXISTS nvdb.hendelser_2027 PARTITION OF nvdb.hendelser", ddl)
+        self.assertIn("FOR VALUES FROM (2027) TO (2028)", ddl)
+        self.assertIn("conname = 'hendelser_2027_pkey'", ddl)
+        self.assertIn("idx_hendelser_2027_veglenkesekvensid ON nvdb.hendelser_2027(veglenkesekvensid)", ddl)
+        self.assertNotIn("hendelser_2024", ddl)
+
+    def test_ensure_hendelser_partitions_no_years(self):
+        engine = MagicMock()
+        self.assertEqual(ensure_hendelser_partitions(engine, []), [])
+        engine.begin.assert_not_called()
+
+
+    @patch('partitions.copy_df')
+    def test_bulk_load_hendelser_partitions_swaps_in_indexed_staging_tables(self, mock_copy_df):
+        """Tests that bulk mode loads unindexed staging tables, indexes them, then attaches them."""
+        mock_copy_df.side_effect = lambda cursor, df, table_name, schema: len(df)
+        engine = make_engine()
+        statements = []
+        connection = engine.begin.return_value.__enter__.return_value
+        connection.execute.side_effect = lambda statement, *args: statements.append(str(statement))
+
+        rows = bulk_load_hendelser_partitions(engine, [pd.DataFrame({'year': [2023, 2023]})], [2023])
+
+        self.assertEqual(rows, {2023: 2})
+        self.assertEqual(mock_copy_df.call_args.args[2], "hendelser_2023_staging")
+        sql = "\n".join(statements)
+        create = sql.index("CREATE TABLE nvdb.hendelser_2023_staging (LIKE nvdb.hendelser")
+        pkey = sql.index("ADD CONSTRAINT hendelser_2023_staging_pkey PRIMARY KEY")
+        drop = sql.index("DROP TABLE IF EXISTS nvdb.hendelser_2023;")
+        attach = sql.index("ATTACH PARTITION nvdb.hendelser_2023 FOR VALUES FROM (2023) TO (2024)")
+        self.assertLess(create, pkey)
+        self.assertLess(pkey, drop)
+        self.assertLess(drop, attach)
+        self.assertIn("RENAME CONSTRAINT hendelser_2023_staging_pkey TO hendelser_2023_pkey", sql)
+        self.assertIn("RENAME TO idx_hendelser_2023_veglenkesekvensid", sql)
+
+    @patch('partitions.copy_df', side_effect=Exception("COPY failed"))
+    def test_bulk_load_hendelser_partitions_drops_staging_on_error(self, mock_copy_df):
+        """Tests that a failed bulk load leaves the live partitions alone and cleans up staging."""
+        engine = make_engine()
+        statements = []
+        connection = engine.begin.return_value.__enter__.return_value
+        connection.execute.side_effect = lambda statement, *args: statements.append(str(statement))
+
+        with self.assertRaises(Exception):
+            bulk_load_hendelser_partitions(engine, [pd.DataFrame({'year': [2023]})], [2023])
+
+        self.assertEqual(statements[-1], "DROP TABLE IF EXISTS nvdb.hendelser_2023_staging;")
+        self.assertFalse(any("ATTACH PARTITION" in statement for statement in statements))
+        self.assertFalse(any(statement == "DROP TABLE IF EXISTS nvdb.hendelser_2023;" for statement in statements))
+
+
+if __name__ == '__main__':
+    unittest.main()
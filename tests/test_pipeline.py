@@ -0,0 +1,77 @@
+import unittest
+import threading
+import time
+
+# Add the parent directory to sys.path
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline import run_stages
+
+
+def slow_pages(count, delay, fetched=None):
+    """ Yields 'count' pages, sleeping 'delay' seconds before each like a slow HTTP fetch. """
+    for number in range(count):
+        time.sleep(delay)
+        if fetched is not None:
+            fetched.append(number)
+        yield number
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_stages_overlap(self):
+        """Tests that total time approaches the slowest stage rather than the sum of all three."""
+        written = []
+        start = time.perf_counter()
+        run_stages(slow_pages(8, 0.05), lambda page: time.sleep(0.05) or page,
+                   lambda page: time.sleep(0.05) or written.append(page), queue_size=2)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(written, list(range(8)))
+        # Serially this takes 8 * 3 * 0.05 = 1.2 s; overlapped about (8 + 2) * 0.05
+        self.assertLess(elapsed, 0.9)
+
+    def test_queues_apply_backpressure(self):
+        """Tests that a slow writer stops the fetcher from running far ahead."""
+        fetched, ahead = [], []
+        def write(page):
+            ahead.append(len(fetched) - page)
+            time.sleep(0.02)
+
+        run_stages(slow_pages(20, 0, fetched), lambda page: page, write, queue_size=2)
+        # Two queues of two pages plus one page in flight per stage
+        self.assertLessEqual(max(ahead), 2 * 2 + 3)
+
+    def test_writer_error_stops_the_pipeline(self):
+        fetched = []
+        pages = slow_pages(100, 0.001, fetched)
+        def write(page):
+            if page == 3:
+                raise RuntimeError("Page 3 failed to load")
+
+        with self.assertRaisesRegex(RuntimeError, "Page 3"):
+            run_stages(pages, lambda page: page, write, queue_size=2)
+        self.assertLess(len(fetched), 100)
+        # The page source is closed once every worker thread is done with it
+        with self.assertRaises(StopIteration):
+            next(pages)
+
+    def test_fetch_error_propagates(self):
+        def pages():
+            yield 1
+            raise ConnectionError("NVDB unavailable")
+        written = []
+
+        with self.assertRaises(ConnectionError):
+            run_stages(pages(), lambda page: page, written.append, queue_size=2)
+
+    def test_queue_size_zero_runs_in_calling_thread(self):
+        threads = set()
+        run_stages(range(3), lambda page: page, lambda page: threads.add(threading.get_ident()), queue_size=0)
+        self.assertEqual(threads, {threading.get_ident()})
+
+
+if __name__ == '__main__':
+    unittest.main()
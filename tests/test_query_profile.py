@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import os
+import tempfile
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from query_profile import find_seq_scans, find_indexes_used, explain_analyze, profile_query
+
+# Trimmed EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output for the report join
+SAMPLE_EXPLAIN = [{
+    'Plan': {
+        'Node Type': 'Hash Join', 'Actual Rows': 900, 'Actual Loops': 1,
+        'Shared Hit Blocks': 120, 'Shared Read Blocks': 30,
+        'Plans': [
+            {'Node Type': 'Append', 'Actual Rows': 250_000, 'Actual Loops': 1, 'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'hendelser_2023', 'Schema': 'nvdb',
+                 'Actual Rows': 200_000, 'Actual Loops': 1},
+                {'Node Type': 'Seq Scan', 'Relation Name': 'hendelser_2022', 'Schema': 'nvdb',
+                 'Actual Rows': 40, 'Rows Removed by Filter': 10, 'Actual Loops': 1, 'Filter': '(year = 2022)'},
+            ]},
+            {'Node Type': 'Hash', 'Actual Rows': 5_000, 'Actual Loops': 1, 'Plans': [
+                {'Node Type': 'Index Scan', 'Relation Name': 'vegobjekter_fartsgrense', 'Schema': 'nvdb',
+                 'Index Name': 'idx_vegobj_fart_veglenke', 'Actual Rows': 5_000, 'Actual Loops': 1},
+            ]},
+        ],
+    },
+    'Planning Time': 0.8,
+    'Execution Time': 412.5,
+}]
+
+
+class TestQueryProfile(unittest.TestCase):
+
+    def test_find_seq_scans_flags_only_large_scans(self):
+        plan = SAMPLE_EXPLAIN[0]['Plan']
+        self.assertEqual(find_seq_scans(plan, min_rows=100_000), [
+            {'relation': 'nvdb.hendelser_2023', 'rows_read': 200_000, 'filter': None}
+        ])
+        # Rows removed by the filter count as read too
+        self.assertEqual([scan['rows_read'] for scan in find_seq_scans(plan, min_rows=0)], [200_000, 50])
+
+    def test_find_indexes_used(self):
+        self.assertEqual(find_indexes_used(SAMPLE_EXPLAIN[0]['Plan']), ['idx_vegobj_fart_veglenke'])
+
+    def test_explain_analyze_rolls_back(self):
+        """Tests that the query runs under EXPLAIN ANALYZE in a transaction that is rolled back."""
+        engine = MagicMock()
+        connection = engine.connect.return_value.__enter__.return_value
+        connection.execute.return_value.scalar.return_value = json.dumps(SAMPLE_EXPLAIN)
+
+        explained = explain_analyze("SELECT 1;\n", engine)
+
+        self.assertEqual(explained['Execution Time'], 412.5)
+        sql = str(connection.execute.call_args.args[0])
+        self.assertEqual(sql, "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT 1")
+        connection.rollback.assert_called_once()
+
+    @patch('query_profile.explain_analyze', return_value=SAMPLE_EXPLAIN[0])
+    def test_profile_query_saves_plan_and_flags(self, mock_explain):
+        with tempfile.TemporaryDirectory() as output_dir:
+            profile = profile_query("SELECT 1", MagicMock(), output_dir=output_dir)
+            files = os.listdir(output_dir)
+            self.assertEqual(len(files), 1)
+            self.assertTrue(files[0].endswith(f"-{profile['sql_hash']}.json"))
+            with open(os.path.join(output_dir, files[0])) as f:
+                saved = json.load(f)
+
+        self.assertEqual(saved['execution_ms'], 412.5)
+        self.assertEqual(saved['indexes_used'], ['idx_vegobj_fart_veglenke'])
+        self.assertEqual([scan['relation'] for scan in saved['seq_scans']], ['nvdb.hendelser_2023'])
+        self.assertEqual(saved['plan'], SAMPLE_EXPLAIN[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import patch
+import pandas as pd
+import os
+import json
+import tempfile
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from report import (
+    prepare_report_data,
+    chart_data,
+    render_report,
+    REPORT_CHARTS,
+    INCIDENTS_PER_YEAR_CHART,
+    MANIFEST_FILE,
+)
+
+REPORT_DATA = pd.DataFrame({
+    'year': [2023, 2023, 2024, 2024],
+    'vegkategori': ['Europaveg', 'Fylkesveg', 'Europaveg', None],
+    'fylke': [3, 50, 3, None],
+    'fartsgrense': [50, 80, 110, None],
+    'vegvedlikehold': ['ja', 'nei', 'ja', 'nei'],
+    'antall': [2, 3, 4, 1],
+})
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_prepare_report_data_derives_dimensions(self):
+        df = prepare_report_data(REPORT_DATA)
+        self.assertEqual(df['fartsgrense_band'].astype(str).tolist(),
+                         ['≤ 50 km/t', '80–90 km/t', '≥ 100 km/t', 'Ukjent'])
+        self.assertEqual(df['fylke'].tolist(), ['03', '50', '03', 'Ukjent'])
+        self.assertEqual(df['vegkategori'].tolist(), ['Europaveg', 'Fylkesveg', 'Europaveg', 'Ukjent'])
+
+    def test_chart_data_sums_counts(self):
+        plot_data = chart_data(prepare_report_data(REPORT_DATA), INCIDENTS_PER_YEAR_CHART)
+        self.assertEqual(plot_data.loc[2023].to_dict(), {'Europaveg': 2, 'Fylkesveg': 3, 'Ukjent': 0})
+        self.assertEqual(plot_data.loc[2024].to_dict(), {'Europaveg': 4, 'Fylkesveg': 0, 'Ukjent': 1})
+
+    def test_chart_data_counts_rows_without_antall(self):
+        df = pd.DataFrame({'year': [2023, 2023], 'vegkategori': ['E', 'E']})
+        self.assertEqual(chart_data(df, INCIDENTS_PER_YEAR_CHART).loc[2023, 'E'], 2)
+
+    @patch('builtins.print')
+    def test_render_report_skips_unchanged_charts(self, mock_print):
+        first = render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1)
+        second = render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1)
+
+        self.assertEqual(set(first.values()), {'rendered'})
+        self.assertEqual(set(second.values()), {'unchanged'})
+        for spec in REPORT_CHARTS:
+            self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, spec.filename)))
+
+        # Only charts whose aggregate changed are re-rendered
+        changed = REPORT_DATA.assign(vegvedlikehold=['ja', 'ja', 'ja', 'nei'])
+        third = render_report(changed, output_dir=self.tmpdir.name, max_workers=1)
+        self.assertEqual(third['hendelser_per_vegvedlikehold'], 'rendered')
+        self.assertEqual(third['hendelser_per_aar'], 'unchanged')
+
+    @patch('builtins.print')
+    def test_render_report_rerenders_missing_files_and_force(self, mock_print):
+        render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1)
+        os.remove(os.path.join(self.tmpdir.name, INCIDENTS_PER_YEAR_CHART.filename))
+
+        status = render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1)
+        self.assertEqual(status['hendelser_per_aar'], 'rendered')
+        self.assertEqual(status['hendelser_per_fylke'], 'unchanged')
+
+        forced = render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1, force=True)
+        self.assertEqual(set(forced.values()), {'rendered'})
+
+    @patch('builtins.print')
+    def test_render_report_in_process_pool(self, mock_print):
+        status = render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=2)
+
+        self.assertEqual(set(status.values()), {'rendered'})
+        with open(os.path.join(self.tmpdir.name, MANIFEST_FILE)) as f:
+            self.assertEqual(set(json.load(f)), {spec.name for spec in REPORT_CHARTS})
+
+    @patch('builtins.print')
+    @patch('report.render_chart', side_effect=RuntimeError("disk full"))
+    def test_render_report_failed_chart_is_retried_next_run(self, mock_render, mock_print):
+        status = render_report(REPORT_DATA, output_dir=self.tmpdir.name, charts=[INCIDENTS_PER_YEAR_CHART])
+        self.assertEqual(status, {'hendelser_per_aar': 'failed'})
+        with open(os.path.join(self.tmpdir.name, MANIFEST_FILE)) as f:
+            self.assertEqual(json.load(f), {})
+
+    @patch('builtins.print')
+    def test_render_report_empty_data(self, mock_print):
+        status = render_report(pd.DataFrame(), output_dir=self.tmpdir.name)
+        self.assertEqual(set(status.values()), {'empty'})
+
+    @patch('builtins.print')
+    def test_render_report_empty_data_removes_stale_charts(self, mock_print):
+        """Tests that a chart whose data emptied is deleted and re-rendered once data returns."""
+        render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1)
+
+        status = render_report(pd.DataFrame(), output_dir=self.tmpdir.name)
+        self.assertEqual(set(status.values()), {'empty'})
+        for spec in REPORT_CHARTS:
+            self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, spec.filename)))
+        with open(os.path.join(self.tmpdir.name, MANIFEST_FILE)) as f:
+            self.assertEqual(json.load(f), {})
+
+        status = render_report(REPORT_DATA, output_dir=self.tmpdir.name, max_workers=1)
+        self.assertEqual(set(status.values()), {'rendered'})
+
+
+if __name__ == '__main__':
+    unittest.main()
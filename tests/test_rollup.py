@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rollup import refresh_rollup, years_for_veglenker
+
+
+class TestRollup(unittest.TestCase):
+
+    def make_engine(self, rowcount=4):
+        mock_engine = MagicMock()
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.rowcount = rowcount
+        return mock_engine, connection
+
+    def test_refresh_rollup_only_recomputes_affected_years(self):
+        mock_engine, connection = self.make_engine()
+        rows = refresh_rollup(mock_engine, years=[2024, 2023, 2024])
+
+        self.assertEqual(rows, 4)
+        lock_call, delete_call, insert_call = connection.execute.call_args_list
+        # Taken first, so a concurrent refresh waits before deleting anything
+        self.assertEqual(str(lock_call.args[0]),
+                         "SELECT pg_advisory_xact_lock(hashtext('nvdb.hendelser_fartsgrense_rollup'));")
+        self.assertIn('DELETE FROM nvdb.hendelser_fartsgrense_rollup WHERE "year" = ANY(:years)', str(delete_call.args[0]))
+        self.assertEqual(delete_call.args[1], {'years': [2023, 2024]})
+        self.assertIn('WHERE h.year = ANY(:years)', str(insert_call.args[0]))
+        self.assertIn('GROUP BY 1, 2, 3, 4, 5', str(insert_call.args[0]))
+
+    def test_refresh_rollup_all_years(self):
+        mock_engine, connection = self.make_engine()
+        refresh_rollup(mock_engine)
+
+        lock_call, delete_call, insert_call = connection.execute.call_args_list
+        self.assertIn('pg_advisory_xact_lock', str(lock_call.args[0]))
+        self.assertEqual(str(delete_call.args[0]), 'DELETE FROM nvdb.hendelser_fartsgrense_rollup;')
+        self.assertNotIn('h.year = ANY', str(insert_call.args[0]))
+
+    def test_rollup_matches_one_fartsgrense_interval_per_hendelse(self):
+        mock_engine, connection = self.make_engine()
+        refresh_rollup(mock_engine)
+
+        insert_sql = str(connection.execute.call_args_list[2].args[0])
+        self.assertIn('fs.posisjon @> h.relativ_posisjon::numeric', insert_sql)
+        self.assertIn('LIMIT 1', insert_sql)
+        self.assertIn('vf.nvdb_id = s.nvdb_id', insert_sql)
+
+    def test_refresh_rollup_no_years_is_a_no_op(self):
+        mock_engine, connection = self.make_engine()
+        self.assertEqual(refresh_rollup(mock_engine, years=[]), 0)
+        mock_engine.begin.assert_not_called()
+
+    def test_years_for_veglenker(self):
+        mock_engine = MagicMock()
+        connection = mock_engine.connect.return_value.__enter__.return_value
+        connection.execute.return_value = [(2025,), (2023,)]
+
+        self.assertEqual(years_for_veglenker(mock_engine, {10, 20}), [2023, 2025])
+        self.assertEqual(connection.execute.call_args.args[1], {'ids': [10, 20]})
+        self.assertEqual(years_for_veglenker(mock_engine, []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
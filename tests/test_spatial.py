@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import os
+
+# Add the parent directory to sys.path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from spatial import (
+    configured_srid,
+    ewkt_geometry,
+    fartsgrense_in_bbox,
+    fartsgrense_within_radius,
+    incidents_in_bbox,
+    incidents_within_radius,
+)
+
+
+class TestSpatial(unittest.TestCase):
+
+    def test_ewkt_geometry_keeps_nulls(self):
+        wkt = pd.Series(['LINESTRING Z (1 2 3, 4 5 6)', None])
+        ewkt = ewkt_geometry(wkt, 5973)
+        self.assertEqual(ewkt.iloc[0], 'SRID=5973;LINESTRING Z (1 2 3, 4 5 6)')
+        self.assertTrue(pd.isna(ewkt.iloc[1]))
+
+    @patch.dict(os.environ, {'NVDB_PARAM_SRID': '4326'})
+    def test_configured_srid_from_env(self):
+        self.assertEqual(configured_srid(), 4326)
+
+    @patch.dict(os.environ, {'NVDB_PARAM_SRID': ''})
+    def test_configured_srid_defaults_to_nvdb(self):
+        self.assertEqual(configured_srid(), 5973)
+
+    @patch('spatial.pd.read_sql_query', return_value=pd.DataFrame())
+    def test_fartsgrense_in_bbox_filters_in_database(self, mock_read):
+        fartsgrense_in_bbox(MagicMock(), 1.0, 2.0, 3.0, 4.0, srid=25833)
+
+        sql_code = str(mock_read.call_args.args[0])
+        self.assertIn('ST_Intersects(vf.geom, ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, :srid))', sql_code)
+        self.assertEqual(mock_read.call_args.kwargs['params'],
+                         {'xmin': 1.0, 'ymin': 2.0, 'xmax': 3.0, 'ymax': 4.0, 'srid': 25833})
+
+    @patch.dict(os.environ, {'NVDB_PARAM_SRID': ''})
+    @patch('spatial.pd.read_sql_query', return_value=pd.DataFrame())
+    def test_fartsgrense_within_radius_orders_by_distance(self, mock_read):
+        fartsgrense_within_radius(MagicMock(), 262000.0, 6649000.0, 500)
+
+        sql_code = str(mock_read.call_args.args[0])
+        self.assertIn('ST_DWithin(vf.geom, ST_SetSRID(ST_MakePoint(:x, :y), :srid), :radius)', sql_code)
+        self.assertIn('ORDER BY distance, nvdb_id', sql_code)
+        self.assertEqual(mock_read.call_args.kwargs['params']['srid'], 5973)
+
+    @patch('spatial.pd.read_sql_query', return_value=pd.DataFrame())
+    def test_incidents_in_area_use_the_shared_join(self, mock_read):
+        incidents_in_bbox(MagicMock(), 0, 0, 10, 10, srid=5973)
+        bbox_sql = str(mock_read.call_args.args[0])
+        incidents_within_radius(MagicMock(), 5, 5, 10, srid=5973)
+        radius_sql = str(mock_read.call_args.args[0])
+
+        for sql_code in (bbox_sql, radius_sql):
+            self.assertIn('fs.posisjon @> h.relativ_posisjon::numeric', sql_code)
+            self.assertIn('WHERE h.veglenkesekvensid IN (', sql_code)
+        self.assertIn('ST_Intersects(v.geom', bbox_sql)
+        self.assertIn('ST_DWithin(v.geom', radius_sql)
+
+    def test_invalid_areas_raise(self):
+        with self.assertRaises(ValueError):
+            fartsgrense_in_bbox(MagicMock(), 3.0, 0.0, 1.0, 1.0)
+        with self.assertRaises(ValueError):
+            incidents_within_radius(MagicMock(), 0.0, 0.0, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()